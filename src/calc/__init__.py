@@ -1,13 +1,19 @@
 from .calc_lang import CalcLangInterpreter
 from .macro import macro
 from .normalize import normalize
+from .optimize import optimize
 from .parse import parse
+from .substitute import substitute
+from .tiered import TieredInterpreter
 from .trace import trace
 
 __all__ = [
     "CalcLangInterpreter",
+    "TieredInterpreter",
     "macro",
     "normalize",
+    "optimize",
     "parse",
+    "substitute",
     "trace",
 ]
@@ -0,0 +1,292 @@
+"""
+A memory benchmark of the stages of the CALC pipeline, with a regression check
+against stored baselines.
+
+Each synthetic family of expressions is built at growing sizes by tracing, then
+printed, parsed, normalized and evaluated. Every stage is measured with
+`tracemalloc`, which reports the peak memory allocated by Python during the
+stage and the number of memory blocks still held after it, and by sampling the
+peak resident set size of the process, which also sees memory allocated outside
+of Python, such as by NumPy. The figures are divided by the number of nodes in
+the expression to compare sizes.
+
+Run `python -m calc.benchmarks` to print a report, with `--baseline PATH` to
+check it against a baseline, and with `--update` to store it as the baseline.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .calc_lang import CalcLangExpression, CalcLangInterpreter, CalcLangPrinterContext
+from .normalize import normalize
+from .parse import parse
+from .trace import trace
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+
+def sum_chain(n: int, x, y):
+    """The sum `x + 1 * x + 2 * x + ...` of `n` terms."""
+    result = x
+    for k in range(1, n):
+        result = result + k * x
+    return result
+
+
+def product_of_sums(n: int, x, y):
+    """The product `(x + 1) * (x - 2) * (x - 3) * ...` of `n` factors."""
+    result = x + 1
+    for k in range(2, n + 1):
+        result = result * (x - k)
+    return result
+
+
+def mixed(n: int, x, y):
+    """A polynomial in `x` and `y` built by `n` alternating sums and products."""
+    result = x
+    for k in range(1, n):
+        result = result * y + k if k % 2 else result + x * y
+    return result
+
+
+FAMILIES: dict[str, Callable] = {
+    "sum_chain": sum_chain,
+    "product_of_sums": product_of_sums,
+    "mixed": mixed,
+}
+
+STAGES = ("trace", "parse", "normalize", "evaluate")
+
+# The stages which take a built expression, as functions of it and the bindings.
+STAGE_FUNCTIONS: dict[str, Callable] = {
+    "parse": lambda node, bindings: parse(CalcLangPrinterContext()(node)),
+    "normalize": lambda node, bindings: normalize(node),
+    "evaluate": lambda node, bindings: CalcLangInterpreter()(node, bindings),
+}
+
+
+@dataclass
+class MemorySample:
+    """
+    The memory used by one stage on one expression.
+
+    Attributes:
+        family: The family of the expression.
+        stage: The stage measured.
+        n: The size parameter of the family.
+        nodes: The number of nodes in the expression.
+        peak: The peak memory, in bytes, allocated by Python during the stage.
+        blocks: The number of memory blocks allocated during the stage and
+            still held after it.
+        rss: The growth, in bytes, of the peak resident set size of the process.
+        error: The error raised by the stage, if it failed.
+    """
+
+    family: str
+    stage: str
+    n: int
+    nodes: int
+    peak: int = 0
+    blocks: int = 0
+    rss: int = 0
+    error: str | None = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.family}/{self.stage}/{self.n}"
+
+    @property
+    def peak_per_node(self) -> float:
+        return self.peak / max(self.nodes, 1)
+
+    @property
+    def blocks_per_node(self) -> float:
+        return self.blocks / max(self.nodes, 1)
+
+
+def _max_rss() -> int:
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def measure(fn: Callable, *args) -> tuple[Any, int, int, int]:
+    """
+    Calls `fn(*args)`, returning its result with the peak memory it allocated,
+    the number of blocks it allocated and kept, and the growth of the peak
+    resident set size.
+    """
+    gc.collect()
+    rss = _max_rss()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        result = fn(*args)
+        peak = tracemalloc.get_traced_memory()[1] - start
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return result, peak, max(blocks, 0), max(_max_rss() - rss, 0)
+
+
+def run_benchmarks(
+    families: Iterable[str] | None = None,
+    sizes: Iterable[int] = (4, 8, 16, 32),
+    stages: Iterable[str] = STAGES,
+    length: int = 1024,
+) -> list[MemorySample]:
+    """
+    Measures each of `stages` on each of `families` at each of `sizes`.
+    Expressions are evaluated on arrays of `length` elements.
+    """
+    stages = list(stages)
+    bindings = {"x": np.linspace(-1, 1, length), "y": np.linspace(1, 2, length)}
+    samples = []
+    for family in FAMILIES if families is None else families:
+        for n in sizes:
+            built, *usage = measure(FAMILIES[family], n, trace("x"), trace("y"))
+            node: CalcLangExpression = built.expr
+            for stage in stages:
+                sample = MemorySample(family, stage, n, node.size)
+                try:
+                    if stage == "trace":
+                        sample.peak, sample.blocks, sample.rss = usage
+                    else:
+                        _, sample.peak, sample.blocks, sample.rss = measure(
+                            STAGE_FUNCTIONS[stage], node, bindings
+                        )
+                except Exception as e:  # noqa: BLE001
+                    sample.error = f"{type(e).__name__}: {' '.join(str(e).split())}"
+                samples.append(sample)
+            # Release the expression before measuring the next one.
+            del built, node
+    return samples
+
+
+def to_baseline(samples: Iterable[MemorySample]) -> dict[str, dict[str, int]]:
+    """Returns the figures of the successful `samples` to store as a baseline."""
+    return {
+        s.key: {"nodes": s.nodes, "peak": s.peak, "blocks": s.blocks}
+        for s in samples
+        if s.error is None
+    }
+
+
+def save_baseline(samples: Iterable[MemorySample], path: str | Path) -> None:
+    with open(path, "w") as f:
+        json.dump(to_baseline(samples), f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str | Path) -> dict[str, dict[str, int]]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def check_regressions(
+    samples: Iterable[MemorySample],
+    baseline: dict[str, dict[str, int]],
+    threshold: float = 1.5,
+    slack: int = 256 * 1024,
+) -> list[str]:
+    """
+    Returns a description of each sample whose peak memory exceeds its baseline
+    by more than a factor of `threshold` plus `slack` bytes, or whose retained
+    blocks exceed its baseline by more than a factor of `threshold` plus one
+    block per 64 bytes of `slack`. The slack absorbs the noise of small
+    measurements. Samples missing from the baseline,
+    or which failed, are not checked.
+    """
+    regressions = []
+    for s in samples:
+        base = baseline.get(s.key)
+        if s.error is not None or base is None:
+            continue
+        if s.peak > base["peak"] * threshold + slack:
+            regressions.append(
+                f"{s.key}: peak {s.peak} bytes exceeds baseline {base['peak']}"
+            )
+        if s.blocks > base["blocks"] * threshold + slack // 64:
+            regressions.append(
+                f"{s.key}: {s.blocks} blocks retained exceeds baseline {base['blocks']}"
+            )
+    return regressions
+
+
+def report(samples: Iterable[MemorySample]) -> str:
+    """Returns a table of `samples`."""
+    lines = [
+        f"{'family':<16}{'stage':<10}{'n':>5}{'nodes':>8}{'peak (B)':>12}"
+        f"{'B/node':>10}{'blocks':>9}{'blk/node':>10}{'rss (B)':>12}"
+    ]
+    for s in samples:
+        prefix = f"{s.family:<16}{s.stage:<10}{s.n:>5}{s.nodes:>8}"
+        if s.error is not None:
+            lines.append(f"{prefix}  {s.error[:60]}")
+            continue
+        lines.append(
+            f"{prefix}{s.peak:>12}{s.peak_per_node:>10.1f}{s.blocks:>9}"
+            f"{s.blocks_per_node:>10.2f}{s.rss:>12}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m calc.benchmarks",
+        description="Measure the memory used by each stage of the CALC pipeline.",
+    )
+    parser.add_argument(
+        "--families", nargs="+", choices=list(FAMILIES), default=list(FAMILIES)
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[4, 8, 16, 32])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--baseline", help="baseline file to check against")
+    parser.add_argument(
+        "--update", action="store_true", help="store the results as the baseline"
+    )
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("-o", "--output", choices=["text", "json"], default="text")
+    args = parser.parse_args(argv)
+
+    samples = run_benchmarks(args.families, args.sizes, args.stages)
+    if args.output == "json":
+        print(json.dumps([asdict(s) for s in samples], indent=2))
+    else:
+        print(report(samples))
+    if args.baseline is None:
+        return 0
+    if args.update:
+        save_baseline(samples, args.baseline)
+        return 0
+    regressions = check_regressions(
+        samples, load_baseline(args.baseline), args.threshold
+    )
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,161 @@
+"""
+A persistent cache of normalized expressions, shared between processes.
+
+Entries are stored in an SQLite database, keyed by the structural hash of the
+input expression, so that every worker pointed at the same file can skip the
+normalization of expressions any of them has already seen. SQLite's
+write-ahead log lets readers and writers in different processes proceed
+concurrently, and the least recently used entries are evicted once the cache
+holds more than `max_entries`. The access time of an entry is only refreshed
+on a hit if it is older than `touch_interval`, so that frequent hits are read
+only and do not contend for the write lock.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+
+from .calc_lang import CalcLangExpression
+from .calc_lang.serialize import dumps, loads, structural_hash
+from .normalize import normalize
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS normalized (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS normalized_accessed ON normalized (accessed);
+"""
+
+
+class NormalizationCache:
+    """
+    A persistent, size-bounded cache of the results of `normalize`.
+
+    Attributes:
+        path (str): The path of the SQLite database holding the cache.
+        normalizer (Callable): The normalization function whose results are
+            cached.
+        version (str): Distinguishes the results of different normalizers, or
+            different versions of one, stored in the same database.
+        max_entries (int): The number of entries kept after eviction.
+        evict_every (int): How many insertions each connection makes between
+            checks of the size of the cache.
+        timeout (float): How long, in seconds, to wait for other processes'
+            locks on the database.
+        touch_interval (float): How old, in seconds, the access time of an
+            entry must be for a hit to refresh it. Eviction is only as precise
+            as this interval.
+    """
+
+    def __init__(
+        self,
+        path,
+        normalizer: Callable = normalize,
+        version: str = "",
+        max_entries: int = 100_000,
+        evict_every: int = 64,
+        timeout: float = 30.0,
+        touch_interval: float = 60.0,
+    ):
+        self.path = os.fspath(path)
+        self.normalizer = normalizer
+        self.version = version
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection of the current thread. Connections are never shared
+        between threads, nor inherited by forked processes.
+        """
+        conn = getattr(self.local, "connection", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.executescript(_SCHEMA)
+            self.local.connection = conn
+            self.local.pid = os.getpid()
+            self.local.inserts = 0
+        return conn
+
+    def key(self, node: CalcLangExpression) -> str:
+        digest = structural_hash(node)
+        if self.version:
+            digest = hashlib.sha256(f"{self.version}:{digest}".encode()).hexdigest()
+        return digest
+
+    def get(self, node: CalcLangExpression) -> CalcLangExpression | None:
+        """Returns the cached normal form of `node`, or `None` if it is absent."""
+        key = self.key(node)
+        conn = self.connection
+        row = conn.execute(
+            "SELECT value, accessed FROM normalized WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, accessed = row
+        now = time.time()
+        if now - accessed > self.touch_interval:
+            with conn:
+                conn.execute(
+                    "UPDATE normalized SET accessed = ? WHERE key = ?", (now, key)
+                )
+        return loads(value)  # type: ignore[return-value]
+
+    def put(self, node: CalcLangExpression, result: CalcLangExpression) -> None:
+        """Stores `result` as the normal form of `node`."""
+        conn = self.connection
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO normalized VALUES (?, ?, ?)",
+                (self.key(node), dumps(result), time.time()),
+            )
+        self.local.inserts += 1
+        if self.local.inserts % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries beyond `max_entries`."""
+        conn = self.connection
+        with conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM normalized").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM normalized WHERE key IN ("
+                    "SELECT key FROM normalized ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM normalized").fetchone()[0]
+
+    def __call__(self, node: CalcLangExpression) -> CalcLangExpression:
+        """Normalizes `node`, reusing a cached result if there is one."""
+        result = self.get(node)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = self.normalizer(node)
+        self.put(node, result)
+        return result
+
+    def close(self) -> None:
+        """Closes the connection of the current thread."""
+        conn = getattr(self.local, "connection", None)
+        if conn is not None and self.local.pid == os.getpid():
+            conn.close()
+        self.local.connection = None
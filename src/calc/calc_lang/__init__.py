@@ -1,24 +1,47 @@
+from .chunked import ChunkedInterpreter
+from .fused import FusedInterpreter
+from .gradient import CalcLangGradientInterpreter, CalcLangGradientMachine
+from .grid import GridInterpreter
+from .incremental import CalcLangIncrementalMachine
 from .interpreter import CalcLangInterpreter, CalcLangMachine
 from .nodes import (
     Add,
     CalcLangExpression,
     CalcLangNode,
+    CalcLangPrinterContext,
     Literal,
     Mul,
     Pow,
+    Product,
     Sub,
+    Sum,
     Variable,
 )
+from .profiler import EvaluationProfile, ProfilingInterpreter, ProfilingMachine
+from .serialize import structural_hash
 
 __all__ = [
     "Add",
     "CalcLangExpression",
+    "CalcLangGradientInterpreter",
+    "CalcLangGradientMachine",
+    "CalcLangIncrementalMachine",
     "CalcLangInterpreter",
     "CalcLangMachine",
     "CalcLangNode",
+    "CalcLangPrinterContext",
+    "ChunkedInterpreter",
+    "EvaluationProfile",
+    "FusedInterpreter",
+    "GridInterpreter",
     "Literal",
     "Mul",
     "Pow",
+    "Product",
+    "ProfilingInterpreter",
+    "ProfilingMachine",
     "Sub",
+    "Sum",
     "Variable",
+    "structural_hash",
 ]
@@ -0,0 +1,108 @@
+import os
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import numpy as np
+
+from . import nodes as exmpl
+from .interpreter import CalcLangInterpreter
+
+
+def open_column(source, dtype=None) -> Any:
+    """
+    Opens a column of values without reading it into memory. `source` may be
+    the path of a `.npy` file, the path of a raw binary file of `dtype`
+    values, or an array-like, which is returned as is.
+    """
+    if isinstance(source, str | os.PathLike):
+        if os.fspath(source).endswith(".npy"):
+            return np.load(source, mmap_mode="r")
+        if dtype is None:
+            raise ValueError(f"A dtype is required to open raw binary file {source}")
+        return np.memmap(source, dtype=dtype, mode="r")
+    return source
+
+
+def iter_chunks(columns: dict[str, Any], chunk_size: int) -> Iterator[dict[str, Any]]:
+    """
+    Splits columns of equal length into chunks of at most `chunk_size` rows.
+    Scalars are passed through to every chunk.
+    """
+    lengths = {len(col) for col in columns.values() if np.ndim(col) > 0}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 1
+    for start in range(0, n, chunk_size):
+        yield {
+            name: np.asarray(col[start : start + chunk_size])
+            if np.ndim(col) > 0
+            else col
+            for name, col in columns.items()
+        }
+
+
+class ChunkedInterpreter:
+    """
+    An interpreter for CALCCalcLang which evaluates a program over columns of
+    bindings which may not fit in memory, one chunk of rows at a time. Columns
+    are typically memory-mapped files, and the result may be written to a
+    memory-mapped file too, so memory use is bounded by the chunk size.
+    """
+
+    def __init__(self, chunk_size: int = 1 << 16, interpreter=None):
+        self.chunk_size = chunk_size
+        self.interpreter = (
+            interpreter if interpreter is not None else CalcLangInterpreter()
+        )
+
+    def stream(
+        self, prgm: exmpl.CalcLangNode, chunks: Iterable[dict[str, Any]]
+    ) -> Iterator[Any]:
+        """Yields the value of `prgm` under each chunk of bindings in turn."""
+        for chunk in chunks:
+            yield self.interpreter(prgm, chunk)
+
+    def __call__(self, prgm: exmpl.CalcLangNode, bindings, out=None, dtypes=None):
+        """
+        Evaluate `prgm` over the columns in `bindings`, which map variable names
+        to anything accepted by `open_column`, with the dtypes of raw binary
+        files given in `dtypes`. The result is written to `out`, which may be an
+        array (e.g. a `numpy.memmap`) or the path of a `.npy` file to create. If
+        `out` is `None`, a new array is returned.
+
+        A new result has the dtype and trailing shape of the value of `prgm` on
+        zero rows of the columns, which every chunk shares, as the columns have
+        a single dtype each. It is created even if the columns are empty.
+        """
+        dtypes = dtypes if dtypes is not None else {}
+        columns = {
+            name: open_column(col, dtypes.get(name)) for name, col in bindings.items()
+        }
+        columns = {
+            name: np.asarray(col)
+            if np.ndim(col) > 0 and not isinstance(col, np.ndarray)
+            else col
+            for name, col in columns.items()
+        }
+        n = max((len(col) for col in columns.values() if np.ndim(col) > 0), default=1)
+        if out is None or isinstance(out, str | os.PathLike):
+            empty = {
+                name: col[:0] if np.ndim(col) > 0 else col
+                for name, col in columns.items()
+            }
+            value = np.asarray(self.interpreter(prgm, empty))
+            shape = (n, *value.shape[1:]) if value.ndim > 0 else (n,)
+            if out is None:
+                out = np.empty(shape, dtype=value.dtype)
+            else:
+                out = np.lib.format.open_memmap(
+                    out, mode="w+", dtype=value.dtype, shape=shape
+                )
+        start = 0
+        for value in self.stream(prgm, iter_chunks(columns, self.chunk_size)):
+            stop = min(start + self.chunk_size, n)
+            out[start:stop] = value
+            start = stop
+        if isinstance(out, np.memmap):
+            out.flush()
+        return out
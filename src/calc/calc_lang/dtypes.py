@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from ..symbolic import PostOrderDAG
+from . import nodes as exmpl
+
+Interval = tuple[float, float]
+
+_UNBOUNDED: Interval = (-math.inf, math.inf)
+
+
+@dataclass
+class DtypeAnalysis:
+    """
+    The result of `infer_dtypes`.
+
+    Attributes:
+        dtype: The dtype of the value of the program.
+        types: The dtype of the value of each node, keyed by `id`.
+        bounds: An interval `(lo, hi)` containing the value of each real node,
+            keyed by `id`, computed without overflow.
+        overflows: The `Pow` nodes of integer dtype whose exact value may not
+            fit in their dtype.
+    """
+
+    dtype: np.dtype
+    types: dict[int, np.dtype] = field(default_factory=dict)
+    bounds: dict[int, Interval] = field(default_factory=dict)
+    overflows: list[exmpl.CalcLangNode] = field(default_factory=list)
+
+
+def _weak(value: Any) -> Any:
+    """
+    A Python scalar standing in for a constant of the same kind, which NumPy
+    promotes weakly, so that e.g. `x * 2.0` keeps the dtype of a float32 `x`.
+    """
+    if isinstance(value, bool | int | float | complex):
+        return value
+    return np.asarray(value).dtype
+
+
+def _result_type(*args: Any) -> Any:
+    try:
+        return np.result_type(*args)
+    except OverflowError:
+        # A Python integer literal out of the range of an integer dtype.
+        return np.result_type(*(np.asarray(arg).dtype for arg in args))
+
+
+def _mul(a: float, b: float) -> float:
+    return 0 if a == 0 or b == 0 else a * b
+
+
+def _pow(base: float, n: int) -> float:
+    try:
+        return float(base) ** n
+    except OverflowError:
+        return math.inf if base > 0 or n % 2 == 0 else -math.inf
+
+
+def _pow_bounds(base: Interval, n: int) -> Interval:
+    lo, hi = base
+    values = [_pow(lo, n), _pow(hi, n)]
+    if n % 2 == 0 and lo < 0 < hi:
+        values.append(0)
+    return min(values), max(values)
+
+
+def _dtype_bounds(dtype: np.dtype) -> Interval:
+    if dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        return info.min, info.max
+    if dtype.kind == "b":
+        return 0, 1
+    return _UNBOUNDED
+
+
+def infer_dtypes(
+    prgm: exmpl.CalcLangNode,
+    dtypes: dict[str, Any],
+    bounds: dict[str, Interval] | None = None,
+) -> DtypeAnalysis:
+    """
+    Infers the dtype of every node of `prgm` when its variables have the given
+    `dtypes`, following NumPy's promotion rules, under which Python scalar
+    literals do not widen the dtype of arrays. Variables may also be given
+    `bounds` on their values, which are propagated to detect integer powers
+    which may overflow. Integer powers whose exponent may be negative are given
+    a floating-point dtype, as Python would.
+    """
+    bounds = bounds if bounds is not None else {}
+    analysis = DtypeAnalysis(np.dtype(np.float64))
+    kinds: dict[int, Any] = {}
+    for node in PostOrderDAG(prgm):
+        assert isinstance(node, exmpl.CalcLangNode)
+        args = node.children if isinstance(node, exmpl.CalcLangTree) else []
+        arg_kinds = [kinds[id(arg)] for arg in args]
+        arg_bounds = [analysis.bounds.get(id(arg), _UNBOUNDED) for arg in args]
+        interval: Interval | None = None
+        match node:
+            case exmpl.Literal(value):
+                kind = _weak(value)
+                if isinstance(value, bool | int | float):
+                    interval = (value, value)
+            case exmpl.Variable(name):
+                if name not in dtypes:
+                    raise KeyError(
+                        f"Variable '{name}' is not defined in the current context."
+                    )
+                kind = np.dtype(dtypes[name])
+                interval = bounds.get(name, _dtype_bounds(kind))
+            case exmpl.Add() | exmpl.Sum():
+                kind = _result_type(*arg_kinds) if args else 0
+                interval = (
+                    sum(lo for lo, _ in arg_bounds),
+                    sum(hi for _, hi in arg_bounds),
+                )
+            case exmpl.Sub():
+                kind = _result_type(*arg_kinds)
+                (a, b), (c, d) = arg_bounds
+                interval = (a - d, b - c)
+            case exmpl.Mul() | exmpl.Product():
+                kind = _result_type(*arg_kinds) if args else 1
+                interval = (1, 1)
+                for c, d in arg_bounds:
+                    a, b = interval
+                    products = [_mul(a, c), _mul(a, d), _mul(b, c), _mul(b, d)]
+                    interval = (min(products), max(products))
+            case exmpl.Pow():
+                kind = _result_type(*arg_kinds)
+                lo, hi = arg_bounds[1]
+                integer = isinstance(lo, int | np.integer) or float(lo).is_integer()
+                if lo == hi and lo >= 0 and integer:
+                    interval = _pow_bounds(arg_bounds[0], int(lo))
+                elif np.dtype(_result_type(kind)).kind in "iub" and lo < 0:
+                    kind = _result_type(kind, 0.0)
+            case _:
+                raise NotImplementedError(
+                    f"Unrecognized assembly node type: {type(node)}"
+                )
+        dtype = np.dtype(_result_type(kind))
+        if args and all(not isinstance(k, np.dtype) for k in arg_kinds):
+            # Constant subtrees stay weakly typed, like the literals they hold.
+            kind = dtype.type(0).item()
+        kinds[id(node)] = kind
+        analysis.types[id(node)] = dtype
+        if interval is not None:
+            analysis.bounds[id(node)] = interval
+        if isinstance(node, exmpl.Pow) and dtype.kind in "iu":
+            lo, hi = analysis.bounds.get(id(node), _UNBOUNDED)
+            dlo, dhi = _dtype_bounds(dtype)
+            if lo < dlo or hi > dhi:
+                analysis.overflows.append(node)
+    analysis.dtype = analysis.types[id(prgm)]
+    return analysis
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import warnings
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from ..symbolic import PostOrderDAG
+from . import nodes as exmpl
+from .dtypes import Interval, infer_dtypes
+from .interpreter import CalcLangInterpreter
+
+_UFUNCS: dict[type, np.ufunc] = {
+    exmpl.Add: np.add,
+    exmpl.Sub: np.subtract,
+    exmpl.Mul: np.multiply,
+    exmpl.Pow: np.power,
+    exmpl.Sum: np.add,
+    exmpl.Product: np.multiply,
+}
+
+
+@dataclass(frozen=True)
+class FusedProgram:
+    """
+    A program compiled for blocked evaluation.
+
+    Attributes:
+        instructions: Tuples `(ufunc, dest, operands)`, to be run in order on
+            each block, which apply `ufunc` to the operands in turn, writing
+            to the scratch register `dest`. An operand is `("reg", i)` for a
+            register, `("var", name)` for a variable or `("lit", value)` for a
+            constant.
+        registers: The number of scratch registers the instructions use.
+        result: The operand holding the value of the program.
+    """
+
+    instructions: tuple[tuple[np.ufunc, int, tuple[tuple[str, Any], ...]], ...]
+    registers: int
+    result: tuple[str, Any]
+
+
+def compile_fused(prgm: exmpl.CalcLangNode) -> FusedProgram:
+    """
+    Compiles `prgm` into a `FusedProgram`. Constant subtrees are evaluated once,
+    and registers are freed after the last use of their value, so the number of
+    registers grows with the depth of the program rather than its size.
+    """
+    nodes = list(PostOrderDAG(prgm))
+    last_use: dict[int, int] = {}
+    for i, node in enumerate(nodes):
+        if isinstance(node, exmpl.CalcLangTree) and not node.is_constant:
+            for arg in node.children:
+                last_use[id(arg)] = i
+    operands: dict[int, tuple[str, Any]] = {}
+    free: list[int] = []
+    registers = 0
+    instructions = []
+    for i, node in enumerate(nodes):
+        assert isinstance(node, exmpl.CalcLangNode)
+        if node.is_constant:
+            operands[id(node)] = ("lit", CalcLangInterpreter()(node))
+            continue
+        match node:
+            case exmpl.Variable(name):
+                operands[id(node)] = ("var", name)
+                continue
+            case exmpl.CalcLangTree() if type(node) in _UFUNCS:
+                args = tuple(operands[id(arg)] for arg in node.children)
+                if len(args) == 1:
+                    identity = 0 if isinstance(node, exmpl.Sum) else 1
+                    args = (*args, ("lit", identity))
+            case _:
+                raise NotImplementedError(
+                    f"Unrecognized assembly node type: {type(node)}"
+                )
+        # Ufuncs may write over their inputs, so the result can reuse the
+        # registers of arguments used for the last time here. The arguments of
+        # n-ary nodes after the first two are read after the result is first
+        # written, so their registers are only freed afterwards.
+        dying = {
+            operands[id(arg)][1]
+            for arg in node.children
+            if operands[id(arg)][0] == "reg" and last_use[id(arg)] == i
+        }
+        late = {reg for kind, reg in args[2:] if kind == "reg"}
+        free.extend(sorted(dying - late))
+        if free:
+            dest = free.pop()
+        else:
+            dest = registers
+            registers += 1
+        free.extend(sorted(dying & late))
+        operands[id(node)] = ("reg", dest)
+        instructions.append((_UFUNCS[type(node)], dest, args))
+    return FusedProgram(tuple(instructions), registers, operands[id(prgm)])
+
+
+def _value_bounds(value) -> Interval:
+    """The smallest and largest of the integer `value`, which may be an array."""
+    a = np.asarray(value)
+    if a.size == 0:
+        return 0, 0
+    return int(a.min()), int(a.max())
+
+
+class FusedInterpreter:
+    """
+    An interpreter for CALCCalcLang which evaluates programs over large arrays
+    in one fused pass over blocks of rows. Intermediate values are written into
+    a few preallocated scratch buffers of one block each, rather than into a
+    full-size temporary per node, so that they stay in cache and peak memory is
+    proportional to the block size times the depth of the program.
+
+    Bindings are broadcast against each other as NumPy would, and blocks are
+    taken along the first axis of the result. Programs whose bindings are all
+    scalars are evaluated by `CalcLangInterpreter`.
+
+    The dtype of the computation is inferred ahead of time by `infer_dtypes`,
+    and every operation runs the ufunc loop of that dtype, so that e.g. float32
+    inputs are never promoted to float64 intermediates. The range of integer
+    bindings is taken from their values, and a `RuntimeWarning` is issued if an
+    integer power may overflow on that range.
+
+    Attributes:
+        block_size (int): The approximate number of elements in a block.
+        dtype (np.dtype | None): The dtype in which to compute, overriding the
+            inferred one, e.g. float32 where its precision is acceptable.
+    """
+
+    def __init__(self, block_size: int = 4096, dtype=None):
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype) if dtype is not None else None
+
+    def __call__(self, prgm: exmpl.CalcLangNode, bindings=None, out=None):
+        bindings = bindings if bindings is not None else {}
+        program = compile_fused(prgm)
+        operands = [arg for _, _, args in program.instructions for arg in args]
+        operands.append(program.result)
+        names = {arg for kind, arg in operands if kind == "var"}
+        arrays = {
+            name: np.asarray(value)
+            for name, value in bindings.items()
+            if name in names and np.ndim(value) > 0
+        }
+        if not arrays:
+            return CalcLangInterpreter()(prgm, bindings)
+        shape = np.broadcast_shapes(*(a.shape for a in arrays.values()))
+        dtypes = {
+            name: np.result_type(bindings[name]) for name in names if name in bindings
+        }
+        bounds = {
+            name: _value_bounds(bindings[name])
+            for name, dtype in dtypes.items()
+            if dtype.kind in "iub"
+        }
+        analysis = infer_dtypes(prgm, dtypes, bounds)
+        if analysis.overflows:
+            warnings.warn(
+                f"Integer power {analysis.overflows[0]} may overflow.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        dtype = self.dtype if self.dtype is not None else analysis.dtype
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+        inputs = {name: np.broadcast_to(a, shape) for name, a in arrays.items()}
+        row = int(np.prod(shape[1:]))
+        rows = max(1, self.block_size // max(row, 1))
+        scratch = [
+            np.empty((rows, *shape[1:]), dtype=dtype) for _ in range(program.registers)
+        ]
+
+        for start in range(0, shape[0], rows):
+            block = slice(start, min(start + rows, shape[0]))
+            regs = [buf[: block.stop - start] for buf in scratch]
+            for ufunc, dest, args in program.instructions:
+                ufunc(
+                    self.operand(args[0], regs, inputs, bindings, block),
+                    self.operand(args[1], regs, inputs, bindings, block),
+                    out=regs[dest],
+                    dtype=dtype,
+                )
+                for arg in args[2:]:
+                    operand = self.operand(arg, regs, inputs, bindings, block)
+                    ufunc(regs[dest], operand, out=regs[dest], dtype=dtype)
+            out[block] = self.operand(program.result, regs, inputs, bindings, block)
+        return out
+
+    @staticmethod
+    def operand(operand, regs, inputs, bindings, block):
+        """Returns the value of an operand for one block."""
+        kind, arg = operand
+        if kind == "reg":
+            return regs[arg]
+        if kind == "var":
+            if arg in inputs:
+                return inputs[arg][block]
+            if arg in bindings:
+                return bindings[arg]
+            raise KeyError(f"Variable '{arg}' is not defined in the current context.")
+        return arg
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import operator
+from functools import reduce
+from typing import Any
+
+import numpy as np
+
+from ..symbolic import PostOrderDAG, ScopedDict
+from . import nodes as exmpl
+from .operators import power
+
+
+def _variables(prgm: exmpl.CalcLangNode) -> list[str]:
+    """Returns the names of the variables in `prgm`, in order of first use."""
+    names = (
+        node.name for node in PostOrderDAG(prgm) if isinstance(node, exmpl.Variable)
+    )
+    return list(dict.fromkeys(names))
+
+
+def _broadcast(value, grad):
+    """Gives a gradient the shape of the value it was taken of."""
+    if isinstance(value, np.ndarray):
+        return np.zeros_like(value) + grad
+    return grad
+
+
+def _pow_partials(base, exponent, value, exponent_active: bool):
+    """
+    Returns the partial derivatives of `base ** exponent` with respect to the
+    base and the exponent. The exponent partial is only computed when the
+    exponent depends on a differentiated variable, which avoids taking the
+    logarithm of negative bases for the common case of constant exponents.
+    """
+    if np.ndim(exponent) == 0 and exponent == 0:
+        d_base = 0
+    else:
+        # A zero base with an exponent below 1 has an infinite derivative,
+        # which Python scalars raise for rather than return.
+        with np.errstate(divide="ignore"):
+            try:
+                d_base = exponent * power(base, exponent - 1)
+            except ZeroDivisionError:
+                d_base = exponent * np.power(float(base), exponent - 1)
+    d_exponent = value * np.log(base) if exponent_active else 0
+    return d_base, d_exponent
+
+
+def _cofactors(values: list) -> list:
+    """Returns the product of all of `values` but the i-th, for each i."""
+    n = len(values)
+    prefix: list[Any] = [1] * n
+    suffix: list[Any] = [1] * n
+    for i in range(1, n):
+        prefix[i] = prefix[i - 1] * values[i - 1]
+    for i in reversed(range(n - 1)):
+        suffix[i] = suffix[i + 1] * values[i + 1]
+    return [p * s for p, s in zip(prefix, suffix, strict=True)]
+
+
+class CalcLangGradientMachine:
+    """
+    An interpreter for CALCCalcLang which computes the value of a program
+    together with its gradient with respect to the variables in `wrt`, in one
+    pass over the program. Bindings may be scalars or NumPy arrays, in which case
+    values and gradients are computed elementwise.
+
+    Forward mode propagates sparse tangents from the leaves and is cheapest when
+    only a few variables are differentiated. Reverse mode evaluates the program,
+    then propagates adjoints back from the root once, independently of the
+    number of variables. Shared subexpressions are evaluated once in both modes.
+    """
+
+    forward_max_variables = 2
+
+    def __init__(
+        self,
+        bindings=None,
+        wrt=None,
+        mode="auto",
+    ):
+        if bindings is None:
+            bindings = ScopedDict()
+        if mode not in ("auto", "forward", "reverse"):
+            raise ValueError(f"Unknown differentiation mode: {mode}")
+        self.bindings = bindings
+        self.wrt = wrt
+        self.mode = mode
+
+    def __call__(self, prgm: exmpl.CalcLangNode) -> tuple[Any, dict[str, Any]]:
+        """
+        Run the program, returning its value and a dictionary mapping each
+        variable in `wrt` to the derivative of the program with respect to it.
+        """
+        wrt = _variables(prgm) if self.wrt is None else list(self.wrt)
+        mode = self.mode
+        if mode == "auto":
+            mode = "forward" if len(wrt) <= self.forward_max_variables else "reverse"
+        if mode == "forward":
+            value, grads = self.forward(prgm, set(wrt))
+        else:
+            value, grads = self.reverse(prgm, set(wrt))
+        return value, {name: _broadcast(value, grads.get(name, 0)) for name in wrt}
+
+    def lookup(self, var_n: str):
+        if var_n in self.bindings:
+            return self.bindings[var_n]
+        raise KeyError(f"Variable '{var_n}' is not defined in the current context.")
+
+    def forward(self, prgm: exmpl.CalcLangNode, wrt: set[str]):
+        values: dict[int, Any] = {}
+        tangents: dict[int, dict[str, Any]] = {}
+        for node in PostOrderDAG(prgm):
+            match node:
+                case exmpl.Literal(value):
+                    val, tan = value, {}
+                case exmpl.Variable(var_n):
+                    val = self.lookup(var_n)
+                    tan = {var_n: 1} if var_n in wrt else {}
+                case exmpl.Add(left, right) | exmpl.Sub(left, right):
+                    a, b = values[id(left)], values[id(right)]
+                    sign = 1 if isinstance(node, exmpl.Add) else -1
+                    val = a + b if sign == 1 else a - b
+                    tan = dict(tangents[id(left)])
+                    for k, t in tangents[id(right)].items():
+                        tan[k] = tan[k] + sign * t if k in tan else sign * t
+                case exmpl.Mul(left, right):
+                    a, b = values[id(left)], values[id(right)]
+                    val = a * b
+                    tan = {k: t * b for k, t in tangents[id(left)].items()}
+                    for k, t in tangents[id(right)].items():
+                        tan[k] = tan[k] + a * t if k in tan else a * t
+                case exmpl.Pow(base, exponent):
+                    a, b = values[id(base)], values[id(exponent)]
+                    val = power(a, b)
+                    t_exp = tangents[id(exponent)]
+                    d_base, d_exp = _pow_partials(a, b, val, bool(t_exp))
+                    tan = {k: d_base * t for k, t in tangents[id(base)].items()}
+                    for k, t in t_exp.items():
+                        tan[k] = tan[k] + d_exp * t if k in tan else d_exp * t
+                case exmpl.Sum(args):
+                    val = reduce(operator.add, (values[id(a)] for a in args), 0)
+                    tan = {}
+                    for arg in args:
+                        for k, t in tangents[id(arg)].items():
+                            tan[k] = tan[k] + t if k in tan else t
+                case exmpl.Product(args):
+                    vals = [values[id(arg)] for arg in args]
+                    val = reduce(operator.mul, vals) if vals else 1
+                    tan = {}
+                    for arg, other in zip(args, _cofactors(vals), strict=True):
+                        for k, t in tangents[id(arg)].items():
+                            tan[k] = tan[k] + other * t if k in tan else other * t
+                case _:
+                    raise NotImplementedError(
+                        f"Unrecognized assembly node type: {type(node)}"
+                    )
+            values[id(node)] = val
+            tangents[id(node)] = tan
+        return values[id(prgm)], tangents[id(prgm)]
+
+    def reverse(self, prgm: exmpl.CalcLangNode, wrt: set[str]):
+        order = list(PostOrderDAG(prgm))
+        values: dict[int, Any] = {}
+        active: set[int] = set()
+        for node in order:
+            match node:
+                case exmpl.Literal(value):
+                    val = value
+                case exmpl.Variable(var_n):
+                    val = self.lookup(var_n)
+                    if var_n in wrt:
+                        active.add(id(node))
+                case exmpl.Add(left, right):
+                    val = values[id(left)] + values[id(right)]
+                case exmpl.Sub(left, right):
+                    val = values[id(left)] - values[id(right)]
+                case exmpl.Mul(left, right):
+                    val = values[id(left)] * values[id(right)]
+                case exmpl.Pow(base, exponent):
+                    val = power(values[id(base)], values[id(exponent)])
+                case exmpl.Sum(args):
+                    val = reduce(operator.add, (values[id(a)] for a in args), 0)
+                case exmpl.Product(args):
+                    val = reduce(operator.mul, (values[id(a)] for a in args), 1)
+                case _:
+                    raise NotImplementedError(
+                        f"Unrecognized assembly node type: {type(node)}"
+                    )
+            values[id(node)] = val
+            if isinstance(node, exmpl.CalcLangTree) and any(
+                id(arg) in active for arg in node.children
+            ):
+                active.add(id(node))
+
+        adjoints: dict[int, Any] = {id(prgm): 1}
+        grads: dict[str, Any] = {}
+
+        def accumulate(node, adjoint):
+            if id(node) in active:
+                key = id(node)
+                adjoints[key] = adjoints[key] + adjoint if key in adjoints else adjoint
+
+        for node in reversed(order):
+            if id(node) not in adjoints:
+                continue
+            g = adjoints.pop(id(node))
+            match node:
+                case exmpl.Variable(var_n):
+                    grads[var_n] = grads[var_n] + g if var_n in grads else g
+                case exmpl.Add(left, right):
+                    accumulate(left, g)
+                    accumulate(right, g)
+                case exmpl.Sub(left, right):
+                    accumulate(left, g)
+                    accumulate(right, -g)
+                case exmpl.Mul(left, right):
+                    accumulate(left, g * values[id(right)])
+                    accumulate(right, values[id(left)] * g)
+                case exmpl.Pow(base, exponent):
+                    d_base, d_exp = _pow_partials(
+                        values[id(base)],
+                        values[id(exponent)],
+                        values[id(node)],
+                        id(exponent) in active,
+                    )
+                    accumulate(base, g * d_base)
+                    accumulate(exponent, g * d_exp)
+                case exmpl.Sum(args):
+                    for arg in args:
+                        accumulate(arg, g)
+                case exmpl.Product(args):
+                    vals = [values[id(arg)] for arg in args]
+                    for arg, other in zip(args, _cofactors(vals), strict=True):
+                        accumulate(arg, g * other)
+        return values[id(prgm)], grads
+
+
+class CalcLangGradientInterpreter:
+    """
+    A class to represent a differentiating interpreter for CALCCalcLang.
+    This is a simple wrapper around the CalcLangGradientMachine that provides
+    a more user-friendly interface for running programs.
+    """
+
+    def __init__(self, mode="auto", verbose=False):
+        self.mode = mode
+        self.verbose = verbose
+
+    def __call__(self, prgm: exmpl.CalcLangNode, bindings=None, wrt=None):
+        machine = CalcLangGradientMachine(bindings, wrt=wrt, mode=self.mode)
+        return machine(prgm)
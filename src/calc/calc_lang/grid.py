@@ -0,0 +1,199 @@
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import numpy as np
+
+from . import nodes as exmpl
+from .interpreter import CalcLangInterpreter
+
+
+class Reduction:
+    """
+    A reduction over the values of a program on a grid, computed one tile at a
+    time. `update` is given the values of a tile and the flat grid indices of
+    its points, and `result` is given the axes of the grid.
+    """
+
+    def update(self, values: np.ndarray, indices: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def result(self, axes: dict[str, np.ndarray]) -> Any:
+        raise NotImplementedError
+
+
+class SumReduction(Reduction):
+    def __init__(self):
+        self.total: Any = 0
+
+    def update(self, values, indices):
+        self.total = self.total + values.sum(axis=0)
+
+    def result(self, axes):
+        return self.total
+
+
+class MeanReduction(SumReduction):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def update(self, values, indices):
+        super().update(values, indices)
+        self.count += len(values)
+
+    def result(self, axes):
+        return self.total / self.count
+
+
+class ExtremumReduction(Reduction):
+    """
+    Keeps the smallest (or largest) value seen so far, and where it was seen.
+    If `arg` is set, the result is a dictionary from each variable to its value
+    at the extremum, otherwise it is the extremum itself. Ties are resolved in
+    favour of the first point of the grid.
+    """
+
+    def __init__(self, largest: bool = False, arg: bool = False):
+        self.largest = largest
+        self.arg = arg
+        self.value: Any = None
+        self.index: int | None = None
+
+    def update(self, values, indices):
+        if values.ndim != 1:
+            raise ValueError("Extrema are only defined for scalar values.")
+        i = int(values.argmax() if self.largest else values.argmin())
+        value = values[i]
+        if (
+            self.value is None
+            or (value > self.value if self.largest else value < self.value)
+            or (np.isnan(value) and not np.isnan(self.value))
+        ):
+            self.value = value
+            self.index = int(indices[i])
+
+    def result(self, axes):
+        if not self.arg:
+            return self.value
+        assert self.index is not None
+        shape = tuple(len(axis) for axis in axes.values())
+        position = np.unravel_index(self.index, shape)
+        return {
+            name: axis[i]
+            for (name, axis), i in zip(axes.items(), position, strict=True)
+        }
+
+
+REDUCTIONS = {
+    "sum": SumReduction,
+    "mean": MeanReduction,
+    "min": lambda: ExtremumReduction(largest=False),
+    "max": lambda: ExtremumReduction(largest=True),
+    "argmin": lambda: ExtremumReduction(largest=False, arg=True),
+    "argmax": lambda: ExtremumReduction(largest=True, arg=True),
+}
+
+
+def iter_tiles(
+    axes: dict[str, np.ndarray], tile_size: int
+) -> Iterator[tuple[np.ndarray, dict[str, np.ndarray]]]:
+    """
+    Splits the Cartesian product of `axes` into tiles of at most `tile_size`
+    points in row-major order, yielding the flat grid indices of the points of
+    each tile together with the values of each variable on it. A tile is a box
+    of the grid, and the values of each variable are its slice of its axis,
+    shaped to broadcast along the other axes, so that no coordinates are
+    gathered or repeated.
+    """
+    shape = tuple(len(axis) for axis in axes.values())
+    if not shape:
+        yield np.arange(1), {}
+        return
+    # Tiles span all of the trailing axes after `k`, and `rows` along axis `k`.
+    k = len(shape) - 1
+    while k > 0 and int(np.prod(shape[k:])) <= tile_size:
+        k -= 1
+    inner = int(np.prod(shape[k + 1 :]))
+    rows = max(1, min(shape[k], tile_size // inner))
+    names = list(axes)
+    for outer in np.ndindex(shape[:k]):
+        offset = int(np.ravel_multi_index(outer, shape[:k])) if k else 0
+        for row in range(0, shape[k], rows):
+            stop = min(row + rows, shape[k])
+            start = (offset * shape[k] + row) * inner
+            tile = {}
+            for i, name in enumerate(names):
+                if i < k:
+                    values = axes[name][outer[i] : outer[i] + 1]
+                elif i == k:
+                    values = axes[name][row:stop]
+                else:
+                    values = axes[name]
+                tile[name] = values.reshape(
+                    (1,) * i + (len(values),) + (1,) * (len(shape) - i - 1)
+                )
+            yield np.arange(start, start + (stop - row) * inner), tile
+
+
+class GridInterpreter:
+    """
+    An interpreter for CALCCalcLang which evaluates a program over the Cartesian
+    product of ranges of values of its variables, and reduces the results. The
+    grid is evaluated one tile of points at a time, as one vectorized call of
+    the underlying interpreter with each variable bound to its slice of its
+    axis, broadcast along the other axes, and the reductions are updated after
+    each tile, so memory use is bounded by the tile size rather than the size
+    of the grid.
+    """
+
+    def __init__(self, tile_size: int = 1 << 16, interpreter=None):
+        self.tile_size = tile_size
+        self.interpreter = (
+            interpreter if interpreter is not None else CalcLangInterpreter()
+        )
+
+    def stream(
+        self, prgm: exmpl.CalcLangNode, axes: dict[str, Any], bindings=None
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Yields the flat grid indices of each tile of the grid spanned by `axes`,
+        together with the values of `prgm` at those points. Variables not in
+        `axes` take their values from `bindings`.
+        """
+        axes = {name: np.asarray(axis) for name, axis in axes.items()}
+        bindings = bindings if bindings is not None else {}
+        for indices, tile in iter_tiles(axes, self.tile_size):
+            values = np.asarray(self.interpreter(prgm, {**bindings, **tile}))
+            box = np.broadcast_shapes(*(v.shape for v in tile.values()))
+            yield indices, np.broadcast_to(values, box).reshape(len(indices))
+
+    def __call__(
+        self,
+        prgm: exmpl.CalcLangNode,
+        axes: dict[str, Any],
+        reductions: Iterable[str] = ("min", "max", "sum"),
+        bindings=None,
+    ) -> dict[str, Any]:
+        """
+        Evaluates `prgm` at every point of the grid spanned by `axes`, which map
+        variable names to 1-D ranges of values, and returns the result of each
+        of the `reductions`, chosen from "sum", "mean", "min", "max", "argmin"
+        and "argmax". The results of "argmin" and "argmax" map each variable in
+        `axes` to its value at the extremum. Raises `ValueError` if the grid is
+        empty.
+        """
+        axes = {name: np.asarray(axis) for name, axis in axes.items()}
+        if any(axis.ndim != 1 for axis in axes.values()):
+            raise ValueError("Grid axes must be 1-D.")
+        if any(len(axis) == 0 for axis in axes.values()):
+            empty = [name for name, axis in axes.items() if len(axis) == 0]
+            raise ValueError(f"Cannot reduce over an empty grid: {empty} are empty.")
+        accumulators = {}
+        for name in reductions:
+            if name not in REDUCTIONS:
+                raise ValueError(f"Unknown reduction: {name}")
+            accumulators[name] = REDUCTIONS[name]()
+        for indices, values in self.stream(prgm, axes, bindings):
+            for accumulator in accumulators.values():
+                accumulator.update(values, indices)
+        return {name: acc.result(axes) for name, acc in accumulators.items()}
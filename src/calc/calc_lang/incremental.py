@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import Any
+
+from ..symbolic import PostOrderDAG
+from . import nodes as exmpl
+from .operators import apply
+
+
+class CalcLangIncrementalMachine:
+    """
+    An interpreter for CALCCalcLang which evaluates one program repeatedly
+    while its bindings change. The value of every subtree is kept between
+    evaluations, and when some bindings are updated only the subtrees which
+    depend on them, i.e. the paths from their variables to the root, are
+    recomputed.
+
+    Attributes:
+        prgm (CalcLangNode): The program being evaluated.
+        bindings (dict): The current value of each variable.
+        evaluations (int): The number of tree nodes computed so far, which is
+            useful to check how much work updates save.
+    """
+
+    def __init__(self, prgm: exmpl.CalcLangNode, bindings=None):
+        self.prgm = prgm
+        self.bindings = dict(bindings) if bindings is not None else {}
+        self.nodes: list[exmpl.CalcLangNode] = list(
+            PostOrderDAG(prgm)  # type: ignore[arg-type]
+        )
+        position = {id(node): i for i, node in enumerate(self.nodes)}
+        self.children: list[list[int]] = []
+        self.parents: list[list[int]] = [[] for _ in self.nodes]
+        self.occurrences: dict[str, list[int]] = {}
+        for i, node in enumerate(self.nodes):
+            if isinstance(node, exmpl.CalcLangTree):
+                args = [position[id(arg)] for arg in node.children]
+                for j in dict.fromkeys(args):
+                    self.parents[j].append(i)
+            else:
+                args = []
+                if isinstance(node, exmpl.Variable):
+                    self.occurrences.setdefault(node.name, []).append(i)
+            self.children.append(args)
+        self.values: list[Any] = [None] * len(self.nodes)
+        self.evaluations = 0
+        self.recompute(range(len(self.nodes)))
+
+    def compute(self, i: int) -> Any:
+        node = self.nodes[i]
+        match node:
+            case exmpl.Literal(value):
+                return value
+            case exmpl.Variable(var_n):
+                if var_n in self.bindings:
+                    return self.bindings[var_n]
+                raise KeyError(
+                    f"Variable '{var_n}' is not defined in the current context."
+                )
+            case _:
+                self.evaluations += 1
+                return apply(node, [self.values[j] for j in self.children[i]])
+
+    def recompute(self, positions) -> None:
+        """Recomputes the nodes at `positions`, which must be in post-order."""
+        for i in positions:
+            self.values[i] = self.compute(i)
+
+    def affected(self, names) -> list[int]:
+        """
+        Returns the positions of the nodes whose values depend on any of the
+        variables `names`, in post-order.
+        """
+        seen: set[int] = set()
+        stack = [i for name in names for i in self.occurrences.get(name, ())]
+        while stack:
+            i = stack.pop()
+            if i not in seen:
+                seen.add(i)
+                stack.extend(self.parents[i])
+        return sorted(seen)
+
+    def update(self, bindings=None, **kwargs) -> Any:
+        """
+        Changes the values of some variables, recomputes the subtrees which
+        depend on them, and returns the new value of the program.
+        """
+        changes = dict(bindings if bindings is not None else {}, **kwargs)
+        positions = self.affected(changes)
+        previous = dict(self.bindings), [self.values[i] for i in positions]
+        self.bindings.update(changes)
+        try:
+            self.recompute(positions)
+        except Exception:
+            # Leave the bindings and values as they were before the update.
+            self.bindings, values = previous
+            for i, value in zip(positions, values, strict=True):
+                self.values[i] = value
+            raise
+        return self()
+
+    def __call__(self) -> Any:
+        """Returns the current value of the program."""
+        return self.values[-1]
@@ -1,7 +1,14 @@
 from __future__ import annotations
 
-from ..symbolic import ScopedDict
+from collections import Counter
+from typing import Any
+
+import numpy as np
+
+from ..symbolic import PostOrderDAG, ScopedDict
 from . import nodes as exmpl
+from .dtypes import DtypeAnalysis, infer_dtypes
+from .operators import apply
 
 
 class CalcLangMachine:
@@ -16,12 +23,40 @@ class CalcLangMachine:
         if bindings is None:
             bindings = ScopedDict()
         self.bindings = bindings
-        self.types = {}
+        self.values: dict[int, Any] | None = None
+        self.uses: dict[int, int] = {}
+
+    def infer_types(self, prgm: exmpl.CalcLangNode, bounds=None) -> DtypeAnalysis:
+        """
+        Infers the dtype of each node of `prgm` from the dtypes of the current
+        bindings. See `infer_dtypes` for the meaning of `bounds`.
+        """
+        dtypes = {
+            name: np.result_type(self.bindings[name])
+            for name in prgm.free_variables
+            if name in self.bindings
+        }
+        return infer_dtypes(prgm, dtypes, bounds)
 
     def __call__(self, prgm: exmpl.CalcLangNode):
         """
         Run the program.
         """
+        if self.values is None:
+            # Subtrees shared by several parents are evaluated once. Their
+            # values depend on the bindings, so they are only remembered for
+            # the duration of one run of the program, and each is released
+            # after its last use, so that unshared intermediates are freed as
+            # soon as their parent is computed.
+            self.uses = _shared_uses(prgm)
+            self.values = {}
+            try:
+                return self(prgm)
+            finally:
+                self.values = None
+                self.uses = {}
+        if id(prgm) in self.values:
+            return self._use(prgm, self.values[id(prgm)])
         match prgm:
             case exmpl.Literal(value):
                 return value
@@ -31,18 +66,40 @@ class CalcLangMachine:
                 raise KeyError(
                     f"Variable '{var_n}' is not defined in the current context."
                 )
-            case exmpl.Add(left, right):
-                return self(left) + self(right)
-            case exmpl.Sub(left, right):
-                return self(left) - self(right)
-            case exmpl.Mul(left, right):
-                return self(left) * self(right)
-            case exmpl.Pow(base, exponent):
-                return self(base) ** self(exponent)
+            case exmpl.CalcLangTree():
+                result = apply(prgm, [self(arg) for arg in prgm.children])
             case _:
                 raise NotImplementedError(
                     f"Unrecognized assembly node type: {type(prgm)}"
                 )
+        if id(prgm) in self.uses:
+            self.values[id(prgm)] = result
+            return self._use(prgm, result)
+        return result
+
+    def _use(self, prgm: exmpl.CalcLangNode, value):
+        """Counts a use of the shared subtree `prgm`, forgetting it after the last."""
+        assert self.values is not None
+        self.uses[id(prgm)] -= 1
+        if not self.uses[id(prgm)]:
+            del self.uses[id(prgm)]
+            del self.values[id(prgm)]
+        return value
+
+
+def _shared_uses(prgm: exmpl.CalcLangNode) -> dict[int, int]:
+    """
+    Returns the number of parents of each subtree of `prgm` which has several,
+    keyed by `id`. The root counts as used once.
+    """
+    uses = Counter(
+        id(arg)
+        for node in PostOrderDAG(prgm)
+        if isinstance(node, exmpl.CalcLangTree)
+        for arg in node.children
+        if isinstance(arg, exmpl.CalcLangTree)
+    )
+    return {i: n for i, n in uses.items() if n > 1}
 
 
 class CalcLangInterpreter:
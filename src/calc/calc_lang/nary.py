@@ -0,0 +1,177 @@
+"""
+Conversions between binary and n-ary (flattened) sums and products, and
+rewriters which simplify n-ary sums and products.
+
+Long sums and products built from `Add` and `Mul` are as deep as they are long,
+so rewriting them means walking their spines. `flatten` turns them into `Sum`
+and `Product` nodes whose arguments are a flat tuple, which rewriters such as
+`collect_terms` can sort and merge in one step. `unflatten` converts back to
+the right-nested binary form that `normalize.is_normalized` expects.
+"""
+
+from collections.abc import Callable
+from typing import Any
+
+from ..symbolic import Chain, Flatten, PostOrderDAG, Term, TermTree
+from .nodes import (
+    Add,
+    CalcLangExpression,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+)
+from .serialize import structural_hash
+
+
+def to_nary(node: CalcLangExpression):
+    """Rewrites one binary `Add`, `Sub` or `Mul` into a `Sum` or `Product`."""
+    match node:
+        case Add(a, b):
+            return Sum((a, b))
+        case Sub(a, Product(args)):
+            return Sum((a, Product((Literal(-1), *args))))
+        case Sub(a, b):
+            return Sum((a, Product((Literal(-1), b))))
+        case Mul(a, b):
+            return Product((a, b))
+        case _:
+            return None
+
+
+def to_binary(node: CalcLangExpression):
+    """Rewrites one `Sum` or `Product` into right-nested `Add`s or `Mul`s."""
+    match node:
+        case Sum(args) | Product(args):
+            op, identity = (Add, 0) if isinstance(node, Sum) else (Mul, 1)
+            if not args:
+                return Literal(identity)
+            result = args[-1]
+            for arg in reversed(args[:-1]):
+                result = op(arg, result)
+            return result
+        case _:
+            return None
+
+
+def _bottom_up(rw: Callable, node: CalcLangExpression) -> CalcLangExpression:
+    """
+    Applies `rw` once to every node of `node`, children first, preserving the
+    sharing of subtrees. Unlike `PostWalk`, this does not recurse, so it is
+    safe on the deep spines of long binary sums.
+    """
+    results: dict[int, Term] = {}
+    for orig in PostOrderDAG(node):
+        x = orig
+        if isinstance(x, TermTree):
+            args = [results[id(arg)] for arg in x.children]
+            if any(new is not old for new, old in zip(args, x.children, strict=True)):
+                x = x.make_term(x.head(), *args)
+        y = rw(x)
+        results[id(orig)] = y if y is not None else x
+    return results[id(node)]  # type: ignore[return-value]
+
+
+def flatten(node: CalcLangExpression) -> CalcLangExpression:
+    """
+    Converts every `Add`, `Sub` and `Mul` in `node` into flat `Sum`s and
+    `Product`s, writing `a - b` as `a + (-1 * b)`.
+    """
+    return _bottom_up(Chain([to_nary, Flatten([Sum, Product])]), node)
+
+
+def unflatten(node: CalcLangExpression) -> CalcLangExpression:
+    """Converts every `Sum` and `Product` in `node` into binary nodes."""
+    return _bottom_up(to_binary, node)
+
+
+def _sorted(nodes: list[CalcLangExpression]) -> list[CalcLangExpression]:
+    """Sorts nodes into a canonical order, grouping equal nodes together."""
+    return sorted(nodes, key=structural_hash)
+
+
+def _split_term(term: CalcLangExpression) -> tuple[Any, list[CalcLangExpression]]:
+    """Splits a term into its literal coefficient and its other factors."""
+    match term:
+        case Literal(value):
+            return value, []
+        case Product(args):
+            coefficient = 1
+            factors = []
+            for arg in args:
+                if isinstance(arg, Literal):
+                    coefficient *= arg.val
+                else:
+                    factors.append(arg)
+            return coefficient, _sorted(factors)
+        case _:
+            return 1, [term]
+
+
+def _make_term(coefficient, factors: list[CalcLangExpression]) -> CalcLangExpression:
+    if not factors:
+        return Literal(coefficient)
+    if coefficient == 1:
+        return factors[0] if len(factors) == 1 else Product(tuple(factors))
+    return Product((Literal(coefficient), *factors))
+
+
+def collect_terms(node: CalcLangExpression):
+    """
+    Collects like terms of a `Sum`, adding the literal coefficients of terms
+    whose other factors are equal. Terms are sorted into a canonical order, and
+    terms whose coefficient is zero are dropped.
+    """
+    if not isinstance(node, Sum):
+        return None
+    monomials: dict[tuple[str, ...], tuple[Any, list[CalcLangExpression]]] = {}
+    for arg in node.args:
+        coefficient, factors = _split_term(arg)
+        key = tuple(structural_hash(f) for f in factors)
+        if key in monomials:
+            coefficient += monomials[key][0]
+        monomials[key] = (coefficient, factors)
+    terms = tuple(
+        _make_term(coefficient, factors)
+        for _, (coefficient, factors) in sorted(monomials.items())
+        if coefficient != 0
+    )
+    if not terms:
+        return Literal(0)
+    result = terms[0] if len(terms) == 1 else Sum(terms)
+    return result if result != node else None
+
+
+def collect_factors(node: CalcLangExpression):
+    """
+    Collects like factors of a `Product`, multiplying its literal factors into
+    one coefficient and adding the integer exponents of equal bases. Factors are
+    sorted into a canonical order after the coefficient. Factors are kept even
+    when the coefficient is zero, as they may be arrays, nan or inf.
+    """
+    if not isinstance(node, Product):
+        return None
+    coefficient = 1
+    powers: dict[str, tuple[CalcLangExpression, Any]] = {}
+    for arg in node.args:
+        match arg:
+            case Literal(value):
+                coefficient *= value
+                continue
+            case Pow(base, Literal(int(n))):
+                pass
+            case _:
+                base, n = arg, 1
+        key = structural_hash(base)
+        if key in powers:
+            n += powers[key][1]
+        powers[key] = (base, n)
+    factors = [
+        base if n == 1 else Pow(base, Literal(n))
+        for _, (base, n) in sorted(powers.items())
+        if n != 0
+    ]
+    result = _make_term(coefficient, factors)
+    return result if result != node else None
@@ -1,7 +1,13 @@
+import hashlib
+from collections import Counter
+from collections.abc import Iterator
 from dataclasses import asdict, dataclass
-from typing import Any
+from functools import cached_property
+from typing import Any, TextIO
 
-from ..symbolic import Context, Term, TermTree, literal_repr
+import numpy as np
+
+from ..symbolic import Context, PostOrderDAG, Term, TermTree, literal_repr
 from ..util import qual_str
 
 
@@ -38,6 +44,54 @@ class CalcLangNode(Term):
         ctx = CalcLangPrinterContext()
         return ctx(self) or ""
 
+    # Structural analyses are computed once per node, on first use, and stored
+    # on the node, so that rewriters can query them in constant time. Nodes are
+    # immutable, so the results never go stale.
+
+    @cached_property
+    def size(self) -> int:
+        """The number of nodes in the tree, counting shared subtrees each time."""
+        return _analyze(self, "size", _size)
+
+    @cached_property
+    def depth(self) -> int:
+        """The number of nodes on the longest path from the root to a leaf."""
+        return _analyze(self, "depth", _depth)
+
+    @cached_property
+    def free_variables(self) -> frozenset[str]:
+        """The names of the variables which occur in the tree."""
+        return _analyze(self, "free_variables", _free_variables)
+
+    @cached_property
+    def digest(self) -> bytes:
+        """
+        The SHA-256 digest of the structure of the tree, which
+        `serialize.structural_hash` returns in hexadecimal.
+        """
+        return _analyze(self, "digest", _digest)
+
+    @property
+    def is_constant(self) -> bool:
+        """Whether the value of the tree does not depend on any variable."""
+        return not self.free_variables
+
+    @cached_property
+    def degrees(self) -> dict[str, int] | None:
+        """
+        The degree of the tree, as a polynomial, in each of its variables, or
+        `None` if it is not a polynomial.
+        """
+        return _analyze(self, "degrees", _degrees)
+
+    def degree(self, name: str) -> int | None:
+        """
+        Returns the degree of the tree, as a polynomial, in the variable `name`,
+        or `None` if it is not a polynomial.
+        """
+        degrees = self.degrees
+        return None if degrees is None else degrees.get(name, 0)
+
 
 class CalcLangTree(CalcLangNode, TermTree):
     @property
@@ -156,6 +210,160 @@ class Pow(CalcLangExpression, CalcLangTree):
         return [self.base, self.exponent]
 
 
+@dataclass(eq=True, frozen=True)
+class Sum(CalcLangExpression, CalcLangTree):
+    """
+    Represents an n-ary sum: args[0] + args[1] + ... + args[n - 1]. The sum of
+    no arguments is 0. Sums are a flattened alternative to nested `Add`s.
+
+    Attributes:
+        args: The summands.
+    """
+
+    args: tuple[CalcLangExpression, ...]
+
+    @classmethod
+    def from_children(cls, *children):
+        return cls(tuple(children))
+
+    @property
+    def children(self):
+        """Returns the children of the node."""
+        return list(self.args)
+
+
+@dataclass(eq=True, frozen=True)
+class Product(CalcLangExpression, CalcLangTree):
+    """
+    Represents an n-ary product: args[0] * args[1] * ... * args[n - 1]. The
+    product of no arguments is 1. Products are a flattened alternative to
+    nested `Mul`s.
+
+    Attributes:
+        args: The factors.
+    """
+
+    args: tuple[CalcLangExpression, ...]
+
+    @classmethod
+    def from_children(cls, *children):
+        return cls(tuple(children))
+
+    @property
+    def children(self):
+        """Returns the children of the node."""
+        return list(self.args)
+
+
+def _analyze(node: CalcLangNode, attr: str, rule) -> Any:
+    """
+    Computes the analysis `attr` of `node` bottom-up, without recursion, where
+    `rule(node, values)` combines the analyses of the children of `node`.
+    Subtrees whose analysis is already cached are not visited again.
+    """
+    stack = [node]
+    while stack:
+        x = stack[-1]
+        if attr in x.__dict__:
+            stack.pop()
+            continue
+        children = x.children if isinstance(x, CalcLangTree) else []
+        pending = [arg for arg in children if attr not in arg.__dict__]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        # Bypass the frozen dataclass, as `cached_property` does.
+        x.__dict__[attr] = rule(x, [arg.__dict__[attr] for arg in children])
+    return node.__dict__[attr]
+
+
+def _size(node: CalcLangNode, args: list[int]) -> int:
+    return 1 + sum(args)
+
+
+def _depth(node: CalcLangNode, args: list[int]) -> int:
+    return 1 + max(args, default=0)
+
+
+def _free_variables(node: CalcLangNode, args: list[frozenset[str]]) -> frozenset:
+    if isinstance(node, Variable):
+        return frozenset([node.name])
+    return frozenset().union(*args)
+
+
+def _literal_data(value: Any) -> str:
+    # Floats are written exactly, and NumPy scalars by their little-endian bytes,
+    # since their reprs differ between NumPy versions.
+    if isinstance(value, np.generic):
+        return value.astype(value.dtype.newbyteorder("<")).tobytes().hex()
+    if isinstance(value, float):
+        return value.hex()
+    if isinstance(value, complex):
+        return f"{value.real.hex()},{value.imag.hex()}"
+    return repr(value)
+
+
+def _digest(node: CalcLangNode, args: list[bytes]) -> bytes:
+    match node:
+        case Literal(value):
+            data = f"Literal:{type(value).__name__}:{_literal_data(value)}".encode()
+        case Variable(name):
+            data = f"Variable:{name}".encode()
+        case CalcLangTree():
+            data = b"".join([type(node).__name__.encode(), b":", *args])
+        case _:
+            raise NotImplementedError(f"Unrecognized assembly node type: {type(node)}")
+    return hashlib.sha256(data).digest()
+
+
+def _degrees(node: CalcLangNode, args: list) -> dict[str, int] | None:
+    match node:
+        case Literal():
+            return {}
+        case Variable(name):
+            return {name: 1}
+    if any(arg is None for arg in args):
+        return None
+    result: dict[str, int] = {}
+    match node:
+        case Add() | Sub() | Sum():
+            for arg in args:
+                for name, n in arg.items():
+                    result[name] = max(result.get(name, 0), n)
+        case Mul() | Product():
+            for arg in args:
+                for name, n in arg.items():
+                    result[name] = result.get(name, 0) + n
+        case Pow(_, Literal(int(n))) if n >= 0:
+            result = {name: m * n for name, m in args[0].items()}
+        case Pow() if node.is_constant:
+            pass
+        case _:
+            return None
+    return result
+
+
+_OPERATORS: dict[type, str] = {
+    Add: "+",
+    Sub: "-",
+    Mul: "*",
+    Pow: "^",
+    Sum: "+",
+    Product: "*",
+}
+_IDENTITIES: dict[type, str] = {Sum: "0", Product: "1"}
+
+# Binding strength of each operator, and which operand it associates towards
+# (0 for left-associative, 1 for right-associative). Sums and differences bind
+# loosest and products tighter, both associating to the left, and powers bind
+# tightest, associating to the right, so `a - b - c` is `(a - b) - c` and
+# `a ^ b ^ c` is `a ^ (b ^ c)`. Operands are parenthesized only where these
+# rules would otherwise group them differently.
+_PRECEDENCE: dict[type, int] = {Add: 1, Sub: 1, Mul: 2, Pow: 3, Sum: 1, Product: 2}
+_ASSOCIATIVITY: dict[type, int] = {Add: 0, Sub: 0, Mul: 0, Pow: 1, Sum: 0, Product: 0}
+
+
 class CalcLangPrinterContext(Context):
     def __init__(self, tab="    ", indent=0):
         super().__init__()
@@ -181,18 +389,84 @@ class CalcLangPrinterContext(Context):
         return blk
 
     def __call__(self, prgm: CalcLangNode):
-        match prgm:
+        return "".join(self.stream(prgm))
+
+    def write(self, prgm: CalcLangNode, out: TextIO) -> None:
+        """
+        Write the printed form of `prgm` to the file-like object `out`, without
+        materializing the whole string.
+        """
+        out.writelines(self.stream(prgm))
+
+    def stream(self, prgm: CalcLangNode) -> Iterator[str]:
+        """
+        Yields the printed form of `prgm` in chunks, using as few parentheses as
+        operator precedence allows. The traversal is iterative, so arbitrarily
+        deep programs can be printed. Subtrees shared by several parents are
+        printed once and the resulting text is reused at later occurrences.
+        """
+        refs = Counter(
+            id(arg)
+            for node in PostOrderDAG(prgm)
+            if isinstance(node, CalcLangTree)
+            for arg in node.children
+        )
+        cache: dict[int, str] = {}
+        captures: list[list[str]] = []
+        # The stack holds tokens to emit, nodes to print, or the id of a shared
+        # node whose captured text is complete.
+        stack: list[str | int | CalcLangNode] = [prgm]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                tok = item
+            elif isinstance(item, int):
+                tok = "".join(captures.pop())
+                cache[item] = tok
+            elif id(item) in cache:
+                tok = cache[id(item)]
+            else:
+                match item:
+                    case Literal(value):
+                        tok = qual_str(value)
+                    case Variable(name):
+                        tok = str(name)
+                    case CalcLangTree() if not item.children:
+                        tok = _IDENTITIES[type(item)]
+                    case CalcLangTree() if type(item) in _OPERATORS:
+                        if refs[id(item)] > 1:
+                            captures.append([])
+                            stack.append(id(item))
+                        args = item.children
+                        sep = f" {_OPERATORS[type(item)]} "
+                        for i in reversed(range(1, len(args))):
+                            self._push(stack, args[i], item, 1)
+                            stack.append(sep)
+                        self._push(stack, args[0], item, 0)
+                        continue
+                    case _:
+                        raise NotImplementedError
+            if captures:
+                captures[-1].append(tok)
+            else:
+                yield tok
+
+    @staticmethod
+    def _push(stack: list, child: CalcLangNode, parent: CalcLangNode, side: int):
+        match child:
             case Literal(value):
-                return qual_str(value)
-            case Variable(name):
-                return str(name)
-            case Add(left, right):
-                return f"({self(left)} + {self(right)})"
-            case Sub(left, right):
-                return f"({self(left)} - {self(right)})"
-            case Mul(left, right):
-                return f"({self(left)} * {self(right)})"
-            case Pow(base, exponent):
-                return f"({self(base)} ^ {self(exponent)})"
+                wrap = (side == 1 or isinstance(parent, Pow)) and qual_str(
+                    value
+                ).startswith("-")
+            case CalcLangTree() if type(child) in _PRECEDENCE and child.children:
+                prec = _PRECEDENCE[type(child)]
+                parent_prec = _PRECEDENCE[type(parent)]
+                wrap = prec < parent_prec or (
+                    prec == parent_prec and side != _ASSOCIATIVITY[type(parent)]
+                )
             case _:
-                raise NotImplementedError
+                wrap = False
+        if wrap:
+            stack.extend((")", child, "("))
+        else:
+            stack.append(child)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import operator
+from functools import reduce
+from typing import Any
+
+import numpy as np
+
+from . import nodes as exmpl
+
+
+def power(base, exponent):
+    """
+    Returns `base ** exponent`. Integer arrays to negative integer powers are
+    computed in floating point, as Python does for integers and as
+    `infer_dtypes` types them, rather than raising like NumPy.
+    """
+    arrays = isinstance(base, np.ndarray | np.generic) or isinstance(
+        exponent, np.ndarray | np.generic
+    )
+    if (
+        arrays
+        and all(np.asarray(v).dtype.kind in "iub" for v in (base, exponent))
+        and np.any(np.asarray(exponent) < 0)
+    ):
+        return np.power(base, exponent, dtype=np.float64)
+    return base**exponent
+
+
+def apply(node: exmpl.CalcLangNode, args: list) -> Any:
+    """
+    Computes the value of the tree node `node` from the values of its children.
+    This is the operator table of the interpreter, which the other evaluators
+    share.
+    """
+    match node:
+        case exmpl.Add():
+            return args[0] + args[1]
+        case exmpl.Sub():
+            return args[0] - args[1]
+        case exmpl.Mul():
+            return args[0] * args[1]
+        case exmpl.Pow():
+            return power(args[0], args[1])
+        case exmpl.Sum():
+            return reduce(operator.add, args) if args else 0
+        case exmpl.Product():
+            return reduce(operator.mul, args) if args else 1
+        case _:
+            raise NotImplementedError(f"Unrecognized assembly node type: {type(node)}")
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from . import nodes as exmpl
+from .interpreter import CalcLangMachine
+
+
+@dataclass
+class SubtreeStats:
+    """
+    Measurements of the evaluations of one subtree.
+
+    Attributes:
+        node: The subtree.
+        calls: The number of times it was evaluated.
+        time: The total time, in seconds, spent evaluating it, including its
+            children.
+        self_time: The part of `time` not spent evaluating its children.
+        nbytes: The total size, in bytes, of the values it produced.
+    """
+
+    node: exmpl.CalcLangNode
+    calls: int = 0
+    time: float = 0.0
+    self_time: float = 0.0
+    nbytes: int = 0
+
+
+def _nbytes(value: Any) -> int:
+    nbytes = getattr(value, "nbytes", None)
+    return nbytes if isinstance(nbytes, int) else sys.getsizeof(value)
+
+
+@dataclass
+class EvaluationProfile:
+    """
+    Accumulates measurements of the evaluations made by `ProfilingMachine`s.
+
+    Attributes:
+        counts: The number of evaluations of each type of node.
+        times: The time, in seconds, spent evaluating each type of node,
+            excluding its children.
+        subtrees: The measurements of each subtree, keyed by `id`.
+    """
+
+    counts: Counter[str] = field(default_factory=Counter)
+    times: dict[str, float] = field(default_factory=dict)
+    subtrees: dict[int, SubtreeStats] = field(default_factory=dict)
+
+    def record(self, node, elapsed: float, children: float, value) -> None:
+        name = type(node).__name__
+        self.counts[name] += 1
+        self.times[name] = self.times.get(name, 0.0) + elapsed - children
+        stats = self.subtrees.get(id(node))
+        if stats is None or stats.node is not node:
+            stats = self.subtrees[id(node)] = SubtreeStats(node)
+        stats.calls += 1
+        stats.time += elapsed
+        stats.self_time += elapsed - children
+        stats.nbytes += _nbytes(value)
+
+    def top(self, k: int = 10, key: str = "time") -> list[SubtreeStats]:
+        """
+        Returns the `k` most expensive subtrees by `key`, which is one of
+        "time", "self_time", "nbytes" or "calls".
+        """
+        stats = sorted(
+            self.subtrees.values(), key=lambda s: getattr(s, key), reverse=True
+        )
+        return stats[:k]
+
+    def report(self, k: int = 10, key: str = "time", width: int = 60) -> str:
+        """
+        Returns a table of the evaluations of each type of node, followed by
+        the `k` most expensive subtrees by `key`, printed in CALC syntax and
+        truncated to `width` characters.
+        """
+        printer = exmpl.CalcLangPrinterContext()
+        lines = [f"{'node type':<12}{'count':>10}{'self time (s)':>16}"]
+        for name, count in self.counts.most_common():
+            lines.append(f"{name:<12}{count:>10}{self.times[name]:>16.6f}")
+        lines.append("")
+        lines.append(
+            f"{'time (s)':>10}{'self (s)':>10}{'calls':>7}{'bytes':>12}  subtree"
+        )
+        for stats in self.top(k, key):
+            text = printer(stats.node)
+            if len(text) > width:
+                text = text[: width - 3] + "..."
+            lines.append(
+                f"{stats.time:>10.6f}{stats.self_time:>10.6f}{stats.calls:>7}"
+                f"{stats.nbytes:>12}  {text}"
+            )
+        return "\n".join(lines)
+
+
+class ProfilingMachine(CalcLangMachine):
+    """
+    A `CalcLangMachine` which records the time taken by, and the size of the
+    value produced by, each evaluation of a tree node into `profile`. Literals,
+    variables and subtrees whose value was already computed are not recorded.
+    Profiling is opt-in: `CalcLangMachine` itself is not instrumented.
+    """
+
+    def __init__(self, bindings=None, profile: EvaluationProfile | None = None):
+        super().__init__(bindings)
+        self.profile = profile if profile is not None else EvaluationProfile()
+        self.children_time = 0.0
+
+    def __call__(self, prgm: exmpl.CalcLangNode):
+        if (
+            self.values is None
+            or id(prgm) in self.values
+            or not isinstance(prgm, exmpl.CalcLangTree)
+        ):
+            return super().__call__(prgm)
+        outer = self.children_time
+        self.children_time = 0.0
+        start = time.perf_counter()
+        try:
+            value = super().__call__(prgm)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self.children_time
+            self.children_time = outer + elapsed
+        self.profile.record(prgm, elapsed, children, value)
+        return value
+
+
+class ProfilingInterpreter:
+    """
+    A drop-in replacement for `CalcLangInterpreter` which profiles every program
+    it runs with a `ProfilingMachine`, accumulating the measurements of all runs
+    into `profile`.
+    """
+
+    def __init__(self, verbose=False, profile: EvaluationProfile | None = None):
+        self.verbose = verbose
+        self.profile = profile if profile is not None else EvaluationProfile()
+
+    def __call__(self, prgm: exmpl.CalcLangNode, bindings=None):
+        machine = ProfilingMachine(bindings, self.profile)
+        return machine(prgm)
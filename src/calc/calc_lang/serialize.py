@@ -0,0 +1,68 @@
+import json
+from typing import Any
+
+from ..symbolic import PostOrderDAG
+from . import nodes as exmpl
+
+_TREES: dict[str, type[exmpl.CalcLangTree]] = {
+    cls.__name__: cls
+    for cls in (
+        exmpl.Add,
+        exmpl.Sub,
+        exmpl.Mul,
+        exmpl.Pow,
+        exmpl.Sum,
+        exmpl.Product,
+    )
+}
+
+
+def structural_hash(prgm: exmpl.CalcLangNode) -> str:
+    """
+    Returns a stable hexadecimal digest of the structure of `prgm`, which is
+    the same across processes and Python and NumPy versions. Structurally equal programs
+    have equal digests, whether or not their subtrees are shared, and literals
+    of different types (e.g. `1` and `1.0`) have different digests. The digest
+    is cached on each node, so it is computed once per subtree.
+    """
+    return prgm.digest.hex()
+
+
+def dumps(prgm: exmpl.CalcLangNode) -> str:
+    """
+    Serializes `prgm` to JSON. Each distinct subtree is written once, so the
+    size of the output is proportional to the size of the program as a DAG.
+    """
+    index: dict[int, int] = {}
+    table: list[list[Any]] = []
+    for node in PostOrderDAG(prgm):
+        match node:
+            case exmpl.Literal(value):
+                entry: list[Any] = ["Literal", value]
+            case exmpl.Variable(name):
+                entry = ["Variable", name]
+            case exmpl.CalcLangTree() if type(node).__name__ in _TREES:
+                entry = [
+                    type(node).__name__,
+                    *(index[id(arg)] for arg in node.children),
+                ]
+            case _:
+                raise NotImplementedError(
+                    f"Unrecognized assembly node type: {type(node)}"
+                )
+        index[id(node)] = len(table)
+        table.append(entry)
+    return json.dumps(table, separators=(",", ":"))
+
+
+def loads(data: str) -> exmpl.CalcLangNode:
+    """Deserializes a program serialized with `dumps`."""
+    table: list[exmpl.CalcLangNode] = []
+    for head, *args in json.loads(data):
+        if head == "Literal":
+            table.append(exmpl.Literal(*args))
+        elif head == "Variable":
+            table.append(exmpl.Variable(*args))
+        else:
+            table.append(_TREES[head].from_children(*(table[i] for i in args)))
+    return table[-1]
@@ -0,0 +1,13 @@
+from .c import CCompiler, CContext, CInterpreter, CKernel, c_kernel_source
+from .python import PythonContext, compile_python_kernel, python_kernel_source
+
+__all__ = [
+    "CCompiler",
+    "CContext",
+    "CInterpreter",
+    "CKernel",
+    "PythonContext",
+    "c_kernel_source",
+    "compile_python_kernel",
+    "python_kernel_source",
+]
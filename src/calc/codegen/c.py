@@ -0,0 +1,342 @@
+import ctypes
+import hashlib
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from ..calc_lang import (
+    Add,
+    CalcLangExpression,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+    Variable,
+)
+from ..lower import lower_powers
+from ..symbolic import Context, PostOrderDAG
+
+_OPERATORS: dict[type, str] = {Add: "+", Sub: "-", Mul: "*", Sum: "+", Product: "*"}
+
+
+def c_literal(value) -> str:
+    """Returns a C expression for the numeric literal `value` as a double."""
+    value = float(value)
+    if math.isnan(value):
+        return "NAN"
+    if math.isinf(value):
+        return "INFINITY" if value > 0 else "(-INFINITY)"
+    return f"({value!r})"
+
+
+class CContext(Context):
+    """
+    A context for emitting the body of a C kernel which evaluates a
+    CalcLangExpression elementwise over arrays of doubles.
+    """
+
+    def __init__(self, tab="    ", indent=0, **kwargs):
+        super().__init__(**kwargs)
+        self.tab = tab
+        self.indent = indent
+
+    @property
+    def feed(self) -> str:
+        return self.tab * self.indent
+
+    def emit(self):
+        return "\n".join([*self.preamble, *self.epilogue])
+
+    def block(self) -> "CContext":
+        blk = super().block()
+        blk.indent = self.indent
+        blk.tab = self.tab
+        return blk
+
+    def subblock(self):
+        blk = self.block()
+        blk.indent = self.indent + 1
+        return blk
+
+    def __call__(self, prgm: CalcLangExpression, variables: dict[str, str]) -> str:
+        """
+        Emits statements computing `prgm`, declaring one temporary per distinct
+        subtree, and returns the C expression holding its value. `variables`
+        maps the variables of `prgm` to the C expressions holding their values.
+        """
+        names: dict[int, str] = {}
+        for node in PostOrderDAG(prgm):
+            match node:
+                case Literal(value):
+                    names[id(node)] = c_literal(value)
+                case Variable(name):
+                    names[id(node)] = variables[name]
+                case Add(left, right) | Sub(left, right) | Mul(left, right):
+                    op = _OPERATORS[type(node)]
+                    expr = f"{names[id(left)]} {op} {names[id(right)]}"
+                case Pow(base, exponent):
+                    expr = f"pow({names[id(base)]}, {names[id(exponent)]})"
+                case Sum(args) | Product(args):
+                    op = _OPERATORS[type(node)]
+                    identity = "0.0" if isinstance(node, Sum) else "1.0"
+                    expr = f" {op} ".join(names[id(arg)] for arg in args) or identity
+                case _:
+                    raise NotImplementedError(
+                        f"Unrecognized assembly node type: {type(node)}"
+                    )
+            if id(node) not in names:
+                name = self.freshen("t")
+                self.exec(f"{self.feed}const double {name} = {expr};")
+                names[id(node)] = name
+        return names[id(prgm)]
+
+
+def c_kernel_source(prgm: CalcLangExpression, variables: list[str]) -> str:
+    """
+    Returns the source of a C function `calc_kernel` which evaluates `prgm`
+    elementwise. Its arguments are the number of elements, an array of pointers
+    to the input for each of `variables`, the stride of each input (0 for
+    inputs which are broadcast), and the output array.
+    """
+    ctx = CContext()
+    body = ctx.subblock()
+    loop = body.subblock()
+    inputs = {}
+    for k, var in enumerate(variables):
+        ptr = ctx.freshen("in", var)
+        stride = ctx.freshen(ptr, "stride")
+        body.exec(f"{body.feed}const double *{ptr} = inputs[{k}];")
+        body.exec(f"{body.feed}const int64_t {stride} = strides[{k}];")
+        inputs[var] = ctx.freshen("v", var)
+        loop.exec(f"{loop.feed}const double {inputs[var]} = {ptr}[i * {stride}];")
+    result = loop(lower_powers(prgm), inputs)
+    loop.exec(f"{loop.feed}out[i] = {result};")
+    ctx.exec("#include <math.h>")
+    ctx.exec("#include <stdint.h>")
+    ctx.exec("")
+    ctx.exec(
+        "void calc_kernel(int64_t n, const double *const *inputs, "
+        "const int64_t *strides, double *out) {"
+    )
+    ctx.exec(body.emit())
+    ctx.exec(f"{body.feed}for (int64_t i = 0; i < n; i++) {{")
+    ctx.exec(loop.emit())
+    ctx.exec(f"{body.feed}}}")
+    ctx.exec("}")
+    return ctx.emit() + "\n"
+
+
+def _variables(prgm: CalcLangExpression) -> list[str]:
+    names = (node.name for node in PostOrderDAG(prgm) if isinstance(node, Variable))
+    return list(dict.fromkeys(names))
+
+
+class CKernel:
+    """
+    A compiled kernel evaluating an expression elementwise over NumPy arrays.
+    If the kernel could not be compiled, it evaluates the expression with
+    `CalcLangInterpreter` instead, and `compiled` is `False`.
+
+    Attributes:
+        prgm (CalcLangExpression): The expression evaluated by the kernel.
+        variables (list[str]): The variables of the expression, in the order
+            the kernel takes them.
+        compiled (bool): Whether the kernel runs compiled code.
+    """
+
+    def __init__(self, prgm: CalcLangExpression, variables: list[str], func=None):
+        self.prgm = prgm
+        self.variables = variables
+        self.func = func
+
+    @property
+    def compiled(self) -> bool:
+        return self.func is not None
+
+    def __call__(self, bindings=None) -> np.ndarray:
+        if bindings is None:
+            bindings = {}
+        for var in self.variables:
+            if var not in bindings:
+                raise KeyError(
+                    f"Variable '{var}' is not defined in the current context."
+                )
+        args = [np.asarray(bindings[var], dtype=np.float64) for var in self.variables]
+        if self.func is None:
+            values = dict(zip(self.variables, args, strict=True))
+            result = CalcLangInterpreter()(self.prgm, values)
+            return np.asarray(result, dtype=np.float64)
+        shape = np.broadcast_shapes(*(arg.shape for arg in args))
+        n = math.prod(shape)
+        inputs = []
+        strides = []
+        for arg in args:
+            if arg.size == 1:
+                inputs.append(np.ascontiguousarray(arg.reshape(1)))
+                strides.append(0)
+            else:
+                full = np.broadcast_to(arg, shape)
+                inputs.append(np.ascontiguousarray(full).reshape(n))
+                strides.append(1)
+        out = np.empty(shape, dtype=np.float64)
+        pointers = (ctypes.POINTER(ctypes.c_double) * max(len(inputs), 1))(
+            *(arg.ctypes.data_as(ctypes.POINTER(ctypes.c_double)) for arg in inputs)
+        )
+        self.func(
+            n,
+            pointers,
+            (ctypes.c_int64 * max(len(strides), 1))(*strides),
+            out.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+        )
+        return out
+
+
+class CCompiler:
+    """
+    Compiles CalcLangExpressions into C kernels with the system C compiler.
+    Shared objects are cached on disk under `cache_dir`, keyed by a hash of
+    the generated source and the compiler invocation, and loaded with ctypes.
+    When no compiler is available or compilation fails, the kernels fall back
+    to NumPy evaluation.
+
+    Attributes:
+        cc (str | None): The C compiler to use. Defaults to the `CC` environment
+            variable, then to the first of `cc`, `gcc` or `clang` on the path.
+        flags (list[str]): The flags passed to the compiler.
+        cache_dir (Path): The directory holding compiled kernels. Defaults to
+            the `CALC_CACHE_DIR` environment variable, then to `calc` in the
+            user's cache directory. Since its libraries are loaded into the
+            process, it is created private to the user, and nothing is loaded
+            from it unless it and the library are owned by the user and not
+            writable by anyone else.
+    """
+
+    def __init__(self, cc=None, flags=None, cache_dir=None):
+        if cc is None:
+            cc = os.environ.get("CC") or next(
+                filter(None, map(shutil.which, ["cc", "gcc", "clang"])), None
+            )
+        if flags is None:
+            flags = ["-O3", "-std=c99", "-shared", "-fPIC"]
+        if cache_dir is None:
+            cache_dir = os.environ.get("CALC_CACHE_DIR") or default_cache_dir()
+        self.cc = cc
+        self.flags = list(flags)
+        self.cache_dir = Path(cache_dir)
+        self.kernels: dict[str, CKernel] = {}
+
+    def __call__(self, prgm: CalcLangExpression) -> CKernel:
+        variables = _variables(prgm)
+        src = c_kernel_source(prgm, variables)
+        key = hashlib.sha256(
+            "\0".join([str(self.cc), *self.flags, src]).encode()
+        ).hexdigest()
+        if key not in self.kernels:
+            self.kernels[key] = CKernel(prgm, variables, self.load(key, src))
+        return self.kernels[key]
+
+    def load(self, key: str, src: str):
+        """
+        Returns the `calc_kernel` function compiled from `src`, compiling it
+        into the cache if needed, or `None` if it cannot be compiled.
+        """
+        if self.cc is None:
+            return None
+        lib = self.cache_dir / f"{key}.so"
+        try:
+            _private_dir(self.cache_dir)
+            if not lib.exists():
+                self.compile(key, src)
+            _check_private(lib)
+            func = ctypes.CDLL(str(lib)).calc_kernel
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        func.restype = None
+        func.argtypes = [
+            ctypes.c_int64,
+            ctypes.POINTER(ctypes.POINTER(ctypes.c_double)),
+            ctypes.POINTER(ctypes.c_int64),
+            ctypes.POINTER(ctypes.c_double),
+        ]
+        return func
+
+    def compile(self, key: str, src: str) -> None:
+        """
+        Compiles `src` into `key.so` in the cache. Both the source and the
+        library are written under unique temporary names and renamed into
+        place, so that concurrent threads and processes never see a partially
+        written file.
+        """
+        c_file = _write_unique(self.cache_dir, ".c", src.encode())
+        tmp = _write_unique(self.cache_dir, ".so", b"")
+        try:
+            subprocess.run(
+                [self.cc, *self.flags, "-o", str(tmp), str(c_file), "-lm"],
+                check=True,
+                capture_output=True,
+            )
+            # The linker creates the library with the permissions of the umask.
+            os.chmod(tmp, 0o700)
+            os.replace(c_file, self.cache_dir / f"{key}.c")
+            os.replace(tmp, self.cache_dir / f"{key}.so")
+        finally:
+            for path in (c_file, tmp):
+                path.unlink(missing_ok=True)
+
+
+def default_cache_dir() -> Path:
+    """Returns the per-user directory in which compiled kernels are cached."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "calc"
+
+
+def _check_private(path: Path) -> None:
+    """
+    Raises `PermissionError` unless `path` is owned by the current user and not
+    writable by other users. Ownership cannot be checked on Windows.
+    """
+    if os.name == "nt":
+        return
+    st = os.lstat(path)
+    if st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise PermissionError(f"{path} may be modified by other users")
+
+
+def _private_dir(path: Path) -> None:
+    """Creates the directory `path` accessible only to the user, and checks it."""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not path.is_dir() or path.is_symlink():
+        raise NotADirectoryError(f"{path} is not a directory")
+    _check_private(path)
+
+
+def _write_unique(directory: Path, suffix: str, data: bytes) -> Path:
+    """Writes `data` to a new file with a unique name in `directory`."""
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=suffix, delete=False) as f:
+        f.write(data)
+    return Path(f.name)
+
+
+class CInterpreter:
+    """
+    An interpreter for CalcLangExpressions over NumPy arrays of doubles, which
+    compiles each expression to a C kernel. This is a drop-in replacement for
+    `CalcLangInterpreter` in batched evaluation.
+    """
+
+    def __init__(self, compiler: CCompiler | None = None):
+        self.compiler = compiler if compiler is not None else CCompiler()
+
+    def __call__(self, prgm: CalcLangExpression, bindings=None) -> np.ndarray:
+        return self.compiler(prgm)(bindings)
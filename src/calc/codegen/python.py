@@ -0,0 +1,145 @@
+from collections.abc import Callable
+from typing import Any
+
+from ..calc_lang import (
+    Add,
+    CalcLangExpression,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+    Variable,
+)
+from ..calc_lang.operators import power
+from ..symbolic import Context, PostOrderDAG
+
+_OPERATORS: dict[type, str] = {
+    Add: "+",
+    Sub: "-",
+    Mul: "*",
+    Sum: "+",
+    Product: "*",
+}
+
+
+class PythonContext(Context):
+    """
+    A context for emitting the body of a Python function which evaluates a
+    CalcLangExpression with Python operators, so that it works on scalars and
+    NumPy arrays alike. Literals, and the functions used for operators Python
+    does not evaluate as the interpreter does, are referenced through names
+    bound in `constants`, so that values of any type can be used.
+    """
+
+    def __init__(self, tab="    ", indent=0, constants=None, **kwargs):
+        super().__init__(**kwargs)
+        self.tab = tab
+        self.indent = indent
+        self.constants: dict[str, Any] = constants if constants is not None else {}
+
+    @property
+    def feed(self) -> str:
+        return self.tab * self.indent
+
+    def emit(self):
+        return "\n".join([*self.preamble, *self.epilogue])
+
+    def block(self) -> "PythonContext":
+        blk = super().block()
+        blk.indent = self.indent
+        blk.tab = self.tab
+        blk.constants = self.constants
+        return blk
+
+    def subblock(self):
+        blk = self.block()
+        blk.indent = self.indent + 1
+        return blk
+
+    def function(self, fn: Callable) -> str:
+        """Returns the name bound to `fn` in `constants`, binding one if needed."""
+        for name, value in self.constants.items():
+            if value is fn:
+                return name
+        name = self.freshen(fn.__name__)
+        self.constants[name] = fn
+        return name
+
+    def __call__(self, prgm: CalcLangExpression, variables: dict[str, str]) -> str:
+        """
+        Emits statements computing `prgm`, assigning one temporary per distinct
+        subtree, and returns the Python expression holding its value.
+        `variables` maps the variables of `prgm` to the Python expressions
+        holding their values.
+        """
+        names: dict[int, str] = {}
+        for node in PostOrderDAG(prgm):
+            match node:
+                case Literal(value):
+                    name = self.freshen("c")
+                    self.constants[name] = value
+                    names[id(node)] = name
+                case Variable(name):
+                    names[id(node)] = variables[name]
+                case Add(left, right) | Sub(left, right) | Mul(left, right):
+                    op = _OPERATORS[type(node)]
+                    expr = f"{names[id(left)]} {op} {names[id(right)]}"
+                case Pow(base, exponent):
+                    fn = self.function(power)
+                    expr = f"{fn}({names[id(base)]}, {names[id(exponent)]})"
+                case Sum(args) | Product(args):
+                    op = _OPERATORS[type(node)]
+                    identity = "0" if isinstance(node, Sum) else "1"
+                    expr = f" {op} ".join(names[id(arg)] for arg in args) or identity
+                case _:
+                    raise NotImplementedError(
+                        f"Unrecognized assembly node type: {type(node)}"
+                    )
+            if id(node) not in names:
+                name = self.freshen("t")
+                self.exec(f"{self.feed}{name} = {expr}")
+                names[id(node)] = name
+        return names[id(prgm)]
+
+
+def python_kernel_source(
+    prgm: CalcLangExpression, variables: list[str]
+) -> tuple[str, dict[str, Any]]:
+    """
+    Returns the source of a Python function `calc_kernel` which evaluates
+    `prgm`, taking the values of `variables` as positional arguments, together
+    with the constants the source refers to.
+    """
+    ctx = PythonContext()
+    body = ctx.subblock()
+    params = {var: ctx.freshen("v") for var in variables}
+    result = body(prgm, params)
+    body.exec(f"{body.feed}return {result}")
+    ctx.exec(f"def calc_kernel({', '.join(params.values())}):")
+    ctx.exec(body.emit())
+    return ctx.emit() + "\n", ctx.constants
+
+
+def compile_python_kernel(prgm: CalcLangExpression) -> Callable:
+    """
+    Compiles `prgm` into a Python function of a dictionary of bindings, which
+    evaluates it without walking the tree.
+    """
+    names = (node.name for node in PostOrderDAG(prgm) if isinstance(node, Variable))
+    variables = list(dict.fromkeys(names))
+    source, constants = python_kernel_source(prgm, variables)
+    namespace = dict(constants)
+    exec(compile(source, "<calc_kernel>", "exec"), namespace)
+    kernel = namespace["calc_kernel"]
+
+    def run(bindings):
+        for var in variables:
+            if var not in bindings:
+                raise KeyError(
+                    f"Variable '{var}' is not defined in the current context."
+                )
+        return kernel(*(bindings[var] for var in variables))
+
+    return run
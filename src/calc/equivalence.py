@@ -0,0 +1,297 @@
+"""
+Randomized equivalence checking and deduplication of expressions.
+
+Two expressions are compared by evaluating both at random points instead of
+normalizing them. Rational functions of the variables, i.e. expressions whose
+exponents are constant integers, are evaluated exactly modulo a large prime
+`p`: by the Schwartz-Zippel lemma, two different polynomials of degree at most
+`d` agree at a uniformly random point with probability at most `d / p`, so
+agreement at `trials` independent points is wrong with probability at most
+`(d / p) ** trials`. Float literals are taken at their exact binary values.
+Other expressions are evaluated in floating point at random points drawn from
+several ranges, positive and signed, and compared up to rounding. They must be
+defined, i.e. finite, at the same points, and at enough of them to compare;
+otherwise they are not considered equivalent.
+
+Each expression of a batch is evaluated at all of its points at once, and
+subtrees shared between the expressions of a batch are evaluated only once, so
+thousands of expressions are fingerprinted in one vectorized pass.
+"""
+
+from collections.abc import Hashable, Iterable, Sequence
+from fractions import Fraction
+from numbers import Rational, Real
+from typing import Any
+
+import numpy as np
+
+from .calc_lang import (
+    Add,
+    CalcLangExpression,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+    Variable,
+)
+from .symbolic import PostOrderDAG
+
+# The largest prime below 2**31, so that products of residues fit in an int64.
+PRIME = 2**31 - 1
+
+# The ranges from which `trials` float points each are drawn. Expressions such as
+# `(x - 5) ^ 0.5` are undefined on the first ranges, but not on the last ones.
+FLOAT_DOMAINS = ((0.5, 2.0), (-2.0, 2.0), (-20.0, 20.0), (-1000.0, 1000.0))
+
+
+def _min_defined(trials: int) -> int:
+    """The number of points at which float values must be defined to compare."""
+    return max(1, trials // 4)
+
+
+def _residue(value) -> int:
+    """Returns `value` modulo `PRIME`, if it is a finite real number."""
+    if not isinstance(value, Real) or not np.isfinite(float(value)):
+        raise ValueError(f"Cannot evaluate {value!r} modulo a prime")
+    fraction = Fraction(value if isinstance(value, Rational) else float(value))
+    return fraction.numerator * pow(fraction.denominator, -1, PRIME) % PRIME
+
+
+def _power(base: np.ndarray, exponent: int) -> np.ndarray:
+    """Returns `base ** exponent` modulo `PRIME`, by repeated squaring."""
+    if exponent < 0:
+        if np.any(base == 0):
+            raise ZeroDivisionError("Zero to a negative power")
+        base, exponent = _power(base, PRIME - 2), -exponent
+    result = np.ones_like(base)
+    while exponent:
+        if exponent & 1:
+            result = result * base % PRIME
+        base = base * base % PRIME
+        exponent >>= 1
+    return result
+
+
+def _integer_exponent(node: CalcLangExpression) -> int:
+    """Returns the value of the exponent `node`, if it is a constant integer."""
+    if node.is_constant:
+        value: Any = CalcLangInterpreter()(node)
+        if isinstance(value, Real) and float(value).is_integer():
+            return int(value)  # type: ignore[call-overload]
+    raise ValueError(f"Cannot evaluate a power to {node} modulo a prime")
+
+
+def field_values(
+    exprs: Iterable[CalcLangExpression], points: dict[str, np.ndarray]
+) -> list[np.ndarray | None]:
+    """
+    Evaluates each of `exprs` modulo `PRIME` with variables bound to `points`,
+    which are arrays of residues, returning `None` for expressions which are
+    not rational functions. Subtrees shared between expressions are evaluated
+    once.
+    """
+    values: dict[int, np.ndarray | None] = {}
+    results = []
+    for expr in exprs:
+        for node in PostOrderDAG(expr):
+            if id(node) in values:
+                continue
+            args = [values[id(arg)] for arg in getattr(node, "children", ())]
+            try:
+                if any(arg is None for arg in args):
+                    raise ValueError("Unsupported subexpression")
+                values[id(node)] = _field_op(node, args, points)
+            except (ValueError, ArithmeticError):
+                values[id(node)] = None
+        results.append(values[id(expr)])
+    return results
+
+
+def _field_op(node, args, points) -> Any:
+    match node:
+        case Literal(value):
+            return np.int64(_residue(value))
+        case Variable(name):
+            return points[name]
+        case Add():
+            return (args[0] + args[1]) % PRIME
+        case Sub():
+            return (args[0] - args[1]) % PRIME
+        case Mul():
+            return args[0] * args[1] % PRIME
+        case Pow(_, exponent):
+            return _power(args[0], _integer_exponent(exponent))
+        case Sum():
+            return sum(args, np.int64(0)) % PRIME
+        case Product():
+            result = np.int64(1)
+            for arg in args:
+                result = result * arg % PRIME
+            return result
+        case _:
+            raise NotImplementedError(f"Unrecognized assembly node type: {type(node)}")
+
+
+def float_values(
+    exprs: Iterable[CalcLangExpression], points: dict[str, np.ndarray]
+) -> list[np.ndarray]:
+    """
+    Evaluates each of `exprs` in floating point with variables bound to
+    `points`. Subtrees shared between expressions are evaluated once.
+    """
+    values: dict[int, np.ndarray] = {}
+    results = []
+    with np.errstate(all="ignore"):
+        for expr in exprs:
+            for node in PostOrderDAG(expr):
+                if id(node) in values:
+                    continue
+                args = [values[id(arg)] for arg in getattr(node, "children", ())]
+                match node:
+                    case Literal(value):
+                        value = np.asarray(value, dtype=float)
+                    case Variable(name):
+                        value = points[name]
+                    case Add():
+                        value = args[0] + args[1]
+                    case Sub():
+                        value = args[0] - args[1]
+                    case Mul():
+                        value = args[0] * args[1]
+                    case Pow():
+                        value = np.power(args[0], args[1])
+                    case Sum():
+                        value = sum(args, np.float64(0))
+                    case Product():
+                        value = np.prod(np.broadcast_arrays(*args), axis=0)
+                    case _:
+                        raise NotImplementedError(
+                            f"Unrecognized assembly node type: {type(node)}"
+                        )
+                values[id(node)] = value
+            results.append(values[id(expr)])
+    return results
+
+
+def random_points(
+    names: Iterable[str], trials: int, rng: np.random.Generator
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """
+    Returns `trials` random residues, and `trials` random floats from each of
+    `FLOAT_DOMAINS`, for each variable in `names`, sorted so that the same names
+    receive the same points from the same generator.
+    """
+    names = sorted(set(names))
+    residues = {name: rng.integers(1, PRIME, size=trials) for name in names}
+    floats = {
+        name: np.concatenate(
+            [rng.uniform(lo, hi, size=trials) for lo, hi in FLOAT_DOMAINS]
+        )
+        for name in names
+    }
+    return residues, floats
+
+
+def _float_key(values: np.ndarray, trials: int) -> Hashable | None:
+    """
+    Returns a key of the float `values`, or `None` if too few of them are
+    finite. Values are rounded to 8 significant digits, so that values
+    differing only by rounding errors usually get the same key, and undefined
+    values are only matched by undefined values at the same position.
+    """
+    if np.count_nonzero(np.isfinite(values)) < _min_defined(trials):
+        return None
+    return tuple(float(f"{v:.7e}") if np.isfinite(v) else None for v in values)
+
+
+def _float_equal(x, y, trials: int, rtol: float, atol: float) -> bool:
+    """
+    Whether `x` and `y` are finite at the same positions, at enough of them,
+    and close at those positions.
+    """
+    defined = np.isfinite(x)
+    if np.any(defined != np.isfinite(y)):
+        return False
+    if np.count_nonzero(defined) < _min_defined(trials):
+        return False
+    return bool(np.allclose(x[defined], y[defined], rtol=rtol, atol=atol))
+
+
+def fingerprints(
+    exprs: Sequence[CalcLangExpression],
+    trials: int = 8,
+    rng: np.random.Generator | None = None,
+) -> list[Hashable]:
+    """
+    Returns a fingerprint of each of `exprs`: the values of rational functions
+    at `trials` random points modulo `PRIME`, or the rounded values of other
+    expressions at random real points. Equivalent expressions have equal
+    fingerprints, except for rounding near the boundaries of the rounded
+    values, and expressions with equal fingerprints are equivalent with high
+    probability. Expressions undefined at too many points get a fingerprint of
+    their own.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    names = set().union(*(expr.free_variables for expr in exprs))
+    residues, floats = random_points(names, trials, rng)
+    exact = field_values(exprs, residues)
+    inexact = [i for i, values in enumerate(exact) if values is None]
+    approximate = dict(
+        zip(inexact, float_values([exprs[i] for i in inexact], floats), strict=True)
+    )
+    n = trials * len(FLOAT_DOMAINS)
+    keys: list[Hashable] = []
+    for i, values in enumerate(exact):
+        if values is not None:
+            keys.append(("exact", np.broadcast_to(values, (trials,)).tobytes()))
+            continue
+        key = _float_key(np.broadcast_to(approximate[i], (n,)), trials)
+        keys.append(("float", key) if key is not None else ("undefined", i))
+    return keys
+
+
+def equivalent(
+    a: CalcLangExpression,
+    b: CalcLangExpression,
+    trials: int = 8,
+    rng: np.random.Generator | None = None,
+    rtol: float = 1e-9,
+    atol: float = 1e-12,
+) -> bool:
+    """
+    Returns whether `a` and `b` are equivalent, by evaluating both at `trials`
+    random points. If both are rational functions, they are compared exactly
+    modulo `PRIME`; otherwise they are compared in floating point, up to a
+    relative tolerance of `rtol` and an absolute tolerance of `atol`, and must
+    be defined at the same points. Expressions defined at too few of the
+    points are not considered equivalent to anything.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    residues, floats = random_points(a.free_variables | b.free_variables, trials, rng)
+    x, y = field_values([a, b], residues)
+    if x is not None and y is not None:
+        return bool(np.all(x == y))
+    n = trials * len(FLOAT_DOMAINS)
+    x, y = (np.broadcast_to(v, (n,)) for v in float_values([a, b], floats))
+    return _float_equal(x, y, trials, rtol, atol)
+
+
+def deduplicate(
+    exprs: Sequence[CalcLangExpression],
+    trials: int = 8,
+    rng: np.random.Generator | None = None,
+) -> list[list[int]]:
+    """
+    Groups the indices of equivalent expressions of `exprs` by their
+    `fingerprints`. The groups, and the indices within each group, are in
+    order of first occurrence, so the first index of each group may be taken as
+    its representative. Rational functions are only grouped with rational
+    functions.
+    """
+    groups: dict[Hashable, list[int]] = {}
+    for i, key in enumerate(fingerprints(exprs, trials, rng)):
+        groups.setdefault(key, []).append(i)
+    return list(groups.values())
@@ -0,0 +1,15 @@
+"""
+The front end shared by the command line pipeline and the evaluation service,
+which turns the source of an expression into a program ready to evaluate.
+"""
+
+from .normalize import normalize
+from .parse import parse
+
+
+def compile_expression(expr: str, parser=parse, normalizer=normalize):
+    """Parses and normalizes the expression `expr`."""
+    prgm = parser(expr)
+    if normalizer is not None:
+        prgm = normalizer(prgm)
+    return prgm
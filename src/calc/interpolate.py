@@ -0,0 +1,170 @@
+"""
+Normalization of univariate polynomials by evaluation and interpolation.
+
+Expanding a product of many sums symbolically creates a number of terms which
+grows exponentially with the number of factors, before like terms are
+collected. The coefficients of a polynomial of degree `d` are instead
+determined by its values at any `d + 1` points, which can be computed in one
+vectorized evaluation of the unexpanded expression. The values at the points
+`0, 1, ..., d` are computed and interpolated with Newton's divided differences
+in exact rational arithmetic, so that polynomials with integer literals get
+exactly their integer coefficients back, and polynomials with float literals
+get their coefficients correctly rounded. Floating point interpolation at
+equally spaced points would be badly conditioned.
+"""
+
+import math
+import time
+from fractions import Fraction
+from numbers import Rational, Real
+from typing import Any
+
+import numpy as np
+
+from .calc_lang import (
+    Add,
+    CalcLangExpression,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Variable,
+)
+from .calc_lang.nodes import CalcLangTree
+from .symbolic import PostOrderDAG, RewriteBudgetExceeded
+
+# The highest degree normalized by interpolation, whose cost grows roughly with
+# the cube of the degree.
+MAX_DEGREE = 256
+
+
+def _exact(v) -> bool:
+    """Whether `v` is a finite real number, which `Fraction` represents exactly."""
+    return isinstance(v, Rational) or (isinstance(v, Real) and math.isfinite(v))
+
+
+def polynomial_form(var: str, coefficients: list) -> CalcLangExpression:
+    """
+    Returns the normal form of the polynomial in `var` whose coefficient of
+    `var ** i` is `coefficients[i]`, i.e.
+        ... ((a * x^2) + ((b * x) + c))
+    which is accepted by `normalize.is_normalized`. Zero coefficients of the
+    highest powers are dropped.
+    """
+    coefficients = list(coefficients)
+    while len(coefficients) > 1 and coefficients[-1] == 0:
+        coefficients.pop()
+    x = Variable(var)
+    result: CalcLangExpression = Literal(coefficients[0])
+    for n, c in enumerate(coefficients[1:], start=1):
+        term = Mul(Literal(c), x if n == 1 else Pow(x, Literal(n)))
+        result = Add(term, result)
+    return result
+
+
+def _check_deadline(deadline: float | None) -> None:
+    if deadline is not None and time.monotonic() > deadline:
+        raise RewriteBudgetExceeded("time_limit", None, 0)
+
+
+def interpolate(values: list, deadline: float | None = None) -> list[Fraction]:
+    """
+    Returns the coefficients, lowest degree first, of the polynomial of least
+    degree taking the rational `values` at the points `0, 1, ..., n - 1`.
+    Raises `RewriteBudgetExceeded` if the `time.monotonic()` `deadline` passes.
+    """
+    n = len(values)
+    # Divided differences on equally spaced points.
+    diffs = [Fraction(v) for v in values]
+    newton = [diffs[0]]
+    for k in range(1, n):
+        _check_deadline(deadline)
+        diffs = [(b - a) / k for a, b in zip(diffs, diffs[1:], strict=False)]
+        newton.append(diffs[0])
+    # Expand sum(newton[k] * x * (x - 1) * ... * (x - k + 1)) by Horner's rule.
+    coefficients = [newton[-1]]
+    for k in reversed(range(n - 1)):
+        _check_deadline(deadline)
+        # coefficients * (x - k) + newton[k]
+        shifted = [Fraction(0), *coefficients]
+        for i, c in enumerate(coefficients):
+            shifted[i] -= k * c
+        shifted[0] += newton[k]
+        coefficients = shifted
+    return coefficients
+
+
+def has_exact_literals(node: CalcLangExpression) -> bool:
+    """Whether every literal of `node` is an integer or a rational number."""
+    return all(
+        isinstance(x.val, Rational)
+        for x in PostOrderDAG(node)
+        if isinstance(x, Literal)
+    )
+
+
+def _rational_literals(node: CalcLangExpression) -> CalcLangExpression:
+    """Returns `node` with its literals made `Fraction`s, so that powers stay exact."""
+    results: dict[int, Any] = {}
+    for x in PostOrderDAG(node):
+        if isinstance(x, Literal):
+            results[id(x)] = Literal(Fraction(x.val))
+        elif isinstance(x, CalcLangTree):
+            args = [results[id(arg)] for arg in x.children]
+            results[id(x)] = x.make_term(x.head(), *args)
+        else:
+            results[id(x)] = x
+    return results[id(node)]
+
+
+def polynomial_size(degree: int) -> int:
+    """The number of nodes of the result of `polynomial_form` of `degree`."""
+    return 1 + 4 * min(degree, 1) + 6 * max(degree - 1, 0)
+
+
+def normalize_by_interpolation(
+    node: CalcLangExpression,
+    max_degree: int = MAX_DEGREE,
+    node_limit: int | None = None,
+    deadline: float | None = None,
+) -> CalcLangExpression | None:
+    """
+    Normalizes `node` by interpolating its values, if it is a polynomial in at
+    most one variable with real literals, of degree at most `max_degree`.
+    Otherwise, returns `None`. Raises `RewriteBudgetExceeded` if the result
+    would have more than `node_limit` nodes, or if the `time.monotonic()`
+    `deadline` passes.
+
+    The values are computed in exact rational arithmetic, taking float literals
+    at their exact binary values, so interpolation loses no accuracy. If every
+    literal is rational, the coefficients are integers where possible and
+    `Fraction`s otherwise; if not, they are rounded to floats.
+    """
+    degrees = node.degrees
+    if degrees is None or len(degrees) > 1:
+        return None
+    literals = [x.val for x in PostOrderDAG(node) if isinstance(x, Literal)]
+    if not all(_exact(v) for v in literals):
+        return None
+    var, degree = next(iter(degrees.items()), ("x", 0))
+    if degree > max_degree:
+        return None
+    if node_limit is not None and polynomial_size(degree) > node_limit:
+        raise RewriteBudgetExceeded("node_limit", None, 0)
+    _check_deadline(deadline)
+    points = np.array([Fraction(i) for i in range(degree + 1)], dtype=object)
+    values = np.broadcast_to(
+        np.asarray(
+            CalcLangInterpreter()(_rational_literals(node), {var: points}),
+            dtype=object,
+        ),
+        points.shape,
+    )
+    if not all(isinstance(v, Rational) for v in values):
+        return None
+    coefficients = interpolate(list(values), deadline)
+    if all(isinstance(v, Rational) for v in literals):
+        return polynomial_form(
+            var, [int(c) if c.denominator == 1 else c for c in coefficients]
+        )
+    return polynomial_form(var, [float(c) for c in coefficients])
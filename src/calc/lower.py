@@ -0,0 +1,48 @@
+from .calc_lang import CalcLangExpression, Literal, Mul, Pow
+from .symbolic import PostOrderDAG, Term, TermTree
+
+
+class PowerChains:
+    """
+    Builds the powers of one base as a chain of multiplications. Every power
+    built is remembered, so later powers reuse the products computed for earlier
+    ones (e.g. `x^4` squares the `x^2` built for another term).
+    """
+
+    def __init__(self, base: CalcLangExpression):
+        self.powers: dict[int, CalcLangExpression] = {1: base}
+
+    def __call__(self, n: int) -> CalcLangExpression:
+        if n not in self.powers:
+            if n % 2 == 0:
+                half = self(n // 2)
+                self.powers[n] = Mul(half, half)
+            else:
+                self.powers[n] = Mul(self(n - 1), self.powers[1])
+        return self.powers[n]
+
+
+def lower_powers(node: CalcLangExpression) -> CalcLangExpression:
+    """
+    Rewrites every `Pow(base, Literal(n))` with an integer `n >= 1` into
+    multiplications by exponentiation by squaring, `x^1` becoming `x`. Powers of
+    the same base share their intermediate products across the whole
+    expression, so the result is a DAG in which each distinct power is computed
+    once by evaluators which respect sharing, such as `CalcLangInterpreter`.
+    """
+    chains: dict[CalcLangExpression, PowerChains] = {}
+    lowered: dict[int, Term] = {}
+    for orig in PostOrderDAG(node):
+        x = orig
+        if isinstance(x, TermTree):
+            args = [lowered[id(arg)] for arg in x.children]
+            if any(new is not old for new, old in zip(args, x.children, strict=True)):
+                x = x.make_term(x.head(), *args)
+        y: Term
+        match x:
+            case Pow(base, Literal(int(n))) if n >= 1:
+                y = chains.setdefault(base, PowerChains(base))(n)
+            case _:
+                y = x
+        lowered[id(orig)] = y
+    return lowered[id(node)]  # type: ignore[return-value]
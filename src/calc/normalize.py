@@ -1,18 +1,122 @@
+import time
+from collections.abc import Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from numbers import Rational, Real
+
 from .calc_lang import (  # noqa: F401
     Add,
     CalcLangExpression,
+    CalcLangInterpreter,
     Literal,
     Mul,
     Pow,
     Sub,
     Variable,
 )
-from .symbolic import Chain, Fixpoint, PostWalk, Rewrite  # noqa: F401
+from .calc_lang.nodes import CalcLangTree
+from .interpolate import MAX_DEGREE, has_exact_literals, normalize_by_interpolation
+from .symbolic import (  # noqa: F401
+    Chain,
+    Fixpoint,
+    PostWalk,
+    Rewrite,
+    RewriteBudgetExceeded,
+)
+
+# The largest number of bits of an exact power folded into a literal.
+FOLD_BITS = 4096
+
+
+def _bits(value) -> float:
+    """The number of bits of the numerator and denominator of a rational `value`."""
+    if isinstance(value, Rational):
+        return (
+            int(abs(value.numerator)).bit_length() + int(value.denominator).bit_length()
+        )
+    return 64
 
 
-def normalize(node: CalcLangExpression):
+def _small_power(base, exponent) -> bool:
+    """Whether `base ** exponent` is cheap to compute and store exactly."""
+    if not isinstance(base, Real) or not isinstance(exponent, Real):
+        return False
+    if not isinstance(base, Rational) or base in (0, 1, -1):
+        return True
+    try:
+        return abs(float(exponent)) * _bits(base) <= FOLD_BITS
+    except OverflowError:
+        return False
+
+
+def _fold(node: CalcLangTree):
+    """
+    Evaluates a constant node whose arguments are literals into a literal,
+    unless it cannot be, its value is not real, or it is a power too large to
+    compute, which is left unevaluated.
+    """
+    args = node.children
+    if not all(isinstance(arg, Literal) for arg in args):
+        return None
+    if isinstance(node, Pow) and not _small_power(args[0].val, args[1].val):
+        return None
+    try:
+        value = CalcLangInterpreter()(node)
+    except ArithmeticError:
+        return None
+    return Literal(value) if isinstance(value, Real) else None
+
+
+def normalize(
+    node: CalcLangExpression,
+    iter_limit: int | None = None,
+    node_limit: int | None = None,
+    time_limit: float | None = None,
+    partial: bool = False,
+    strategy: str = "auto",
+    interpolation_degree: int = 8,
+    max_interpolation_degree: int = MAX_DEGREE,
+):
+    """
+    Normalizes `node`. The rewriting may be limited to `iter_limit` passes over
+    the expression, to intermediate expressions of at most `node_limit` nodes,
+    and to `time_limit` seconds. When a limit is exceeded,
+    `RewriteBudgetExceeded` is raised, or, if `partial` is set, the partially
+    normalized expression is returned.
+
+    The `strategy` is "rewrite", "interpolate" or "auto". Polynomials in one
+    variable may be normalized by evaluating them and interpolating their
+    coefficients instead of rewriting, which avoids expanding large products of
+    sums; "auto" does so when the degree is at least `interpolation_degree`
+    and every literal is rational, so that the coefficients are exact. Other
+    expressions, and polynomials of degree above `max_interpolation_degree`,
+    are always rewritten. Interpolation is subject to the same `node_limit`
+    and `time_limit` as rewriting, and makes no partial progress, so a partial
+    result of it is `node` itself.
+    """
+    if strategy not in ("auto", "rewrite", "interpolate"):
+        raise ValueError(f"Unknown normalization strategy: {strategy!r}")
+    if strategy == "interpolate" or (
+        strategy == "auto"
+        and node.degrees is not None
+        and max(node.degrees.values(), default=0) >= interpolation_degree
+        and has_exact_literals(node)
+    ):
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        try:
+            result = normalize_by_interpolation(
+                node, max_interpolation_degree, node_limit, deadline
+            )
+        except RewriteBudgetExceeded as e:
+            if partial:
+                return node
+            raise RewriteBudgetExceeded(e.reason, node, e.iterations) from None
+        if result is not None:
+            return result
+
     def rewrite(node: CalcLangExpression):
         match node:
+            case Add() | Sub() | Mul() | Pow() if node.is_constant:
+                return _fold(node)
             case Add(Literal(x), Literal(y)):
                 return Literal(x + y)
             case Mul(Add(a, b), c):
@@ -24,7 +128,32 @@ def normalize(node: CalcLangExpression):
             case _:
                 return None
 
-    return Rewrite(Fixpoint(PostWalk(rewrite)))(node)
+    fixpoint = Fixpoint(
+        PostWalk(rewrite),
+        iter_limit=iter_limit,
+        node_limit=node_limit,
+        time_limit=time_limit,
+        partial=partial,
+    )
+    return Rewrite(fixpoint)(node)
+
+
+def normalize_all(
+    nodes: Iterable[CalcLangExpression],
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+    **kwargs,
+) -> list:
+    """
+    Normalizes each of `nodes` with `normalize(node, **kwargs)` on a pool of
+    `max_workers` threads, or on `executor` if one is given, returning the
+    results in order. Threads share the expressions without copying them, and
+    run in parallel on free-threaded builds of Python.
+    """
+    if executor is not None:
+        return list(executor.map(lambda node: normalize(node, **kwargs), nodes))
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(lambda node: normalize(node, **kwargs), nodes))
 
 
 def _is_normalized(node: CalcLangExpression):
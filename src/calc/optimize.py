@@ -0,0 +1,148 @@
+import math
+from numbers import Real
+
+from .calc_lang import (
+    Add,
+    CalcLangExpression,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+)
+from .symbolic import EGraph
+
+
+def mul_count(head, child_costs):
+    """
+    A cost model for evaluation: the number of multiplications, counting a
+    power as two, with the number of nodes as a tie-breaker.
+    """
+    if head is Product:
+        muls = max(len(child_costs) - 1, 0)
+    else:
+        muls = {Mul: 1, Pow: 2}.get(head, 0) if isinstance(head, type) else 0
+    return (
+        muls + sum(c[0] for c in child_costs),
+        1 + sum(c[1] for c in child_costs),
+    )
+
+
+def commute(node: CalcLangExpression):
+    match node:
+        case Add(a, b):
+            return Add(b, a)
+        case Mul(a, b):
+            return Mul(b, a)
+        case _:
+            return None
+
+
+def associate(node: CalcLangExpression):
+    match node:
+        case Add(Add(a, b), c):
+            return Add(a, Add(b, c))
+        case Add(a, Add(b, c)):
+            return Add(Add(a, b), c)
+        case Mul(Mul(a, b), c):
+            return Mul(a, Mul(b, c))
+        case Mul(a, Mul(b, c)):
+            return Mul(Mul(a, b), c)
+        case _:
+            return None
+
+
+def distribute(node: CalcLangExpression):
+    match node:
+        case Mul(a, Add(b, c)):
+            return Add(Mul(a, b), Mul(a, c))
+        case Mul(a, Sub(b, c)):
+            return Sub(Mul(a, b), Mul(a, c))
+        case _:
+            return None
+
+
+def factor(node: CalcLangExpression):
+    match node:
+        case Add(Mul(a, b), Mul(c, d)) if a == c:
+            return Mul(a, Add(b, d))
+        case Sub(Mul(a, b), Mul(c, d)) if a == c:
+            return Mul(a, Sub(b, d))
+        case _:
+            return None
+
+
+def powers(node: CalcLangExpression):
+    match node:
+        case Mul(a, b) if a == b:
+            return Pow(a, Literal(2))
+        case Mul(a, Pow(b, Literal(int(n)))) if a == b:
+            return Pow(a, Literal(n + 1))
+        case Mul(Pow(a, Literal(int(m))), Pow(b, Literal(int(n)))) if a == b:
+            return Pow(a, Literal(m + n))
+        case Pow(a, Literal(int(n))) if n >= 2:
+            return Mul(a, Pow(a, Literal(n - 1)))
+        case _:
+            return None
+
+
+def _finite_scalar(node: CalcLangExpression) -> bool:
+    """Whether `node` is a literal finite real number."""
+    match node:
+        case Literal(value):
+            return isinstance(value, Real) and math.isfinite(value)
+        case _:
+            return False
+
+
+def identities(node: CalcLangExpression):
+    match node:
+        case Add(Literal(0), a) | Sub(a, Literal(0)):
+            return a
+        case Mul(Literal(1), a) | Pow(a, Literal(1)):
+            return a
+        # Only finite scalars are annihilated, as `0 * a` and `a - a` are arrays
+        # for arrays `a`, and nan for infinite or nan `a`.
+        case Mul(Literal(0), a) if _finite_scalar(a):
+            return Literal(0)
+        case Sub(a, b) if a == b and _finite_scalar(a):
+            return Literal(0)
+        case _:
+            return None
+
+
+def fold(node: CalcLangExpression):
+    match node:
+        case Add(Literal(a), Literal(b)):
+            return Literal(a + b)
+        case Sub(Literal(a), Literal(b)):
+            return Literal(a - b)
+        case Mul(Literal(a), Literal(b)):
+            return Literal(a * b)
+        case Pow(Literal(a), Literal(int(b))) if 0 <= b <= 64:
+            return Literal(a**b)
+        case _:
+            return None
+
+
+rules = [commute, associate, distribute, factor, powers, identities, fold]
+
+
+def optimize(
+    node: CalcLangExpression,
+    rules=rules,
+    cost=mul_count,
+    time_limit: float | None = 1.0,
+    **budget,
+) -> CalcLangExpression:
+    """
+    Find a cheap expression equivalent to `node` by equality saturation.
+    `rules` are rewriters to saturate with, `cost` is a cost model as accepted
+    by `EGraph.extract`, and `budget` holds the other limits accepted by
+    `EGraph.saturate`. Saturation stops after `time_limit` seconds, which
+    bounds the run time, as the rules are not guaranteed to saturate.
+    """
+    egraph = EGraph()
+    root = egraph.add(node)
+    egraph.saturate(rules, time_limit=time_limit, **budget)
+    return egraph.extract(root, cost)  # type: ignore[return-value]
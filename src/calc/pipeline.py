@@ -0,0 +1,194 @@
+"""
+A streaming pipeline which parses, normalizes and evaluates CALC expressions,
+and the `python -m calc` command line interface built on it.
+
+Each input line is either an expression, such as `x + 1`, or a JSON object of
+the form `{"expr": "x + 1", "bindings": {"x": 2}}`. Lines are grouped into
+chunks, which worker processes, or threads, take through all three stages, so
+every stage runs in parallel on different chunks. Threads avoid the cost of
+starting processes and pickling chunks, and run in parallel on free-threaded
+builds of Python. At most `max_pending` chunks are in flight at once: reading
+blocks until the oldest chunk is written out, so memory use stays constant
+however long the input is, and results are written in the order of the input.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any
+
+from .calc_lang import CalcLangInterpreter
+from .frontend import compile_expression
+
+
+@lru_cache(maxsize=1024)
+def _compile(expr: str, normalize: bool):
+    """Compiles `expr`, reusing the programs of recently seen expressions."""
+    if normalize:
+        return compile_expression(expr)
+    return compile_expression(expr, normalizer=None)
+
+
+def _jsonable(value: Any) -> Any:
+    return value.tolist() if hasattr(value, "tolist") else value
+
+
+def _error(e: Exception) -> dict[str, Any]:
+    # Keep one line of output per line of input.
+    message = " ".join(str(e).split())
+    return {"error": f"{type(e).__name__}: {message}"}
+
+
+def evaluate_line(
+    line: str, bindings: dict[str, Any] | None = None, normalize: bool = True
+) -> dict[str, Any]:
+    """
+    Parses, normalizes and evaluates one line of input, returning a dictionary
+    holding either its `value` or an `error`. Bindings given in the line take
+    precedence over `bindings`.
+    """
+    try:
+        expr = line.strip()
+        local = dict(bindings) if bindings is not None else {}
+        if expr.startswith("{"):
+            request = json.loads(expr)
+            expr = request["expr"]
+            local.update(request.get("bindings") or {})
+        prgm = _compile(expr, normalize)
+        value = CalcLangInterpreter()(prgm, local)
+    except Exception as e:  # noqa: BLE001
+        return _error(e)
+    return {"value": _jsonable(value)}
+
+
+def evaluate_chunk(
+    lines: list[str], bindings: dict[str, Any] | None = None, normalize: bool = True
+) -> list[dict[str, Any]]:
+    """Evaluates a chunk of lines with `evaluate_line`."""
+    return [evaluate_line(line, bindings, normalize) for line in lines]
+
+
+def run_pipeline(
+    lines: Iterable[str],
+    bindings: dict[str, Any] | None = None,
+    normalize: bool = True,
+    executor: Executor | None = None,
+    chunk_size: int = 256,
+    max_pending: int = 16,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yields the result of each nonblank line of `lines`, in order. Chunks of
+    `chunk_size` lines are evaluated in `executor`, or in this process if it
+    is `None`, with at most `max_pending` chunks submitted but not yet yielded.
+    """
+    lines = (line for line in lines if line.strip())
+    chunks = iter(lambda: list(itertools.islice(lines, chunk_size)), [])
+    if executor is None:
+        for chunk in chunks:
+            yield from evaluate_chunk(chunk, bindings, normalize)
+        return
+    pending: deque = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(evaluate_chunk, chunk, bindings, normalize))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def format_result(result: dict[str, Any], output: str) -> str:
+    """
+    Formats `result` as a line of `output`, "text" or "json". A value which
+    cannot be written as JSON, such as a complex number, is replaced in
+    `result` by an error, as if it had failed to evaluate.
+    """
+    if output == "json":
+        try:
+            return json.dumps(result)
+        except (TypeError, ValueError) as e:
+            result.pop("value", None)
+            result.update(_error(e))
+            return json.dumps(result)
+    if "error" in result:
+        return f"error: {result['error']}"
+    return str(result["value"])
+
+
+def _read(paths: list[str]) -> Iterator[str]:
+    for path in paths:
+        if path == "-":
+            yield from sys.stdin
+        else:
+            with open(path) as f:
+                yield from f
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m calc",
+        description="Parse, normalize and evaluate CALC expressions, one per line.",
+    )
+    parser.add_argument(
+        "files", nargs="*", default=["-"], help="input files (default: stdin)"
+    )
+    parser.add_argument(
+        "-b",
+        "--bindings",
+        type=json.loads,
+        default={},
+        help="default variable bindings, as a JSON object, e.g. '{\"x\": 1}'",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: one per CPU; 0 for none)",
+    )
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="run the workers as threads rather than processes",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=256, help="lines per unit of work"
+    )
+    parser.add_argument(
+        "--max-pending", type=int, default=None, help="chunks in flight at once"
+    )
+    parser.add_argument(
+        "--no-normalize", action="store_true", help="skip the normalization stage"
+    )
+    parser.add_argument(
+        "-o", "--output", choices=["text", "json"], default="text", help="format"
+    )
+    args = parser.parse_args(argv)
+
+    workers = args.workers if args.workers is not None else os.cpu_count() or 1
+    pool = ThreadPoolExecutor if args.threads else ProcessPoolExecutor
+    executor = pool(workers) if workers > 0 else None
+    max_pending = args.max_pending or 2 * max(workers, 1)
+    failed = False
+    try:
+        results = run_pipeline(
+            _read(args.files),
+            args.bindings,
+            normalize=not args.no_normalize,
+            executor=executor,
+            chunk_size=args.chunk_size,
+            max_pending=max_pending,
+        )
+        for result in results:
+            line = format_result(result, args.output)
+            failed |= "error" in result
+            sys.stdout.write(line + "\n")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return 1 if failed else 0
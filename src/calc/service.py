@@ -0,0 +1,266 @@
+"""
+An asyncio service which evaluates CALC expressions for clients speaking
+line-delimited JSON over TCP or Unix sockets.
+
+Each request is a JSON object on its own line, of the form
+`{"id": 1, "expr": "x + 1", "bindings": {"x": 2}}`, and is answered by a line
+`{"id": 1, "value": 3}`, or `{"id": 1, "error": "..."}` if it failed. Responses
+are written as soon as they are ready, so they may arrive out of order.
+
+Concurrent requests for the same expression are coalesced into one batch and
+evaluated together over NumPy arrays of their bindings. Parsed and normalized
+programs are cached, and all parsing, normalization and evaluation runs in an
+executor, so the event loop stays responsive under bursty load.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor
+from typing import Any
+
+import numpy as np
+
+from .calc_lang import CalcLangExpression, CalcLangInterpreter
+from .frontend import compile_expression
+from .normalize import normalize
+from .parse import parse
+
+
+def _column(values: list) -> np.ndarray:
+    # Python ints and bools are kept as objects, so that they behave as they do
+    # when evaluated alone: ints do not overflow and bools add as integers.
+    if isinstance(values[0], int):
+        return np.array(values, dtype=object)
+    return np.array(values)
+
+
+def _item(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def _finite(values: np.ndarray) -> bool:
+    # NumPy gives nan and inf where Python raises or returns complex numbers,
+    # e.g. for `0.0 ** -1` or `(-4.0) ** 0.5`, so such batches are not trusted.
+    if values.dtype.kind in "fc":
+        return bool(np.isfinite(values).all())
+    if values.dtype.kind == "O":
+        return all(
+            np.isfinite(value)
+            for value in values
+            if isinstance(value, float | complex | np.inexact)
+        )
+    return True
+
+
+def evaluate_batch(
+    prgm: CalcLangExpression, batch: list[dict[str, Any]], interpreter=None
+) -> list[tuple[bool, Any]]:
+    """
+    Evaluates `prgm` under each of the bindings in `batch`, returning a pair
+    `(True, value)` or `(False, exception)` for each. Requests whose bindings
+    give scalars of the same types to the same variables are evaluated at once,
+    over arrays holding their bindings. A batch which fails, or gives any value
+    which is not finite, is evaluated again one request at a time, so that its
+    results are those of evaluating each request alone.
+    """
+    if interpreter is None:
+        interpreter = CalcLangInterpreter()
+    results: list[tuple[bool, Any] | None] = [None] * len(batch)
+    groups: dict[tuple, list[int]] = {}
+    for i, bindings in enumerate(batch):
+        try:
+            if not isinstance(bindings, dict):
+                raise TypeError(
+                    f"Bindings must be a dict, not {type(bindings).__name__}"
+                )
+            if all(np.ndim(v) == 0 for v in bindings.values()):
+                key = tuple(sorted((name, type(v)) for name, v in bindings.items()))
+                groups.setdefault(key, []).append(i)
+        except Exception as e:  # noqa: BLE001
+            results[i] = (False, e)
+    for key, indices in groups.items():
+        if len(indices) < 2:
+            continue
+        columns = {name: _column([batch[i][name] for i in indices]) for name, _ in key}
+        try:
+            with np.errstate(all="ignore"):
+                values = np.broadcast_to(interpreter(prgm, columns), (len(indices),))
+        except Exception:  # noqa: BLE001
+            # Evaluate one at a time below, to report errors per request.
+            continue
+        if not _finite(values):
+            continue
+        for i, value in zip(indices, values, strict=True):
+            results[i] = (True, _item(value))
+    for i, bindings in enumerate(batch):
+        if results[i] is not None:
+            continue
+        try:
+            results[i] = (True, _item(interpreter(prgm, bindings)))
+        except Exception as e:  # noqa: BLE001
+            results[i] = (False, e)
+    return results  # type: ignore[return-value]
+
+
+class EvaluationService:
+    """
+    Evaluates expressions on behalf of asyncio clients, coalescing concurrent
+    requests for the same expression into batched evaluations.
+
+    Attributes:
+        parser (Callable): Parses an expression string into a program.
+        normalizer (Callable | None): Normalizes programs before evaluation.
+        interpreter (Callable): Evaluates a program under some bindings.
+        executor (Executor | None): The executor for CPU work, or `None` for
+            the event loop's default executor.
+        batch_window (float): How long, in seconds, to wait for more requests
+            for an expression before evaluating a batch.
+        max_batch (int): The largest batch to wait for.
+        cache_size (int): The number of compiled programs to cache.
+        max_pending (int): The number of requests of one connection which may
+            be in progress at once. Further lines are not read until one of
+            them is answered.
+    """
+
+    def __init__(
+        self,
+        parser: Callable = parse,
+        normalizer: Callable | None = normalize,
+        interpreter: Callable | None = None,
+        executor: Executor | None = None,
+        batch_window: float = 0.001,
+        max_batch: int = 4096,
+        cache_size: int = 1024,
+        max_pending: int = 1024,
+    ):
+        self.parser = parser
+        self.normalizer = normalizer
+        self.interpreter = (
+            interpreter if interpreter is not None else CalcLangInterpreter()
+        )
+        self.executor = executor
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self.programs: OrderedDict[str, asyncio.Future] = OrderedDict()
+        self.pending: dict[str, list[tuple[dict[str, Any], asyncio.Future]]] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    async def evaluate(self, expr: str, bindings: dict[str, Any] | None = None):
+        """Evaluates the expression `expr` under `bindings`."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.pending.get(expr)
+        if batch is None:
+            batch = self.pending[expr] = []
+            loop.call_later(self.batch_window, self._flush, expr, batch)
+        batch.append((bindings if bindings is not None else {}, future))
+        if len(batch) >= self.max_batch:
+            self._flush(expr, batch)
+        return await future
+
+    def _flush(self, expr, batch):
+        if self.pending.get(expr) is batch:
+            del self.pending[expr]
+            task = asyncio.get_running_loop().create_task(self._run(expr, batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def compile(self, expr: str) -> CalcLangExpression:
+        """Returns the compiled program for `expr`, from the cache if possible."""
+        loop = asyncio.get_running_loop()
+        future = self.programs.get(expr)
+        if future is None:
+            future = loop.run_in_executor(
+                self.executor, compile_expression, expr, self.parser, self.normalizer
+            )
+            self.programs[expr] = future
+            while len(self.programs) > self.cache_size:
+                self.programs.popitem(last=False)
+        else:
+            self.programs.move_to_end(expr)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self.programs.get(expr) is future:
+                del self.programs[expr]
+            raise
+
+    async def _run(self, expr, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            prgm = await self.compile(expr)
+            results = await loop.run_in_executor(
+                self.executor,
+                evaluate_batch,
+                prgm,
+                [bindings for bindings, _ in batch],
+                self.interpreter,
+            )
+        except Exception as e:  # noqa: BLE001
+            results = [(False, e)] * len(batch)
+        for (_, future), (ok, value) in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    async def respond(self, line: bytes) -> dict[str, Any]:
+        """Answers one line of the protocol."""
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            value = await self.evaluate(request["expr"], request.get("bindings"))
+        except Exception as e:  # noqa: BLE001
+            return {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        return {"id": request_id, "value": value}
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves one client connection until it is closed."""
+        lock = asyncio.Lock()
+        pending = asyncio.Semaphore(self.max_pending)
+        tasks = set()
+
+        async def answer(line):
+            try:
+                response = await self.respond(line)
+                try:
+                    data = json.dumps(response, allow_nan=False)
+                except (TypeError, ValueError) as e:
+                    # e.g. complex values, nan or inf, which JSON cannot represent.
+                    data = json.dumps(
+                        {"id": response["id"], "error": f"{type(e).__name__}: {e}"}
+                    )
+                async with lock:
+                    writer.write(data.encode() + b"\n")
+                    await writer.drain()
+            finally:
+                pending.release()
+
+        try:
+            async for line in reader:
+                if line.strip():
+                    await pending.acquire()
+                    task = asyncio.create_task(answer(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Starts serving on a TCP socket."""
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def serve_unix(self, path: str) -> asyncio.Server:
+        """Starts serving on a Unix socket."""
+        return await asyncio.start_unix_server(self.handle, path)
@@ -0,0 +1,121 @@
+"""
+Substitution of expressions for variables, and composition of polynomials.
+
+Rewriting each occurrence of a variable with `PostWalk` copies the subtrees
+above it at every occurrence, and substituting into a term which shares
+subtrees loses the sharing, so repeated substitution grows exponentially.
+`substitute` instead rewrites each distinct subtree once, reuses the
+unchanged ones, and inserts the same replacement at every occurrence, so the
+result is a DAG no larger than the input plus the replacements.
+
+Substituting normalized polynomials into a normalized polynomial is instead
+done on their coefficients by Horner's rule, which yields the normalized
+composition directly.
+"""
+
+from collections.abc import Mapping
+from numbers import Number
+from typing import Any
+
+from .calc_lang import Add, CalcLangExpression, Literal, Mul, Pow, Variable
+from .calc_lang.nodes import CalcLangTree
+from .interpolate import polynomial_form
+from .normalize import is_normalized
+from .symbolic import PostOrderDAG
+
+
+def polynomial_coefficients(
+    node: CalcLangExpression,
+) -> tuple[str | None, list] | None:
+    """
+    Returns the variable of the normalized polynomial `node` and its
+    coefficients, lowest degree first, or `None` if `node` is not in the form
+    accepted by `normalize.is_normalized`. The variable of a constant is
+    `None`.
+    """
+    if not is_normalized(node):
+        return None
+    coefficients: list = []
+    var = None
+    while True:
+        match node:
+            case Add(Mul(Literal(a), Pow(Variable(x), Literal(_))), rest):
+                var, node = x, rest
+                coefficients.append(a)
+            case Add(Mul(Literal(a), Variable(x)), Literal(c)):
+                var = x
+                coefficients += [a, c]
+                break
+            case Literal(c):
+                coefficients.append(c)
+                break
+            case _:
+                return None
+    if not all(isinstance(c, Number) for c in coefficients):
+        return None
+    return var, coefficients[::-1]
+
+
+def _multiply(a: list, b: list) -> list:
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            result[i + j] += x * y
+    return result
+
+
+def compose(p: CalcLangExpression, q: CalcLangExpression) -> CalcLangExpression:
+    """
+    Returns the normalized form of the normalized polynomial `p` with its
+    variable replaced by the normalized polynomial `q`.
+    """
+    outer = polynomial_coefficients(p)
+    inner = polynomial_coefficients(q)
+    if outer is None or inner is None:
+        raise ValueError("Can only compose normalized polynomials")
+    (_, a), (var, b) = outer, inner
+    # p(q) = (...(a[d] * q + a[d - 1]) * q + ...) * q + a[0]
+    result = [a[-1]]
+    for c in reversed(a[:-1]):
+        result = _multiply(result, b)
+        result[0] += c
+    if var is None:
+        return Literal(result[0])
+    return polynomial_form(var, result)
+
+
+def substitute(
+    expr: CalcLangExpression, bindings: Mapping[str, CalcLangExpression]
+) -> CalcLangExpression:
+    """
+    Replaces each variable of `expr` named in `bindings` with its expression.
+    All variables are replaced at once, so the replacements are not themselves
+    substituted into. Subtrees shared in `expr` stay shared in the result, and
+    subtrees containing no replaced variables are reused.
+
+    If `expr` and the replacement of its variable are normalized polynomials,
+    the result is their normalized composition.
+    """
+    fast = polynomial_coefficients(expr)
+    var = fast[0] if fast is not None else None
+    if var is not None and var in bindings:
+        replacement = bindings[var]
+        if polynomial_coefficients(replacement) is not None:
+            return compose(expr, replacement)
+
+    results: dict[int, Any] = {}
+    for node in PostOrderDAG(expr):
+        result: Any
+        match node:
+            case Variable(name) if name in bindings:
+                result = bindings[name]
+            case CalcLangTree():
+                args = [results[id(arg)] for arg in node.children]
+                if all(x is y for x, y in zip(args, node.children, strict=True)):
+                    result = node
+                else:
+                    result = node.make_term(node.head(), *args)
+            case _:
+                result = node
+        results[id(node)] = result
+    return results[id(expr)]
@@ -1,34 +1,50 @@
+from .egraph import EGraph, ast_depth, ast_size
 from .environment import Context, Namespace, Reflector, ScopedDict
 from .gensym import gensym
+from .index import SubtermIndex, Wildcard, match
 from .rewriters import (
     Chain,
     Fixpoint,
+    Flatten,
     PostWalk,
     PreWalk,
     Rewrite,
+    RewriteBudgetExceeded,
 )
 from .term import (
+    PostOrderDAG,
     PostOrderDFS,
     PreOrderDFS,
     Term,
     TermTree,
+    exact_key,
     literal_repr,
 )
 
 __all__ = [
     "Chain",
     "Context",
+    "EGraph",
     "Fixpoint",
+    "Flatten",
     "Namespace",
+    "PostOrderDAG",
     "PostOrderDFS",
     "PostWalk",
     "PreOrderDFS",
     "PreWalk",
     "Reflector",
     "Rewrite",
+    "RewriteBudgetExceeded",
     "ScopedDict",
+    "SubtermIndex",
     "Term",
     "TermTree",
+    "Wildcard",
+    "ast_depth",
+    "ast_size",
+    "exact_key",
     "gensym",
     "literal_repr",
+    "match",
 ]
@@ -0,0 +1,343 @@
+"""
+This module provides an e-graph, a data structure which compactly represents a
+large set of terms together with equivalences between them. Rewriting in an
+e-graph is non-destructive: applying a rule records that its input and output
+are equal, rather than replacing the input. Once the rules are saturated (or a
+budget runs out), the cheapest equivalent term is extracted under a cost model.
+This avoids the order-dependence of greedy rewriting with `Fixpoint`.
+
+Rules are ordinary rewriters, i.e. callables which take a Term and return a
+Term or `None`. To match a rule against an e-class, the e-graph enumerates a
+few concrete terms in the class up to a fixed depth, whose subterms below that
+depth are the smallest term of their class.
+
+Classes:
+    EGraph: A union-find over e-classes of e-nodes, supporting saturation with
+        rewriters and cost-based extraction.
+
+Functions:
+    ast_size: A cost model counting the nodes of a term.
+    ast_depth: A cost model measuring the depth of a term.
+"""
+
+import time
+from collections.abc import Callable, Hashable, Iterable
+from itertools import islice, product
+from typing import Any
+
+from .rewriters import RwCallable
+from .term import PostOrderDAG, Term, TermTree, exact_key
+
+# An e-node is a head together with the ids of its children's e-classes. Leaf
+# terms are stored whole, as the head of an e-node without children.
+ENode = tuple[Any, tuple[int, ...] | None]
+
+
+def enode_key(enode: ENode) -> Hashable:
+    """
+    Returns the key by which `enode` is hashconsed. Leaves are keyed exactly,
+    so that e.g. `Literal(1)`, `Literal(1.0)` and `Literal(-0.0)` stay apart,
+    though they compare equal.
+    """
+    head, children = enode
+    return enode if children is not None else (exact_key(head), None)
+
+
+# A cost model maps the head of an e-node and the costs of its children to the
+# cost of the e-node. Costs may be of any ordered type, and must increase
+# strictly from children to parents.
+CostModel = Callable[[Any, list[Any]], Any]
+
+
+def ast_size(head: Any, child_costs: list[Any]) -> Any:
+    return 1 + sum(child_costs)
+
+
+def ast_depth(head: Any, child_costs: list[Any]) -> Any:
+    return 1 + max(child_costs, default=0)
+
+
+class EGraph:
+    """
+    An e-graph over Terms.
+
+    Attributes:
+        parents (list[int]): The union-find forest over e-class ids.
+        classes (dict[int, dict[Hashable, ENode]]): The e-nodes in each
+            canonical e-class, in insertion order, keyed by `enode_key`.
+        hashcons (dict[Hashable, int]): The e-class containing each e-node,
+            keyed by `enode_key`.
+        stop_reason (str | None): Why the last call to `saturate` stopped; one of
+            "saturated", "iter_limit", "node_limit" or "time_limit".
+    """
+
+    def __init__(self):
+        self.parents: list[int] = []
+        self.classes: dict[int, dict[Hashable, ENode]] = {}
+        self.hashcons: dict[Hashable, int] = {}
+        self.makers: dict[Any, Callable[..., Term]] = {}
+        self.dirty = False
+        self.version = 0
+        self.stop_reason: str | None = None
+
+    def __len__(self) -> int:
+        """Returns the number of e-nodes in the e-graph."""
+        return len(self.hashcons)
+
+    def find(self, cid: int) -> int:
+        """Returns the canonical id of the e-class `cid`."""
+        parents = self.parents
+        while parents[cid] != cid:
+            parents[cid] = parents[parents[cid]]
+            cid = parents[cid]
+        return cid
+
+    def canonicalize(self, enode: ENode) -> ENode:
+        head, children = enode
+        if children is None:
+            return enode
+        return (head, tuple(self.find(c) for c in children))
+
+    def add_enode(self, enode: ENode) -> int:
+        enode = self.canonicalize(enode)
+        key = enode_key(enode)
+        cid = self.hashcons.get(key)
+        if cid is not None:
+            return self.find(cid)
+        cid = len(self.parents)
+        self.parents.append(cid)
+        self.classes[cid] = {key: enode}
+        self.hashcons[key] = cid
+        self.version += 1
+        return cid
+
+    def add(self, term: Term) -> int:
+        """Adds `term` and all of its subterms, returning the id of its e-class."""
+        ids: dict[int, int] = {}
+        for node in PostOrderDAG(term):
+            if isinstance(node, TermTree):
+                head = node.head()
+                self.makers.setdefault(head, node.make_term)
+                enode: ENode = (head, tuple(ids[id(arg)] for arg in node.children))
+            else:
+                enode = (node, None)
+            ids[id(node)] = self.add_enode(enode)
+        return self.find(ids[id(term)])
+
+    def union(self, a: int, b: int) -> bool:
+        """
+        Records that the e-classes `a` and `b` are equal. Returns whether they
+        were previously distinct. Call `rebuild` to restore congruence.
+        """
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if len(self.classes[a]) < len(self.classes[b]):
+            a, b = b, a
+        self.parents[b] = a
+        self.classes[a].update(self.classes.pop(b))
+        self.dirty = True
+        self.version += 1
+        return True
+
+    def rebuild(self) -> None:
+        """
+        Restores the invariant that congruent e-nodes (equal heads with equal
+        children) belong to the same e-class, after a series of unions.
+        """
+        while self.dirty:
+            self.dirty = False
+            hashcons: dict[Hashable, int] = {}
+            merges = []
+            for cid in list(self.classes):
+                if cid not in self.classes:
+                    continue
+                enodes: dict[Hashable, ENode] = {}
+                for enode in self.classes[cid].values():
+                    enode = self.canonicalize(enode)
+                    key = enode_key(enode)
+                    enodes[key] = enode
+                    other = hashcons.setdefault(key, cid)
+                    if other != cid:
+                        merges.append((other, cid))
+                self.classes[cid] = enodes
+            self.hashcons = hashcons
+            for a, b in merges:
+                self.union(a, b)
+
+    def costs(self, cost: CostModel = ast_size) -> dict[int, tuple[Any, ENode]]:
+        """
+        Returns the cost of the cheapest e-node in each e-class, together with
+        that e-node.
+        """
+        best: dict[int, tuple[Any, ENode]] = {}
+        changed = True
+        while changed:
+            changed = False
+            for cid, enodes in self.classes.items():
+                for enode in enodes.values():
+                    head, children = enode
+                    if children is None:
+                        c = cost(head, [])
+                    elif all(self.find(k) in best for k in children):
+                        c = cost(head, [best[self.find(k)][0] for k in children])
+                    else:
+                        continue
+                    if cid not in best or c < best[cid][0]:
+                        best[cid] = (c, enode)
+                        changed = True
+        return best
+
+    def build(
+        self,
+        cid: int,
+        best: dict[int, tuple[Any, ENode]],
+        terms: dict[int, Term] | None = None,
+    ) -> Term:
+        """
+        Constructs the term for e-class `cid` by choosing the e-node given in
+        `best` for each class. Terms for classes which are reached more than once
+        are shared, and may be memoized across calls in `terms`.
+        """
+        if terms is None:
+            terms = {}
+        pending: set[int] = set()
+        stack = [self.find(cid)]
+        while stack:
+            c = stack[-1]
+            if c in terms:
+                stack.pop()
+                continue
+            head, children = best[c][1]
+            if children is None:
+                terms[c] = head
+                stack.pop()
+                continue
+            args = [self.find(k) for k in children]
+            missing = [k for k in args if k not in terms]
+            if not missing:
+                terms[c] = self.makers[head](head, *(terms[k] for k in args))
+                pending.discard(c)
+                stack.pop()
+                continue
+            if c in pending:
+                raise ValueError("Cost model must increase from children to parents.")
+            pending.add(c)
+            stack.extend(missing)
+        return terms[self.find(cid)]
+
+    def extract(self, cid: int, cost: CostModel = ast_size) -> Term:
+        """Returns the cheapest term in e-class `cid` under the cost model."""
+        return self.build(cid, self.costs(cost))
+
+    def saturate(
+        self,
+        rules: Iterable[RwCallable],
+        *,
+        depth: int = 2,
+        width: int = 8,
+        iter_limit: int = 30,
+        node_limit: int = 10_000,
+        time_limit: float | None = None,
+    ) -> str:
+        """
+        Repeatedly matches every rule against every e-class, adding each result
+        to the e-graph and merging it with the class it was matched in, until
+        nothing changes or a budget is exceeded.
+
+        Args:
+            rules: The rewriters to apply.
+            depth: The depth of the terms enumerated to match rules against.
+            width: The number of terms enumerated per e-class below the top
+                level. Every e-node is matched at the top level.
+            iter_limit: The maximum number of matching rounds.
+            node_limit: The maximum number of e-nodes.
+            time_limit: The maximum number of seconds to spend.
+
+        Returns:
+            The reason saturation stopped, which is also stored in `stop_reason`.
+        """
+        rules = list(rules)
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        matches: list[tuple[int, Term]] = []
+
+        def exceeded() -> str | None:
+            if deadline is not None and time.monotonic() > deadline:
+                return "time_limit"
+            if len(self) + len(matches) > node_limit:
+                return "node_limit"
+            return None
+
+        self.stop_reason = "iter_limit"
+        for _ in range(iter_limit):
+            version = self.version
+            reason = exceeded()
+            best = self.costs(ast_size)
+            terms: dict[int, Term] = {}
+            views: dict[tuple[int, int], list[Term]] = {}
+            matches = []
+            # The budget is checked for every enumerated term, as a single
+            # e-class may have many views, and every match may add e-nodes.
+            for cid in list(self.classes) if reason is None else []:
+                for enode in self.classes[cid].values():
+                    for term in self._views(
+                        enode, depth, width, None, best, terms, views
+                    ):
+                        for rule in rules:
+                            result = rule(term)
+                            if result is not None:
+                                matches.append((cid, result))
+                        reason = exceeded()
+                        if reason is not None:
+                            break
+                    if reason is not None:
+                        break
+                if reason is not None:
+                    break
+            for cid, result in matches:
+                self.union(cid, self.add(result))
+                if len(self) > node_limit:
+                    reason = "node_limit"
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    reason = "time_limit"
+                    break
+            self.rebuild()
+            if reason is not None:
+                self.stop_reason = reason
+                break
+            if self.version == version:
+                self.stop_reason = "saturated"
+                break
+        return self.stop_reason
+
+    def _views(self, enode, depth, width, limit, best, terms, views) -> list[Term]:
+        """
+        Enumerates terms of the given depth rooted at `enode`, drawing at most
+        `width` terms from each child e-class, and returning at most `limit`
+        terms if it is not `None`.
+        """
+        head, children = enode
+        if children is None:
+            return [head]
+        options = [
+            self._class_views(self.find(k), depth - 1, width, best, terms, views)
+            for k in children
+        ]
+        make = self.makers[head]
+        return [make(head, *args) for args in islice(product(*options), limit)]
+
+    def _class_views(self, cid, depth, width, best, terms, views) -> list[Term]:
+        if depth <= 0:
+            return [self.build(cid, best, terms)]
+        key = (cid, depth)
+        if key not in views:
+            found: list[Term] = []
+            for enode in self.classes[cid].values():
+                found.extend(
+                    self._views(enode, depth, width, width, best, terms, views)
+                )
+                if len(found) >= width:
+                    break
+            views[key] = found[:width]
+        return views[key]
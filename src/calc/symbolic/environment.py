@@ -1,4 +1,5 @@
 import re
+import threading
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from typing import Any, Generic, Optional, TypeVar
@@ -7,6 +8,7 @@ from typing import Any, Generic, Optional, TypeVar
     Namespace
 
 A namespace for managing variable names and aesthetic fresh variable generation.
+Namespaces may be shared between threads: each name is handed out once.
 """
 
 
@@ -14,6 +16,16 @@ class Namespace:
     def __init__(self):
         self.counts = defaultdict(int)
         self.resolutions = {}
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
 
     def freshen(self, *tags):
         name = "_".join(str(tag) for tag in tags)
@@ -24,8 +36,9 @@ class Namespace:
         else:
             tag = m.group(1)
             n = int(m.group(2))
-        n = max(self.counts[tag] + 1, n)
-        self.counts[tag] = n
+        with self.lock:
+            n = max(self.counts[tag] + 1, n)
+            self.counts[tag] = n
         if n == 1:
             return tag
         return f"{tag}_{n}"
@@ -36,7 +49,10 @@ class Namespace:
         e.g. `resolve("a", "b")` might return `a_b_1` if `a_b` has already been
         used in scope.
         """
-        self.resolutions.setdefault(names, lambda: self.freshen("_".join(names)))
+        with self.lock:
+            if names not in self.resolutions:
+                self.resolutions[names] = self.freshen("_".join(names))
+            return self.resolutions[names]
 
 
 T = TypeVar("T")
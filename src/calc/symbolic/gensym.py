@@ -1,14 +1,19 @@
+import threading
 from collections.abc import Callable
 
 
 class SymbolGenerator:
     counter: int = 0
+    # Reading and incrementing the counter is not atomic, so concurrent calls
+    # could otherwise return the same symbol.
+    lock = threading.Lock()
 
     @classmethod
     def gensym(cls, name: str) -> str:
-        sym = f"#{name}#{cls.counter}"
-        cls.counter += 1
-        return sym
+        with cls.lock:
+            n = cls.counter
+            cls.counter += 1
+        return f"#{name}#{n}"
 
 
 _sg = SymbolGenerator()
@@ -0,0 +1,188 @@
+"""
+An index of the subterms of a corpus of terms, for finding the occurrences of a
+pattern without traversing every term.
+
+Each subterm is indexed by the symbols found at each position near its root, up
+to a fixed depth, where a position is the path of child indices leading to it
+and the symbol of a tree is its head and arity. A pattern is looked up by
+intersecting the sets of subterms which have the pattern's symbols at the
+pattern's positions, starting from the smallest, and each remaining candidate
+is then matched against the whole pattern. This is known as path indexing.
+
+Classes:
+    Wildcard: A pattern which matches any term.
+    SubtermIndex: An index of the subterms of a set of terms.
+
+Functions:
+    match: Matches a pattern against a term.
+"""
+
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from .term import PostOrderDAG, Term, TermTree
+
+
+@dataclass(eq=True, frozen=True)
+class Wildcard(Term):
+    """
+    A pattern which matches any term. Wildcards with the same nonempty `name`
+    must match equal terms.
+
+    Attributes:
+        name (str): The name of the wildcard.
+    """
+
+    name: str = ""
+
+    def head(self):
+        return Wildcard
+
+    @classmethod
+    def make_term(cls, head, *children):
+        return head(*children)
+
+
+def symbol(x: Term) -> Any:
+    """
+    Returns the symbol of `x` which is compared when indexing: its head and
+    arity if it is a tree, or itself if it is a hashable leaf.
+    """
+    if isinstance(x, TermTree):
+        return (x.head(), len(x.children))
+    try:
+        hash(x)
+    except TypeError:
+        return type(x)
+    return x
+
+
+def match(pattern: Term, x: Term, bindings: dict | None = None) -> dict | None:
+    """
+    Matches `pattern` against `x`, returning the terms matched by each named
+    wildcard, or `None` if `x` does not match.
+    """
+    bindings = dict(bindings) if bindings is not None else {}
+    stack = [(pattern, x)]
+    while stack:
+        p, y = stack.pop()
+        if isinstance(p, Wildcard):
+            if p.name:
+                if p.name in bindings and bindings[p.name] != y:
+                    return None
+                bindings[p.name] = y
+        elif isinstance(p, TermTree):
+            if not isinstance(y, TermTree) or symbol(p) != symbol(y):
+                return None
+            stack.extend(zip(p.children, y.children, strict=True))
+        elif isinstance(y, TermTree) or p != y:
+            return None
+    return bindings
+
+
+def positions(x: Term, depth: int) -> Iterator[tuple[tuple[int, ...], Term]]:
+    """Yields the subterms of `x` at most `depth` levels deep, with their paths."""
+    stack: list[tuple[tuple[int, ...], Term]] = [((), x)]
+    while stack:
+        path, y = stack.pop()
+        yield path, y
+        if len(path) < depth and isinstance(y, TermTree):
+            stack.extend((path + (i,), arg) for i, arg in enumerate(y.children))
+
+
+class SubtermIndex:
+    """
+    An index of the subterms of a set of terms, each stored under a key.
+
+    Attributes:
+        depth (int): How many levels below each subterm are indexed. Deeper
+            indices answer queries for deep patterns with fewer candidates, but
+            take more memory.
+        terms (dict): The indexed terms, by key.
+        postings (dict): The `id`s of the subterms having each symbol at each
+            position, keyed by `(path, symbol)`.
+        subterms (dict): The indexed subterms, by `id`.
+        occurrences (dict): The keys of the terms containing each subterm, by
+            `id`.
+    """
+
+    def __init__(self, depth: int = 2):
+        self.depth = depth
+        self.terms: dict[Hashable, Term] = {}
+        self.postings: dict[tuple[tuple[int, ...], Hashable], set[int]] = {}
+        self.subterms: dict[int, Term] = {}
+        self.occurrences: dict[int, dict[Hashable, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add(self, x: Term, key: Hashable = None) -> Hashable:
+        """
+        Adds the term `x` to the index under `key`, which defaults to the number
+        of terms added before it, and returns the key.
+        """
+        if key is None:
+            n = len(self.terms)
+            while n in self.terms:
+                n += 1
+            key = n
+        if key in self.terms:
+            self.remove(key)
+        self.terms[key] = x
+        for y in PostOrderDAG(x):
+            if id(y) not in self.subterms:
+                self.subterms[id(y)] = y
+                self.occurrences[id(y)] = {}
+                for path, z in positions(y, self.depth):
+                    self.postings.setdefault((path, symbol(z)), set()).add(id(y))
+            self.occurrences[id(y)][key] = None
+        return key
+
+    def remove(self, key: Hashable) -> None:
+        """Removes the term stored under `key` from the index."""
+        x = self.terms.pop(key)
+        for y in PostOrderDAG(x):
+            keys = self.occurrences.get(id(y))
+            if keys is None or key not in keys:
+                continue
+            del keys[key]
+            if not keys:
+                del self.occurrences[id(y)]
+                del self.subterms[id(y)]
+                for path, z in positions(y, self.depth):
+                    posting = self.postings[(path, symbol(z))]
+                    posting.discard(id(y))
+                    if not posting:
+                        del self.postings[(path, symbol(z))]
+
+    def candidates(self, pattern: Term) -> set[int] | None:
+        """
+        Returns the `id`s of the subterms which agree with `pattern` at every
+        indexed position, or `None` if the pattern constrains no position.
+        """
+        queries = [
+            (path, symbol(p))
+            for path, p in positions(pattern, self.depth)
+            if not isinstance(p, Wildcard)
+        ]
+        if not queries:
+            return None
+        postings = [self.postings.get(q, set()) for q in queries]
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def query(self, pattern: Term) -> Iterator[tuple[Term, dict[str, Any]]]:
+        """
+        Yields each distinct indexed subterm matching `pattern`, together with
+        the terms matched by the pattern's named wildcards.
+        """
+        ids = self.candidates(pattern)
+        for i in self.subterms if ids is None else ids:
+            bindings = match(pattern, self.subterms[i])
+            if bindings is not None:
+                yield self.subterms[i], bindings
+
+    def keys(self, pattern: Term) -> set[Hashable]:
+        """Returns the keys of the terms containing a match of `pattern`."""
+        return {key for y, _ in self.query(pattern) for key in self.occurrences[id(y)]}
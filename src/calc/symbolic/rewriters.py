@@ -14,16 +14,24 @@ Classes:
     Chain: Applies a sequence of rewriters to a term, stopping when a rewriter
         produces a change.
     Fixpoint: Repeatedly applies a rewriter to a term until no further changes
-        are made.
+        are made, or until an optional budget of iterations, nodes or time is
+        spent.
     Prestep: Recursively rewrites each node in a term, stopping if the rewriter
         produces no changes.
     Memo: Caches the results of a rewriter to avoid redundant computations.
+    Flatten: Splices nested applications of associative heads into their
+        parent, producing n-ary terms.
+
+Exceptions:
+    RewriteBudgetExceeded: Raised when a `Fixpoint` runs out of budget.
 """
 
+import time
 from collections.abc import Callable, Iterable
-from typing import TypeVar
+from contextvars import ContextVar
+from typing import Any, TypeVar
 
-from .term import Term, TermTree
+from .term import PostOrderDFS, Term, TermTree
 
 T = TypeVar("T", bound="Term")
 
@@ -63,7 +71,7 @@ class PreWalk:
         self.rw = rw
 
     def __call__(self, x: T) -> T | None:
-        y = self.rw(x)
+        y = _checked(self.rw(x))
         if y is not None:
             if isinstance(y, TermTree):
                 args = y.children
@@ -100,12 +108,12 @@ class PostWalk:
             args = x.children
             new_args = list(map(self, args))
             if all(arg is None for arg in new_args):
-                return self.rw(x)
+                return _checked(self.rw(x))
             y = x.make_term(
                 x.head(), *map(lambda x1, x2: default_rewrite(x1, x2), new_args, args)
             )
-            return default_rewrite(self.rw(y), y)  # type: ignore[return-value]
-        return self.rw(x)
+            return default_rewrite(_checked(self.rw(y)), y)  # type: ignore[return-value]
+        return _checked(self.rw(x))
 
 
 class Chain:
@@ -132,26 +140,161 @@ class Chain:
         return None
 
 
+class RewriteBudgetExceeded(Exception):
+    """
+    Raised when a rewriter runs out of its budget before reaching a fixpoint.
+
+    Attributes:
+        reason (str): Which limit was hit: "iter_limit", "node_limit" or
+            "time_limit".
+        partial (Term): The last term produced before the limit was hit, which
+            is equivalent to the input but may not be fully rewritten.
+        iterations (int): The number of times the rewriter was applied.
+    """
+
+    def __init__(self, reason: str, partial: Any, iterations: int):
+        super().__init__(
+            f"Rewriting stopped by {reason} after {iterations} iterations."
+        )
+        self.reason = reason
+        self.partial = partial
+        self.iterations = iterations
+
+
+def term_size(x: Term) -> int:
+    """
+    Returns the number of nodes in `x`, counting shared subterms each time they
+    occur. Terms which cache their size in a `size` attribute are not walked.
+    """
+    size = getattr(x, "size", None)
+    if isinstance(size, int):
+        return size
+    return sum(1 for _ in PostOrderDFS(x))
+
+
+class _Budget:
+    """
+    The limits on the size of terms and on the time of one call of a
+    `Fixpoint`. While the fixpoint runs, the walks check the budget after each
+    rewrite of a node, so that a single pass which blows up is stopped early.
+    A budget also enforces the budget of the enclosing fixpoint, if any.
+    """
+
+    def __init__(
+        self,
+        node_limit: int | None,
+        time_limit: float | None,
+        parent: "_Budget | None" = None,
+    ):
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.parent = parent
+        self.start = time.monotonic()
+
+    def exceeded(self, x: Term) -> "tuple[_Budget, str] | None":
+        """Returns the budget and the limit exceeded by producing `x`, if any."""
+        if self.node_limit is not None and term_size(x) > self.node_limit:
+            return self, "node_limit"
+        if (
+            self.time_limit is not None
+            and time.monotonic() - self.start > self.time_limit
+        ):
+            return self, "time_limit"
+        return self.parent.exceeded(x) if self.parent is not None else None
+
+
+class _Interrupted(Exception):
+    def __init__(self, budget: _Budget, reason: str):
+        super().__init__(reason)
+        self.budget = budget
+        self.reason = reason
+
+
+_budget: ContextVar[_Budget | None] = ContextVar("budget", default=None)
+
+
+def _checked(y):
+    """Checks the budget of the running fixpoint, if any, after producing `y`."""
+    budget = _budget.get()
+    if y is not None and budget is not None:
+        exceeded = budget.exceeded(y)
+        if exceeded is not None:
+            raise _Interrupted(*exceeded)
+    return y
+
+
 class Fixpoint:
     """
     A rewriter which repeatedly applies `rw` to `x` until no changes are made. If
     the rewriter first returns `nothing`, returns `nothing`.
 
+    The number of iterations, the size of the intermediate terms and the time
+    spent may each be limited. Limits are checked after each application of
+    `rw`, and the size and time limits also after each node rewritten by a
+    `PreWalk` or `PostWalk` within it. When one is exceeded,
+    `RewriteBudgetExceeded` is raised, or, if `partial` is set, the last
+    complete term is returned as if it were the fixpoint.
+
     Attributes:
         rw (RwCallable): The rewriter function to apply.
+        iter_limit (int | None): The maximum number of applications of `rw`.
+        node_limit (int | None): The maximum size of an intermediate term.
+        time_limit (float | None): The maximum time, in seconds, of one call.
+        partial (bool): Whether to return the last term rather than raise when
+            a limit is exceeded.
     """
 
-    def __init__(self, rw: RwCallable):
+    def __init__(
+        self,
+        rw: RwCallable,
+        iter_limit: int | None = None,
+        node_limit: int | None = None,
+        time_limit: float | None = None,
+        partial: bool = False,
+    ):
         self.rw = rw
+        self.iter_limit = iter_limit
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.partial = partial
 
     def __call__(self, x: T) -> T | None:
-        y = self.rw(x)
-        if y is not None:
-            while y is not None and x != y:
-                x = y
+        if self.node_limit is None and self.time_limit is None:
+            return self.run(x, None)
+        budget = _Budget(self.node_limit, self.time_limit, _budget.get())
+        token = _budget.set(budget)
+        try:
+            return self.run(x, budget)
+        finally:
+            _budget.reset(token)
+
+    def run(self, x: T, budget: _Budget | None) -> T | None:
+        iterations = 1
+        changed = False
+        while True:
+            try:
                 y = self.rw(x)
-            return x
-        return None
+            except _Interrupted as e:
+                if e.budget is not budget:
+                    raise
+                return self.stop(e.reason, x, iterations, changed)
+            if y is None or x == y:
+                return x if changed else None
+            x, changed = y, True
+            exceeded = budget.exceeded(x) if budget is not None else None
+            if exceeded is not None and exceeded[0] is not budget:
+                raise _Interrupted(*exceeded)
+            if exceeded is not None:
+                return self.stop(exceeded[1], x, iterations, changed)
+            if self.iter_limit is not None and iterations >= self.iter_limit:
+                return self.stop("iter_limit", x, iterations, changed)
+            iterations += 1
+
+    def stop(self, reason: str, x: T, iterations: int, changed: bool) -> T | None:
+        """Returns the partial term `x`, or raises `RewriteBudgetExceeded`."""
+        if self.partial:
+            return x if changed else None
+        raise RewriteBudgetExceeded(reason, x, iterations)
 
 
 class Prestep:
@@ -179,7 +322,9 @@ class Prestep:
 class Memo:
     """
     A rewriter which caches the results of `rw` in `cache` and returns the
-    result.
+    result. It may be called from several threads at once: a term being
+    rewritten by two threads may be rewritten twice, but both get the result
+    which was cached first.
 
     Attributes:
         rw (RwCallable): The rewriter function to apply.
@@ -191,6 +336,38 @@ class Memo:
         self.cache = cache if cache is not None else {}
 
     def __call__(self, x: T) -> T | None:
-        if x not in self.cache:
-            self.cache[x] = self.rw(x)
-        return self.cache[x]
+        # Single dictionary operations are atomic, also without the GIL.
+        try:
+            return self.cache[x]
+        except KeyError:
+            return self.cache.setdefault(x, self.rw(x))
+
+
+class Flatten:
+    """
+    A rewriter which flattens nested applications of associative heads, so that
+    `f(a, f(b, c))` becomes `f(a, b, c)` for each head `f` in `heads`. Only the
+    children of `x` are spliced, so applying it with `PostWalk` flattens a
+    whole term in one pass. If no child has the same head, returns `nothing`.
+
+    Attributes:
+        heads (Iterable): The associative heads to flatten.
+    """
+
+    def __init__(self, heads: Iterable):
+        self.heads = set(heads)
+
+    def __call__(self, x: T) -> T | None:
+        if not isinstance(x, TermTree) or x.head() not in self.heads:
+            return None
+        head = x.head()
+        args = x.children
+        if not any(isinstance(arg, TermTree) and arg.head() == head for arg in args):
+            return None
+        new_args: list[Term] = []
+        for arg in args:
+            if isinstance(arg, TermTree) and arg.head() == head:
+                new_args.extend(arg.children)
+            else:
+                new_args.append(arg)
+        return x.make_term(head, *new_args)  # type: ignore[return-value]
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from collections.abc import Iterator
-from dataclasses import dataclass
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass, fields, is_dataclass
 from inspect import isbuiltin, isclass, isfunction
 from typing import Any, Self
 
@@ -84,6 +84,27 @@ def literal_repr(name: str, fields: dict[str, Any]) -> str:
     )
 
 
+def exact_key(value: Any) -> Hashable:
+    """
+    Returns a hashable key identifying `value` exactly, unlike equality: values
+    of different types, such as `1` and `1.0`, and floats with different bits,
+    such as `0.0` and `-0.0`, get different keys. Dataclasses, such as leaf
+    terms, are keyed by their fields.
+    """
+    if is_dataclass(value) and not isinstance(value, type):
+        return (
+            type(value),
+            tuple(exact_key(getattr(value, f.name)) for f in fields(value)),
+        )
+    kind = getattr(getattr(value, "dtype", None), "kind", None)
+    if getattr(value, "ndim", 0) == 0:
+        if isinstance(value, float) or kind == "f":
+            return (type(value), float(value).hex())
+        if isinstance(value, complex) or kind == "c":
+            return (type(value), float(value.real).hex(), float(value.imag).hex())
+    return (type(value), value)
+
+
 def PostOrderDFS(node: Term) -> Iterator[Term]:
     if isinstance(node, TermTree):
         for arg in node.children:
@@ -96,3 +117,25 @@ def PreOrderDFS(node: Term) -> Iterator[Term]:
     if isinstance(node, TermTree):
         for arg in node.children:
             yield from PreOrderDFS(arg)
+
+
+def PostOrderDAG(node: Term) -> Iterator[Term]:
+    """
+    Yields each distinct subterm of `node` once, children before parents.
+    Subterms are compared by identity, so a subterm shared between several
+    parents is only visited the first time it is reached. Unlike `PostOrderDFS`,
+    this traversal uses an explicit stack and is safe on arbitrarily deep terms.
+    """
+    seen: set[int] = set()
+    stack: list[tuple[Term, bool]] = [(node, False)]
+    while stack:
+        x, expanded = stack.pop()
+        if expanded:
+            yield x
+            continue
+        if id(x) in seen:
+            continue
+        seen.add(id(x))
+        stack.append((x, True))
+        if isinstance(x, TermTree):
+            stack.extend((arg, False) for arg in reversed(x.children))
@@ -0,0 +1,82 @@
+"""
+A tiered evaluator, which interprets programs until they are seen often enough
+to be worth compiling.
+
+Programs are counted by their structural hash, which is cached on each node,
+so that call sites which rebuild the same program for every evaluation are
+promoted too. A program is interpreted by `CalcLangMachine` until programs
+equal to it have been evaluated `threshold` times, and then compiled. The
+compiled kernels of the most recently used programs are kept in a bounded
+cache. Compiling is much cheaper than interpreting a hot program many times,
+and skewed workloads, where a few programs account for most evaluations, need
+few kernels to benefit.
+"""
+
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+
+from .calc_lang import CalcLangMachine, CalcLangNode, structural_hash
+from .codegen.python import compile_python_kernel
+
+logger = logging.getLogger(__name__)
+
+
+class TieredInterpreter:
+    """
+    An interpreter for CALCCalcLang which promotes hot programs to compiled
+    kernels. It may be used wherever a `CalcLangInterpreter` is.
+
+    Attributes:
+        threshold (int): The number of evaluations of a program after which it
+            is compiled.
+        cache_size (int): The number of compiled kernels to keep.
+        compiler (Callable): Compiles a program into a function of a
+            dictionary of bindings.
+        promotions (int): The number of programs compiled so far.
+        verbose (bool): Whether to log compilations at the `INFO` level rather
+            than `DEBUG`.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 16,
+        cache_size: int = 256,
+        compiler: Callable = compile_python_kernel,
+        verbose=False,
+    ):
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.compiler = compiler
+        self.verbose = verbose
+        self.kernels: OrderedDict[str, Callable] = OrderedDict()
+        # The number of evaluations of recently seen programs not yet compiled,
+        # keyed by structural hash.
+        self.counts: OrderedDict[str, int] = OrderedDict()
+        self.promotions = 0
+
+    def __call__(self, prgm: CalcLangNode, bindings=None):
+        key = structural_hash(prgm)
+        kernel = self.kernels.get(key)
+        if kernel is not None:
+            self.kernels.move_to_end(key)
+            return kernel(bindings if bindings is not None else {})
+        count = self.counts.pop(key, 0) + 1
+        if count < self.threshold:
+            self.counts[key] = count
+            # Forget the least recently seen programs.
+            while len(self.counts) > 4 * self.cache_size:
+                self.counts.popitem(last=False)
+            return CalcLangMachine(bindings)(prgm)
+        kernel = self.compiler(prgm)
+        self.promotions += 1
+        logger.log(
+            logging.INFO if self.verbose else logging.DEBUG,
+            "Compiled %s after %d evaluations.",
+            key[:12],
+            count,
+        )
+        self.kernels[key] = kernel
+        while len(self.kernels) > self.cache_size:
+            self.kernels.popitem(last=False)
+        return kernel(bindings if bindings is not None else {})
@@ -1,19 +1,118 @@
+import weakref
+from typing import Any
+
+import numpy as np
+
 from calc import calc_lang
+from calc.calc_lang.nodes import CalcLangTree
+from calc.symbolic import exact_key
+
+# Nodes built while tracing are hash-consed: building a node equal to one which
+# is still alive returns the existing node instead, so that repeated
+# subexpressions in traced code share one subtree. Children are interned before
+# their parents, so a tree node is identified by its type and the `id`s of its
+# children. The table holds nodes weakly, and an entry is dropped before the
+# `id`s of its children can be reused, since each node keeps its children alive.
+_interned: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def intern(node: calc_lang.CalcLangExpression) -> calc_lang.CalcLangExpression:
+    """Returns the traced node equal to `node`, adding `node` if there is none."""
+    key: Any
+    match node:
+        case calc_lang.Literal(value):
+            # Floats are keyed by their bits, so that e.g. `-0.0` is not shared
+            # with the equal `0.0`.
+            key = (calc_lang.Literal, exact_key(value))
+        case calc_lang.Variable(name):
+            key = (calc_lang.Variable, name)
+        case CalcLangTree():
+            key = (type(node), *(id(arg) for arg in node.children))
+        case _:
+            return node
+    try:
+        existing = _interned.get(key)
+    except TypeError:
+        # Unhashable literals, such as arrays, are not shared.
+        return node
+    if existing is not None:
+        return existing
+    _interned[key] = node
+    return node
 
 
 class Tracer:
-    """A tracer to construct a calc_lang expression from a Python expression."""
+    """
+    A tracer to construct a calc_lang expression from a Python expression.
+
+    Tracers support Python's arithmetic operators, and NumPy's `add`,
+    `subtract`, `multiply`, `power` and related ufuncs, so numerical code
+    written for NumPy arrays can be traced by passing it tracers instead.
+    Division is traced as multiplication by a power of -1, and negation as
+    multiplication by -1.
+    """
 
     expr: calc_lang.CalcLangExpression
 
     def __init__(self, expr: calc_lang.CalcLangExpression):
-        self.expr = expr
+        self.expr = intern(expr)
+
+    def __repr__(self):
+        return f"Tracer({self.expr!r})"
 
     def __add__(self, other):
         return Tracer(calc_lang.Add(self.expr, trace(other).expr))
 
-    # Your implementation here!
-    # https://docs.python.org/3/reference/datamodel.html#emulating-numeric-types
+    def __radd__(self, other):
+        return Tracer(calc_lang.Add(trace(other).expr, self.expr))
+
+    def __sub__(self, other):
+        return Tracer(calc_lang.Sub(self.expr, trace(other).expr))
+
+    def __rsub__(self, other):
+        return Tracer(calc_lang.Sub(trace(other).expr, self.expr))
+
+    def __mul__(self, other):
+        return Tracer(calc_lang.Mul(self.expr, trace(other).expr))
+
+    def __rmul__(self, other):
+        return Tracer(calc_lang.Mul(trace(other).expr, self.expr))
+
+    def __pow__(self, other):
+        return Tracer(calc_lang.Pow(self.expr, trace(other).expr))
+
+    def __rpow__(self, other):
+        return Tracer(calc_lang.Pow(trace(other).expr, self.expr))
+
+    def __truediv__(self, other):
+        return self * trace(other) ** -1
+
+    def __rtruediv__(self, other):
+        return trace(other) * self**-1
+
+    def __neg__(self):
+        return trace_lit(-1) * self
+
+    def __pos__(self):
+        return self
+
+    _UFUNCS = {
+        np.add: lambda a, b: a + b,
+        np.subtract: lambda a, b: a - b,
+        np.multiply: lambda a, b: a * b,
+        np.power: lambda a, b: a**b,
+        np.float_power: lambda a, b: a**b,
+        np.true_divide: lambda a, b: a / b,
+        np.negative: lambda a: -a,
+        np.positive: lambda a: +a,
+        np.square: lambda a: a * a,
+        np.reciprocal: lambda a: a**-1,
+    }
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != "__call__" or kwargs or ufunc not in self._UFUNCS:
+            return NotImplemented
+        return self._UFUNCS[ufunc](*map(trace, inputs))
 
 
 def trace(name) -> Tracer:
@@ -21,10 +120,10 @@ def trace(name) -> Tracer:
         return name
     if isinstance(name, str):
         return Tracer(calc_lang.Variable(name))
-    if isinstance(name, int | float):
+    if isinstance(name, int | float | np.number | np.ndarray):
         return trace_lit(name)
     raise ValueError(f"Expected a string or a number, got {name} of type{type(name)}")
 
 
-def trace_lit(value: float) -> Tracer:
+def trace_lit(value) -> Tracer:
     return Tracer(calc_lang.Literal(value))
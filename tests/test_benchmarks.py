@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from calc.benchmarks import (
+    FAMILIES,
+    MemorySample,
+    check_regressions,
+    load_baseline,
+    main,
+    measure,
+    report,
+    run_benchmarks,
+    save_baseline,
+)
+
+
+def test_measure():
+    result, peak, blocks, rss = measure(lambda n: [object() for _ in range(n)], 1000)
+    assert len(result) == 1000
+    assert peak >= 1000 * 16
+    assert blocks >= 1000
+    assert rss >= 0
+
+
+@pytest.mark.parametrize("family", list(FAMILIES))
+def test_run_benchmarks(family):
+    samples = run_benchmarks([family], sizes=[2, 4], stages=["trace", "evaluate"])
+    assert [(s.stage, s.n) for s in samples] == [
+        ("trace", 2),
+        ("evaluate", 2),
+        ("trace", 4),
+        ("evaluate", 4),
+    ]
+    for s in samples:
+        assert s.error is None
+        assert s.nodes > 0
+        assert s.peak > 0
+        assert s.peak_per_node == s.peak / s.nodes
+    assert samples[2].nodes > samples[0].nodes
+    assert family in report(samples)
+
+
+def test_check_regressions():
+    sample = MemorySample("f", "normalize", 4, nodes=10, peak=10**6, blocks=100)
+    baseline = {"f/normalize/4": {"nodes": 10, "peak": 10**6, "blocks": 100}}
+    assert check_regressions([sample], baseline) == []
+    sample.peak = 2 * 10**6
+    assert check_regressions([sample], baseline, slack=0) == [
+        "f/normalize/4: peak 2000000 bytes exceeds baseline 1000000"
+    ]
+    assert check_regressions([sample], baseline, threshold=2.5, slack=0) == []
+    sample.error = "ValueError: failed"
+    assert check_regressions([sample], baseline, slack=0) == []
+    assert check_regressions([MemorySample("g", "parse", 4, 1)], baseline) == []
+
+
+def test_baseline_roundtrip(tmp_path):
+    samples = run_benchmarks(["sum_chain"], sizes=[3], stages=["trace", "normalize"])
+    samples.append(MemorySample("sum_chain", "parse", 3, 7, error="failed"))
+    path = tmp_path / "baseline.json"
+    save_baseline(samples, path)
+    baseline = load_baseline(path)
+    assert set(baseline) == {"sum_chain/trace/3", "sum_chain/normalize/3"}
+    assert check_regressions(samples, baseline, threshold=1.0, slack=0) == []
+
+
+def test_memory_baseline(lazy_datadir):
+    # Parsing and normalization are placeholders, so only the stages which are
+    # implemented are checked against the baseline. Object sizes and allocator
+    # overheads differ between platforms and Python versions by well under the
+    # factor of 2 allowed, and the default slack absorbs the noise of these
+    # small programs, so only genuine regressions fail.
+    samples = run_benchmarks(sizes=[4, 8, 16], stages=["trace", "evaluate"])
+    baseline = load_baseline(lazy_datadir / "memory_baseline.json")
+    assert check_regressions(samples, baseline, threshold=2.0) == []
+
+
+def test_main(tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    argv = ["--families", "mixed", "--sizes", "2", "--baseline", str(path)]
+    assert main([*argv, "--update"]) == 0
+    assert "mixed/trace/2" in json.loads(path.read_text())
+    assert main(argv) == 0
+    assert "mixed" in capsys.readouterr().out
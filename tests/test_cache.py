@@ -0,0 +1,113 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calc.cache import NormalizationCache
+from calc.calc_lang import Add, Literal, Mul, Pow, Variable, structural_hash
+from calc.calc_lang.serialize import dumps, loads
+
+x = Variable("x")
+
+
+def polynomial(n):
+    return Pow(Add(x, Literal(n)), Literal(2))
+
+
+def test_structural_hash():
+    shared = Add(x, Literal(1))
+    assert structural_hash(Mul(shared, shared)) == structural_hash(
+        Mul(Add(x, Literal(1)), Add(x, Literal(1)))
+    )
+    assert structural_hash(Literal(1)) != structural_hash(Literal(1.0))
+    assert structural_hash(Add(x, Literal(1))) != structural_hash(Add(Literal(1), x))
+    assert structural_hash(Literal(0.0)) != structural_hash(Literal(-0.0))
+    # NumPy scalars are hashed by value, not by their version-dependent repr.
+    assert structural_hash(Literal(np.float64(0.1))) == (
+        "ad10132c5ea76d78d6dfb52c57890193af1fc29c3ffafb197bb5359f398dfab1"
+    )
+
+
+def test_serialization():
+    shared = Add(x, Literal(1.5))
+    program = Mul(shared, Pow(shared, Literal(-3)))
+    data = dumps(program)
+    assert data.count("Variable") == 1
+    result = loads(data)
+    assert result == program
+    assert result.left is result.right.base
+
+
+class CountingNormalizer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, node):
+        self.calls += 1
+        return Mul(Literal(2), node)
+
+
+def test_warm_start(tmp_path):
+    normalizer = CountingNormalizer()
+    cache = NormalizationCache(tmp_path / "cache.db", normalizer=normalizer)
+    assert cache(polynomial(1)) == Mul(Literal(2), polynomial(1))
+    assert cache(polynomial(1)) == Mul(Literal(2), polynomial(1))
+    assert normalizer.calls == 1
+    cache.close()
+    warm = NormalizationCache(tmp_path / "cache.db", normalizer=normalizer)
+    assert warm(polynomial(1)) == Mul(Literal(2), polynomial(1))
+    assert (warm.hits, warm.misses, normalizer.calls) == (1, 0, 1)
+    other = NormalizationCache(tmp_path / "cache.db", normalizer, version="v2")
+    other(polynomial(1))
+    assert normalizer.calls == 2
+
+
+def test_eviction(tmp_path):
+    cache = NormalizationCache(
+        tmp_path / "cache.db", normalizer=CountingNormalizer(), max_entries=3
+    )
+    cache.evict_every = 1
+    for n in range(5):
+        cache(polynomial(n))
+    assert len(cache) == 3
+    assert cache.get(polynomial(0)) is None
+    assert cache.get(polynomial(4)) is not None
+
+
+def test_lazy_touch(tmp_path):
+    cache = NormalizationCache(tmp_path / "cache.db", normalizer=CountingNormalizer())
+    cache(polynomial(0))
+    cache.close()
+
+    def accessed():
+        query = "SELECT accessed FROM normalized"
+        return cache.connection.execute(query).fetchone()[0]
+
+    before = accessed()
+    statements = []
+    cache.connection.set_trace_callback(statements.append)
+    for _ in range(10):
+        assert cache.get(polynomial(0)) is not None
+    assert not any(s.startswith("UPDATE") for s in statements)
+    assert accessed() == before
+    cache.touch_interval = 0
+    time.sleep(0.01)
+    cache.get(polynomial(0))
+    assert accessed() > before
+
+
+def _worker(path, start):
+    cache = NormalizationCache(path, normalizer=CountingNormalizer())
+    results = [cache(polynomial(n)) for n in range(start, start + 20)]
+    return [
+        result == Mul(Literal(2), polynomial(n))
+        for n, result in enumerate(results, start)
+    ]
+
+
+def test_concurrent_processes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    with ProcessPoolExecutor(4) as pool:
+        results = list(pool.map(_worker, [path] * 8, range(0, 80, 10)))
+    assert all(all(r) for r in results)
+    assert len(NormalizationCache(path)) == 90
@@ -1,6 +1,18 @@
 """Tests for calc_lang nodes and interpreter."""
 
-from calc.calc_lang import Add, CalcLangInterpreter, Literal, Mul, Pow
+import io
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    CalcLangPrinterContext,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Variable,
+    structural_hash,
+)
 
 
 class TestCalcLangInterpreter:
@@ -100,3 +112,97 @@ class TestCalcLangPrinter:
         s = str(expr)
         assert "*" in s
         assert "+" in s
+
+    def test_minimal_parentheses(self):
+        """Test that only the parentheses required by precedence are printed."""
+        x = Variable("x")
+        assert str(Add(Mul(Literal(2), x), Literal(3))) == "2 * x + 3"
+        assert str(Mul(Add(x, Literal(2)), Literal(3))) == "(x + 2) * 3"
+        assert str(Sub(x, Sub(x, Literal(1)))) == "x - (x - 1)"
+        assert str(Sub(Sub(x, x), Literal(1))) == "x - x - 1"
+        assert str(Pow(x, Pow(x, Literal(2)))) == "x ^ x ^ 2"
+        assert str(Pow(Pow(x, x), Literal(2))) == "(x ^ x) ^ 2"
+        assert str(Pow(Literal(-2), x)) == "(-2) ^ x"
+
+    def test_write_to_file(self):
+        """Test streaming the printed form into a file-like object."""
+        expr = Mul(Add(Variable("x"), Literal(2)), Pow(Variable("y"), Literal(3)))
+        out = io.StringIO()
+        CalcLangPrinterContext().write(expr, out)
+        assert out.getvalue() == str(expr) == "(x + 2) * y ^ 3"
+
+    def test_deep_expression(self):
+        """Test printing an expression deeper than the recursion limit."""
+        expr = Literal(0)
+        for i in range(1, 5000):
+            expr = Sub(Literal(i), expr)
+        s = str(expr)
+        assert s.startswith("4999 - (4998 - (")
+        assert s.endswith("(1 - 0" + ")" * 4998)
+
+    def test_shared_subexpressions(self):
+        """Test printing a DAG whose subtrees are shared by several parents."""
+        x = Variable("x")
+        expr = Add(x, Literal(1))
+        for _ in range(8):
+            expr = Mul(expr, expr)
+        chunks = list(CalcLangPrinterContext().stream(expr))
+        assert "".join(chunks) == str(expr)
+        assert str(expr).count("x + 1") == 2**8
+
+
+class TestCalcLangAnalysis:
+    """Test cached structural analyses of calc_lang nodes."""
+
+    def test_polynomial(self):
+        """Test the analyses of a polynomial in two variables."""
+        x, y = Variable("x"), Variable("y")
+        expr = Add(Mul(Literal(3), Pow(x, Literal(2))), Sub(Mul(x, y), Literal(1)))
+        assert expr.size == 11
+        assert expr.depth == 4
+        assert expr.free_variables == {"x", "y"}
+        assert not expr.is_constant
+        assert expr.degrees == {"x": 2, "y": 1}
+        assert expr.degree("x") == 2
+        assert expr.degree("z") == 0
+        assert Pow(Literal(2), Literal(3)).is_constant
+
+    def test_not_polynomial(self):
+        """Test the degrees of expressions which are not polynomials."""
+        x = Variable("x")
+        assert Pow(x, Variable("y")).degrees is None
+        assert Pow(x, Literal(0.5)).degree("x") is None
+        assert Add(Pow(Literal(2), Literal(-1)), x).degrees == {"x": 1}
+
+    def test_cached(self):
+        """Test that analyses are computed once and shared by parents."""
+        x = Variable("x")
+        expr = Add(x, Literal(1))
+        assert "size" not in expr.__dict__
+        assert expr.size == 3
+        assert expr.__dict__["size"] == 3
+        assert x.__dict__["size"] == 1
+        assert Mul(expr, expr).size == 7
+        assert expr == Add(Variable("x"), Literal(1))
+
+    def test_digest_cached(self):
+        """Test that structural digests are cached and reused by parents."""
+        x = Variable("x")
+        expr = Add(x, Literal(1))
+        digest = structural_hash(expr)
+        assert expr.__dict__["digest"].hex() == digest
+        assert "digest" in x.__dict__
+        assert structural_hash(Add(Variable("x"), Literal(1))) == digest
+        assert structural_hash(Add(x, Literal(1.0))) != digest
+        deep = Variable("x")
+        for i in range(5000):
+            deep = Sub(Literal(i), deep)
+        assert len(structural_hash(deep)) == 64
+
+    def test_deep_expression(self):
+        """Test analysing an expression deeper than the recursion limit."""
+        expr = Variable("x")
+        for i in range(1, 5000):
+            expr = Sub(Literal(i), expr)
+        assert expr.depth == 5000
+        assert expr.degrees == {"x": 1}
@@ -0,0 +1,83 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    ChunkedInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Variable,
+)
+from calc.calc_lang.chunked import iter_chunks
+
+x = Variable("x")
+y = Variable("y")
+program = Add(Mul(Literal(3), Pow(x, Literal(2))), Mul(x, y))
+
+
+def test_memory_mapped_columns(rng, tmp_path):
+    xs = rng.random(1000)
+    ys = rng.random(1000).astype(np.float32)
+    np.save(tmp_path / "x.npy", xs)
+    ys.tofile(tmp_path / "y.bin")
+    interp = ChunkedInterpreter(chunk_size=64)
+    out = interp(
+        program,
+        {"x": tmp_path / "x.npy", "y": tmp_path / "y.bin"},
+        out=tmp_path / "out.npy",
+        dtypes={"y": np.float32},
+    )
+    assert isinstance(out, np.memmap)
+    expected = CalcLangInterpreter()(program, {"x": xs, "y": ys})
+    np.testing.assert_allclose(np.load(tmp_path / "out.npy"), expected)
+
+
+def test_in_memory_output(rng):
+    xs = rng.random(100)
+    out = np.zeros(100)
+    result = ChunkedInterpreter(chunk_size=7)(program, {"x": xs, "y": 2.0}, out=out)
+    assert result is out
+    np.testing.assert_allclose(out, 3 * xs**2 + 2 * xs)
+    np.testing.assert_allclose(
+        ChunkedInterpreter(chunk_size=7)(program, {"x": xs, "y": 2.0}), out
+    )
+
+
+def test_stream(rng):
+    xs = rng.random(10)
+    chunks = ({"x": xs[i : i + 3], "y": 1} for i in range(0, 10, 3))
+    results = list(ChunkedInterpreter().stream(program, chunks))
+    assert [len(r) for r in results] == [3, 3, 3, 1]
+    np.testing.assert_allclose(np.concatenate(results), 3 * xs**2 + xs)
+
+
+def test_empty_columns(tmp_path):
+    result = ChunkedInterpreter()(program, {"x": np.zeros(0), "y": 2.0})
+    assert result.shape == (0,)
+    assert result.dtype == np.float64
+    out = ChunkedInterpreter()(
+        program, {"x": np.zeros(0), "y": 2.0}, out=tmp_path / "o.npy"
+    )
+    assert np.load(tmp_path / "o.npy").shape == (0,)
+    assert out.shape == (0,)
+
+
+def test_result_dtype():
+    # The first chunk of the list alone would give an integer result.
+    xs = np.array([1, 2, 3, 4])
+    result = ChunkedInterpreter(chunk_size=2)(
+        Mul(x, y), {"x": xs, "y": [1, 1, 0.5, 0.5]}
+    )
+    assert result.dtype == np.float64
+    np.testing.assert_allclose(result, [1, 2, 1.5, 2])
+    assert ChunkedInterpreter(chunk_size=2)(Mul(x, y), {"x": xs, "y": 2}).dtype == (
+        np.int64
+    )
+
+
+def test_mismatched_columns():
+    with pytest.raises(ValueError):
+        list(iter_chunks({"x": np.zeros(3), "y": np.zeros(4)}, 2))
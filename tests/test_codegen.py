@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import Add, CalcLangInterpreter, Literal, Mul, Pow, Sub, Variable
+from calc.codegen import CCompiler, CInterpreter, c_kernel_source
+
+x = Variable("x")
+y = Variable("y")
+
+programs = [
+    Literal(2),
+    Add(Mul(Literal(3), Pow(x, Literal(4))), Sub(Pow(y, Literal(0.5)), Literal(-2))),
+    Pow(Add(x, y), Literal(7)),
+    Mul(Pow(x, y), Sub(x, y)),
+]
+
+requires_cc = pytest.mark.skipif(CCompiler().cc is None, reason="no C compiler")
+
+
+@requires_cc
+@pytest.mark.parametrize("program", programs)
+def test_c_kernel(program, rng, tmp_path):
+    interp = CInterpreter(CCompiler(cache_dir=tmp_path))
+    bindings = {"x": rng.random(100), "y": rng.random(100) + 1}
+    assert interp.compiler(program).compiled
+    np.testing.assert_allclose(
+        interp(program, bindings), CalcLangInterpreter()(program, bindings)
+    )
+
+
+@requires_cc
+def test_broadcasting(rng, tmp_path):
+    program = programs[1]
+    interp = CInterpreter(CCompiler(cache_dir=tmp_path))
+    bindings = {"x": rng.random((5, 1)), "y": rng.random(3)}
+    expected = CalcLangInterpreter()(program, bindings)
+    np.testing.assert_allclose(interp(program, bindings), expected)
+    np.testing.assert_allclose(interp(program, {"x": 2.0, "y": 4}), 52.0)
+
+
+@requires_cc
+def test_kernel_cache(tmp_path):
+    program = programs[2]
+    compiler = CCompiler(cache_dir=tmp_path)
+    assert compiler(program) is compiler(Pow(Add(x, y), Literal(7)))
+    (lib,) = tmp_path.glob("*.so")
+    mtime = lib.stat().st_mtime_ns
+    # A fresh compiler loads the shared object compiled by the first one.
+    assert CCompiler(cache_dir=tmp_path)(program).compiled
+    assert list(tmp_path.glob("*.so")) == [lib]
+    assert lib.stat().st_mtime_ns == mtime
+
+
+def test_fallback_without_compiler(rng, tmp_path):
+    program = programs[1]
+    interp = CInterpreter(CCompiler(cc="/nonexistent/cc", cache_dir=tmp_path))
+    assert not interp.compiler(program).compiled
+    bindings = {"x": rng.random(10), "y": rng.random(10)}
+    np.testing.assert_allclose(
+        interp(program, bindings), CalcLangInterpreter()(program, bindings)
+    )
+    with pytest.raises(KeyError):
+        interp(program, {"x": 1.0})
+
+
+def test_kernel_source():
+    src = c_kernel_source(Mul(Pow(x, Literal(2)), Pow(x, Literal(2))), ["x"])
+    assert "pow(" not in src
+    assert src.count("= v_x * v_x;") == 1
+
+
+def test_default_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("CALC_CACHE_DIR", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    if os.name != "nt":
+        assert CCompiler().cache_dir == tmp_path / "calc"
+
+
+@requires_cc
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permissions")
+def test_untrusted_cache_dir(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    assert not CCompiler(cache_dir=shared)(programs[2]).compiled
+    assert not list(shared.iterdir())
+    private = tmp_path / "private"
+    assert CCompiler(cache_dir=private)(programs[2]).compiled
+    assert private.stat().st_mode & 0o777 == 0o700
+    (lib,) = private.glob("*.so")
+    assert not lib.stat().st_mode & 0o022
+    # A library others could have replaced is not loaded.
+    lib.chmod(0o777)
+    assert not CCompiler(cache_dir=private)(programs[2]).compiled
+
+
+@requires_cc
+def test_concurrent_compilation(tmp_path):
+    compilers = [CCompiler(cache_dir=tmp_path) for _ in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        kernels = list(pool.map(lambda c: c(programs[3]), compilers))
+    assert all(kernel.compiled for kernel in kernels)
+    assert len(list(tmp_path.glob("*.so"))) == 1
+    assert len(list(tmp_path.glob("*.c"))) == 1
+    assert not list(tmp_path.glob("tmp*"))
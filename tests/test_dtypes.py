@@ -0,0 +1,84 @@
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangGradientInterpreter,
+    CalcLangIncrementalMachine,
+    CalcLangInterpreter,
+    CalcLangMachine,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Sum,
+    Variable,
+)
+from calc.calc_lang.dtypes import infer_dtypes
+from calc.codegen import compile_python_kernel
+
+x = Variable("x")
+y = Variable("y")
+
+
+def test_weak_literals():
+    program = Add(Mul(x, Pow(Literal(2), Literal(3))), Literal(1.5))
+    assert infer_dtypes(program, {"x": np.float32}).dtype == np.float32
+    assert infer_dtypes(program, {"x": np.int32}).dtype == np.float64
+    assert infer_dtypes(Sub(x, Literal(1)), {"x": np.int16}).dtype == np.int16
+    assert infer_dtypes(Sum((x, y)), {"x": np.int16, "y": np.float32}).dtype == (
+        np.float32
+    )
+
+
+def test_integer_powers():
+    analysis = infer_dtypes(Pow(x, Literal(3)), {"x": np.int64}, {"x": (-1000, 1000)})
+    assert analysis.dtype == np.int64
+    assert analysis.overflows == []
+    program = Pow(Add(x, Literal(1)), Literal(10))
+    analysis = infer_dtypes(program, {"x": np.int64}, {"x": (0, 1000)})
+    assert analysis.overflows == [program]
+    assert analysis.bounds[id(program)] == (1, 1001.0**10)
+    assert infer_dtypes(Pow(x, Literal(2)), {"x": np.int8}).overflows
+    assert infer_dtypes(Pow(x, Literal(-1)), {"x": np.int64}).dtype == np.float64
+    assert infer_dtypes(Pow(x, y), {"x": np.int64, "y": np.int64}).dtype == (np.float64)
+    analysis = infer_dtypes(Pow(x, y), {"x": np.int64, "y": np.uint8})
+    assert analysis.dtype == np.int64
+    assert analysis.overflows
+
+
+def test_machine_types():
+    program = Mul(Add(x, y), Literal(2))
+    machine = CalcLangMachine({"x": np.ones(3, dtype=np.float32), "y": 1})
+    analysis = machine.infer_types(program)
+    assert analysis.types[id(program)] == np.float64
+    assert analysis.types[id(program.left.left)] == np.float32
+    assert analysis.dtype == np.float64
+
+
+def test_negative_integer_powers():
+    program = Pow(x, Literal(-1))
+    bindings = {"x": np.arange(1, 5)}
+    result = CalcLangInterpreter()(program, bindings)
+    assert result.dtype == infer_dtypes(program, {"x": np.int64}).dtype
+    assert np.allclose(result, 1 / bindings["x"])
+    assert CalcLangInterpreter()(Pow(Literal(2), x), {"x": np.int64(-2)}) == 0.25
+    assert CalcLangInterpreter()(Pow(x, Literal(2)), bindings).dtype == np.int64
+
+
+def test_negative_integer_powers_in_every_evaluator():
+    program = Add(Pow(x, Literal(-1)), x)
+    bindings = {"x": np.arange(1, 5)}
+    expected = CalcLangInterpreter()(program, bindings)
+    assert np.allclose(expected, 1 / bindings["x"] + bindings["x"])
+    assert np.array_equal(compile_python_kernel(program)(bindings), expected)
+    assert np.array_equal(CalcLangIncrementalMachine(program, bindings)(), expected)
+    for mode in ["forward", "reverse"]:
+        value, grads = CalcLangGradientInterpreter(mode)(program, bindings, {"x"})
+        assert np.array_equal(value, expected)
+        assert np.allclose(grads["x"], 1 - 1 / bindings["x"] ** 2.0)
+
+
+def test_huge_integer_powers():
+    analysis = infer_dtypes(Pow(x, Literal(10**400)), {"x": "int64"})
+    assert analysis.dtype == np.int64
+    assert analysis.overflows
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import Add, CalcLangInterpreter, Literal, Mul, Pow, Sub, Variable
+from calc.optimize import commute, mul_count, optimize, rules
+from calc.symbolic import EGraph, ast_size
+
+x = Variable("x")
+y = Variable("y")
+a = Variable("a")
+
+
+def test_hashconsing():
+    egraph = EGraph()
+    assert egraph.add(Add(x, y)) == egraph.add(Add(x, y))
+    assert egraph.add(Add(x, y)) != egraph.add(Add(y, x))
+    assert len(egraph) == 4
+
+
+def test_exact_leaves():
+    egraph = EGraph()
+    assert egraph.add(Literal(1)) != egraph.add(Literal(1.0))
+    assert egraph.add(Literal(0.0)) != egraph.add(Literal(-0.0))
+    assert egraph.add(Literal(1)) == egraph.add(Literal(1))
+    root = egraph.add(Add(x, Literal(-0.0)))
+    result = egraph.extract(root)
+    assert str(result.right.val) == "-0.0"
+
+
+def test_congruence():
+    egraph = EGraph()
+    fx = egraph.add(Mul(x, Literal(2)))
+    fy = egraph.add(Mul(y, Literal(2)))
+    egraph.union(egraph.add(x), egraph.add(y))
+    egraph.rebuild()
+    assert egraph.find(fx) == egraph.find(fy)
+
+
+def test_saturation_is_non_destructive():
+    egraph = EGraph()
+    root = egraph.add(Add(x, y))
+    assert egraph.saturate([commute]) == "saturated"
+    assert egraph.find(egraph.add(Add(y, x))) == root
+    assert egraph.extract(root, ast_size) in (Add(x, y), Add(y, x))
+
+
+def test_budget():
+    egraph = EGraph()
+    expr = Add(Add(Add(Add(x, y), a), Literal(1)), Literal(2))
+    egraph.add(expr)
+    assert egraph.saturate(rules, node_limit=50) == "node_limit"
+    assert egraph.saturate(rules, iter_limit=1) == "iter_limit"
+    assert egraph.saturate(rules, time_limit=0.0) == "time_limit"
+
+
+def test_time_limit_within_round():
+    egraph = EGraph()
+    egraph.add(Mul(Add(Add(x, y), a), Add(Sub(x, a), Literal(3))))
+    start = time.monotonic()
+    assert egraph.saturate(rules, iter_limit=100, time_limit=0.2) == "time_limit"
+    assert time.monotonic() - start < 1.5
+
+
+def test_optimize_default_budget():
+    start = time.monotonic()
+    optimize(Mul(x, Literal(0)))
+    assert time.monotonic() - start < 5
+
+
+def test_optimize_keeps_annihilated_operands():
+    interp = CalcLangInterpreter()
+    for program in [Mul(Literal(0), x), Sub(x, x)]:
+        result = optimize(program, time_limit=0.2)
+        values = np.array([1.0, np.inf, np.nan])
+        with np.errstate(invalid="ignore"):
+            expected = interp(program, {"x": values})
+            np.testing.assert_array_equal(interp(result, {"x": values}), expected)
+    assert optimize(Mul(Literal(0), Literal(2.5))) == Literal(0)
+
+
+@pytest.mark.parametrize(
+    "program, muls",
+    [
+        (Add(Mul(a, x), Mul(a, y)), 1),
+        (Sub(Mul(x, a), Mul(y, a)), 1),
+        (Mul(Add(Literal(2), Literal(3)), Pow(x, Literal(1))), 1),
+        (
+            Add(
+                Mul(Literal(3), Pow(x, Literal(3))),
+                Add(Mul(Literal(2), Pow(x, Literal(2))), Add(Mul(Literal(5), x), a)),
+            ),
+            3,
+        ),
+    ],
+)
+def test_optimize(program, muls):
+    result = optimize(program)
+    assert _cost(result)[0] == muls
+    interp = CalcLangInterpreter()
+    for value in range(-5, 5):
+        bindings = {"x": value, "y": value * 3 - 1, "a": 7 - value}
+        assert interp(result, bindings) == interp(program, bindings)
+
+
+def _cost(node):
+    if isinstance(node, Add | Sub | Mul | Pow):
+        return mul_count(type(node), [_cost(arg) for arg in node.children])
+    return mul_count(node, [])
@@ -0,0 +1,112 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import Add, Literal, Mul, Pow, Product, Sub, Sum, Variable
+from calc.equivalence import (
+    PRIME,
+    deduplicate,
+    equivalent,
+    field_values,
+    fingerprints,
+)
+
+x = Variable("x")
+y = Variable("y")
+
+
+def square(a):
+    return Pow(a, Literal(2))
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        (Mul(Add(x, y), Sub(x, y)), Sub(square(x), square(y))),
+        (
+            square(Add(x, Literal(1))),
+            Add(Add(square(x), Mul(Literal(2), x)), Literal(1)),
+        ),
+        (Mul(Pow(x, Literal(-1)), x), Literal(1)),
+        (Mul(Literal(0.5), Mul(Literal(2), x)), x),
+        (Pow(x, Add(Literal(1), Literal(2))), Product((x, x, x))),
+        (Sum((x, y, x)), Add(Mul(Literal(2), x), y)),
+        (Pow(x, Literal(0.5)), Pow(Pow(x, Literal(0.25)), Literal(2))),
+        (Pow(x, y), Pow(x, Add(y, Literal(0)))),
+    ],
+)
+def test_equivalent(a, b, rng):
+    assert equivalent(a, b, rng=rng)
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        (square(Add(x, y)), Add(square(x), square(y))),
+        (Pow(x, Literal(40)), Pow(x, Literal(41))),
+        (Mul(Literal(0.1), x), Mul(Literal(0.11), x)),
+        (Pow(x, y), Pow(y, x)),
+        (x, y),
+    ],
+)
+def test_not_equivalent(a, b, rng):
+    assert not equivalent(a, b, rng=rng)
+
+
+def test_field_values():
+    points = {"x": np.array([1, 2, PRIME - 1]), "y": np.array([3, 4, 5])}
+    half = Mul(Literal(0.5), x)
+    a, b, c = field_values([Sub(x, y), half, Pow(x, y)], points)
+    assert list(a) == [PRIME - 2, PRIME - 2, PRIME - 6]
+    assert list(b * 2 % PRIME) == list(points["x"])
+    assert c is None
+
+
+def test_fingerprints_shared(rng):
+    shared = square(Add(x, Literal(1)))
+    exprs = [shared, Mul(shared, y), shared]
+    keys = fingerprints(exprs, rng=rng)
+    assert keys[0] == keys[2] != keys[1]
+
+
+def test_deduplicate(rng):
+    exprs = []
+    for k in range(50):
+        exprs.append(Mul(Add(x, Literal(k)), Add(x, Literal(k))))
+        exprs.append(Add(Add(square(x), Mul(Literal(2 * k), x)), Literal(k * k)))
+        exprs.append(Pow(Add(x, Literal(k)), Literal(2.5)))
+        exprs.append(
+            Mul(
+                Pow(Add(x, Literal(k)), Literal(0.5)),
+                Pow(Add(x, Literal(k)), Literal(2)),
+            )
+        )
+    groups = deduplicate(exprs, rng=rng)
+    assert len(groups) == 100
+    assert groups[0] == [0, 1]
+    assert groups[1] == [2, 3]
+    assert deduplicate([], rng=rng) == []
+
+
+def sqrt(a):
+    return Pow(a, Literal(0.5))
+
+
+def test_undefined_not_equivalent(rng):
+    a = sqrt(Sub(x, Literal(5)))
+    b = sqrt(Sub(x, Literal(7)))
+    assert not equivalent(a, b, rng=rng)
+    assert equivalent(a, sqrt(Sub(x, Literal(5))), rng=rng)
+    assert deduplicate([a, b, a], rng=rng) == [[0, 2], [1]]
+    # Undefined everywhere: never equivalent, never grouped.
+    c = sqrt(Sub(Literal(-1), Mul(x, x)))
+    d = sqrt(Sub(Literal(-2), Mul(x, x)))
+    assert not equivalent(c, d, rng=rng)
+    assert not equivalent(c, c, rng=rng)
+    assert deduplicate([c, d], rng=rng) == [[0], [1]]
+
+
+def test_zero_to_negative_power(rng):
+    zero = Sub(x, x)
+    assert field_values([Pow(zero, Literal(-1))], {"x": np.array([1, 2])}) == [None]
+    assert not equivalent(Pow(zero, Literal(-1)), Literal(0), rng=rng)
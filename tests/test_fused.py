@@ -0,0 +1,98 @@
+import warnings
+
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    FusedInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+    Variable,
+)
+from calc.calc_lang.fused import compile_fused
+
+x = Variable("x")
+y = Variable("y")
+z = Variable("z")
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        Add(Mul(Literal(3), Pow(x, Literal(2))), Sub(Mul(x, y), Literal(1))),
+        Sub(Pow(Add(x, Literal(1)), Literal(3)), Mul(y, Add(z, x))),
+        Sum((x, Product((y, z, x)), Mul(x, y), x)),
+        Sum((Mul(x, y), Literal(2), Mul(y, z))),
+        Product((Add(x, y),)),
+        Mul(Add(Literal(1), Literal(2)), x),
+        x,
+    ],
+)
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_fused_matches_interpreter(program, block_size, rng):
+    bindings = {"x": rng.random((50, 3)), "y": rng.random(3), "z": 2.0}
+    expected = CalcLangInterpreter()(program, bindings)
+    result = FusedInterpreter(block_size)(program, bindings)
+    assert result.shape == np.broadcast_shapes(np.shape(expected), (50, 3))
+    assert np.allclose(result, expected)
+
+
+def test_fused_registers():
+    """Registers are reused, so deep chains need few scratch buffers."""
+    program = x
+    for i in range(1000):
+        program = Add(Mul(program, y), Literal(i))
+    assert compile_fused(program).registers == 1
+    balanced = [Variable(f"v{i}") for i in range(64)]
+    while len(balanced) > 1:
+        balanced = [
+            Mul(a, b) for a, b in zip(balanced[::2], balanced[1::2], strict=False)
+        ]
+    assert compile_fused(balanced[0]).registers <= 6
+
+
+def test_fused_out(rng):
+    bindings = {"x": rng.random(1000), "y": rng.random(1000)}
+    out = np.zeros(1000)
+    program = Add(Mul(x, x), y)
+    result = FusedInterpreter(64)(program, bindings, out=out)
+    assert result is out
+    assert np.allclose(out, bindings["x"] ** 2 + bindings["y"])
+
+
+def test_fused_scalars():
+    assert FusedInterpreter()(Add(x, Literal(1)), {"x": 2}) == 3
+
+
+def test_fused_undefined(rng):
+    with pytest.raises(KeyError):
+        FusedInterpreter()(Add(x, y), {"x": rng.random(10)})
+
+
+def test_fused_float32(rng):
+    bindings = {"x": rng.random(100, dtype=np.float32), "y": rng.random(100)}
+    program = Add(Mul(x, Literal(2.5)), Pow(x, Literal(2)))
+    assert FusedInterpreter()(program, bindings).dtype == np.float32
+    result = FusedInterpreter(dtype=np.float32)(Add(program, y), bindings)
+    assert result.dtype == np.float32
+    assert np.allclose(result, CalcLangInterpreter()(Add(program, y), bindings))
+
+
+def test_fused_integer_powers():
+    bindings = {"x": np.arange(1, 10)}
+    assert np.allclose(
+        FusedInterpreter()(Pow(x, Literal(-1)), bindings), 1 / bindings["x"]
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = FusedInterpreter()(Pow(x, Literal(3)), bindings)
+    assert list(result) == list(bindings["x"] ** 3)
+    with pytest.warns(RuntimeWarning, match="overflow"):
+        FusedInterpreter()(Pow(x, Literal(3)), {"x": np.array([1, 10**7])})
@@ -0,0 +1,96 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangGradientInterpreter,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Variable,
+)
+
+x = Variable("x")
+y = Variable("y")
+z = Variable("z")
+
+# f(x, y, z) = (x + 2) * y ^ 3 - x ^ 2 * z
+program = Sub(
+    Mul(Add(x, Literal(2)), Pow(y, Literal(3))),
+    Mul(Pow(x, Literal(2)), z),
+)
+
+
+def expected_gradient(x, y, z):
+    return {
+        "x": y**3 - 2 * x * z,
+        "y": 3 * (x + 2) * y**2,
+        "z": -(x**2),
+    }
+
+
+@pytest.mark.parametrize("mode", ["forward", "reverse", "auto"])
+def test_scalar_gradient(mode):
+    interp = CalcLangGradientInterpreter(mode=mode)
+    bindings = {"x": 3, "y": -2, "z": 5}
+    value, grads = interp(program, bindings=bindings)
+    assert value == CalcLangInterpreter()(program, bindings=bindings)
+    assert grads == expected_gradient(**bindings)
+
+
+@pytest.mark.parametrize("mode", ["forward", "reverse"])
+def test_batched_gradient(mode, rng):
+    interp = CalcLangGradientInterpreter(mode=mode)
+    bindings = {name: rng.standard_normal(16) for name in "xyz"}
+    value, grads = interp(program, bindings=bindings)
+    np.testing.assert_allclose(value, CalcLangInterpreter()(program, bindings))
+    for name, grad in expected_gradient(**bindings).items():
+        np.testing.assert_allclose(grads[name], grad)
+
+
+@pytest.mark.parametrize("mode", ["forward", "reverse"])
+def test_gradient_wrt_subset(mode):
+    interp = CalcLangGradientInterpreter(mode=mode)
+    expr = Add(Mul(Literal(4), x), Literal(1))
+    value, grads = interp(expr, bindings={"x": np.arange(3.0), "y": 1.0}, wrt=["y"])
+    np.testing.assert_array_equal(value, [1.0, 5.0, 9.0])
+    np.testing.assert_array_equal(grads["y"], np.zeros(3))
+
+
+@pytest.mark.parametrize("mode", ["forward", "reverse"])
+def test_variable_exponent(mode):
+    interp = CalcLangGradientInterpreter(mode=mode)
+    value, grads = interp(Pow(x, y), bindings={"x": 2.0, "y": 3.0})
+    assert value == 8.0
+    assert grads["x"] == pytest.approx(12.0)
+    assert grads["y"] == pytest.approx(8.0 * np.log(2.0))
+
+
+@pytest.mark.parametrize("mode", ["forward", "reverse"])
+def test_shared_subexpressions(mode):
+    interp = CalcLangGradientInterpreter(mode=mode)
+    expr = Add(x, Literal(1))
+    for _ in range(40):
+        expr = Mul(expr, Literal(1))
+        expr = Sub(Add(expr, expr), expr)
+    value, grads = interp(expr, bindings={"x": 2})
+    assert value == 3
+    assert grads == {"x": 1}
+
+
+@pytest.mark.parametrize("mode", ["forward", "reverse"])
+def test_zero_base_fractional_exponent(mode):
+    interp = CalcLangGradientInterpreter(mode=mode)
+    value, grads = interp(Pow(x, Literal(0.5)), bindings={"x": 0})
+    assert value == 0
+    assert grads == {"x": np.inf}
+    value, grads = interp(Pow(x, Literal(0.5)), bindings={"x": np.array([0.0, 4.0])})
+    assert list(grads["x"]) == [np.inf, 0.25]
+
+
+def test_undefined_variable():
+    with pytest.raises(KeyError):
+        CalcLangGradientInterpreter()(Add(x, y), bindings={"x": 1})
@@ -0,0 +1,82 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    FusedInterpreter,
+    GridInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Variable,
+)
+from calc.calc_lang.grid import iter_tiles
+
+x = Variable("x")
+y = Variable("y")
+z = Variable("z")
+
+paraboloid = Add(
+    Pow(Sub(x, Literal(1)), Literal(2)), Pow(Add(y, Literal(2)), Literal(2))
+)
+
+
+@pytest.mark.parametrize("tile_size", [1, 37, 1 << 16])
+@pytest.mark.parametrize("interpreter", [CalcLangInterpreter(), FusedInterpreter(16)])
+def test_grid_reductions(tile_size, interpreter):
+    axes = {"x": np.linspace(-3, 3, 61), "y": np.linspace(-3, 3, 31), "z": [1, 2]}
+    program = Mul(paraboloid, z)
+    result = GridInterpreter(tile_size, interpreter)(
+        program, axes, ["sum", "mean", "min", "max", "argmin", "argmax"]
+    )
+    X, Y, Z = np.meshgrid(*axes.values(), indexing="ij")
+    full = ((X - 1) ** 2 + (Y + 2) ** 2) * Z
+    assert np.isclose(result["sum"], full.sum())
+    assert np.isclose(result["mean"], full.mean())
+    assert np.isclose(result["min"], full.min())
+    assert np.isclose(result["max"], full.max())
+    assert result["argmin"] == pytest.approx({"x": 1.0, "y": -2.0, "z": 1})
+    assert result["argmax"] == pytest.approx({"x": -3.0, "y": 3.0, "z": 2})
+
+
+def test_grid_bindings():
+    result = GridInterpreter(4)(
+        Add(x, y), {"x": np.arange(10)}, ["sum", "argmax"], bindings={"y": 5}
+    )
+    assert result["sum"] == 45 + 50
+    assert result["argmax"] == {"x": 9}
+
+
+def test_grid_stream_bounded():
+    interpreter = GridInterpreter(1000)
+    axes = {"x": np.arange(100), "y": np.arange(100), "z": np.arange(100)}
+    sizes = {len(values) for _, values in interpreter.stream(Mul(x, y), axes)}
+    assert sizes == {1000}
+
+
+def test_grid_tiles_broadcast():
+    axes = {"x": np.arange(4), "y": np.arange(5), "z": np.arange(6)}
+    tiles = list(iter_tiles(axes, 12))
+    assert [len(indices) for indices, _ in tiles] == [12, 12, 6] * 4
+    indices, tile = tiles[1]
+    assert list(indices) == list(range(12, 24))
+    assert {name: v.shape for name, v in tile.items()} == {
+        "x": (1, 1, 1),
+        "y": (1, 2, 1),
+        "z": (1, 1, 6),
+    }
+    assert np.concatenate([i for i, _ in tiles]).tolist() == list(range(120))
+
+
+@pytest.mark.parametrize("reduction", ["sum", "mean", "min", "argmin"])
+def test_grid_empty(reduction):
+    with pytest.raises(ValueError, match="empty"):
+        GridInterpreter()(Add(x, y), {"x": [1, 2], "y": []}, [reduction])
+
+
+def test_grid_unknown_reduction():
+    with pytest.raises(ValueError):
+        GridInterpreter()(x, {"x": [1, 2]}, ["median"])
@@ -0,0 +1,72 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangIncrementalMachine,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Sum,
+    Variable,
+)
+
+x = Variable("x")
+y = Variable("y")
+z = Variable("z")
+
+
+def test_incremental_matches_interpreter(rng):
+    shared = Mul(x, y)
+    program = Sum((Pow(Add(shared, z), Literal(2)), Sub(shared, Literal(3)), z))
+    bindings = {"x": 1.0, "y": 2.0, "z": 3.0}
+    machine = CalcLangIncrementalMachine(program, bindings)
+    interpret = CalcLangInterpreter()
+    assert machine() == interpret(program, bindings)
+    for _ in range(20):
+        name = rng.choice(["x", "y", "z"])
+        bindings[name] = rng.random()
+        assert machine.update({name: bindings[name]}) == pytest.approx(
+            interpret(program, bindings)
+        )
+
+
+def test_incremental_recomputes_affected_paths():
+    # A balanced tree over 64 variables, each used once.
+    leaves = [Variable(f"v{i}") for i in range(64)]
+    while len(leaves) > 1:
+        leaves = [Add(a, b) for a, b in zip(leaves[::2], leaves[1::2], strict=True)]
+    bindings = {f"v{i}": i for i in range(64)}
+    machine = CalcLangIncrementalMachine(leaves[0], bindings)
+    assert machine() == sum(range(64))
+    assert machine.evaluations == 63
+    assert machine.update(v5=100) == sum(range(64)) - 5 + 100
+    assert machine.evaluations == 63 + 6
+    assert machine.update(unused=1) == sum(range(64)) - 5 + 100
+    assert machine.evaluations == 63 + 6
+
+
+def test_incremental_arrays(rng):
+    program = Add(Mul(x, x), y)
+    machine = CalcLangIncrementalMachine(program, {"x": rng.random(4), "y": 1.0})
+    new_x = rng.random(4)
+    assert np.allclose(machine.update(x=new_x), new_x * new_x + 1.0)
+
+
+def test_incremental_undefined():
+    with pytest.raises(KeyError):
+        CalcLangIncrementalMachine(Add(x, y), {"x": 1})
+
+
+def test_incremental_failed_update():
+    program = Add(Mul(x, y), Pow(z, Literal(-1)))
+    machine = CalcLangIncrementalMachine(program, {"x": 2, "y": 3, "z": 1})
+    assert machine() == 7
+    with pytest.raises(ZeroDivisionError):
+        machine.update(x=4, z=0)
+    assert machine.bindings == {"x": 2, "y": 3, "z": 1}
+    assert machine() == 7
+    assert machine.update(y=5) == 11
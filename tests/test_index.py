@@ -0,0 +1,66 @@
+from calc.calc_lang import Add, Literal, Mul, Pow, Sum, Variable
+from calc.symbolic import PreOrderDFS, SubtermIndex, Wildcard, match
+
+x = Variable("x")
+y = Variable("y")
+_ = Wildcard()
+a = Wildcard("a")
+
+
+def test_match():
+    assert match(Mul(Add(_, _), _), Mul(Add(x, y), Literal(2))) == {}
+    assert match(Add(a, a), Add(x, x)) == {"a": x}
+    assert match(Add(a, a), Add(x, y)) is None
+    assert match(Pow(_, Literal(2)), Pow(x, Literal(3))) is None
+    assert match(Sum((_, _)), Sum((x, y, x))) is None
+
+
+def test_index_query(rng):
+    corpus = []
+    for i in range(200):
+        expr = Add(Variable(f"v{i}"), Literal(i))
+        if i % 3 == 0:
+            expr = Mul(expr, Pow(x, Literal(2)))
+        if i % 5 == 0:
+            expr = Add(expr, Mul(y, y))
+        corpus.append(expr)
+    index = SubtermIndex()
+    for expr in corpus:
+        index.add(expr)
+
+    def brute_force(pattern):
+        return {
+            key
+            for key, expr in enumerate(corpus)
+            if any(match(pattern, sub) is not None for sub in PreOrderDFS(expr))
+        }
+
+    patterns = [
+        Mul(Add(_, _), _),
+        Mul(a, a),
+        Pow(_, Literal(2)),
+        Add(Mul(_, Pow(x, _)), Mul(_, _)),
+        Literal(7),
+        _,
+    ]
+    for pattern in patterns:
+        assert index.keys(pattern) == brute_force(pattern)
+    matches = list(index.query(Mul(Add(_, _), _)))
+    assert len(matches) == 67
+    assert len(index.candidates(Mul(Add(_, _), _))) == 67
+
+
+def test_index_remove():
+    index = SubtermIndex()
+    shared = Mul(x, y)
+    index.add(Add(shared, Literal(1)), "first")
+    index.add(Add(shared, Literal(2)), "second")
+    assert index.keys(Mul(_, _)) == {"first", "second"}
+    index.remove("first")
+    assert index.keys(Mul(_, _)) == {"second"}
+    assert index.keys(Literal(1)) == set()
+    index.add(Pow(x, Literal(2)), "second")
+    assert index.keys(Mul(_, _)) == set()
+    assert len(index) == 1
+    index.remove("second")
+    assert not index.postings and not index.subterms
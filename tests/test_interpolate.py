@@ -0,0 +1,131 @@
+from fractions import Fraction
+
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import Add, CalcLangInterpreter, Literal, Mul, Pow, Sub, Variable
+from calc.interpolate import (
+    interpolate,
+    normalize_by_interpolation,
+    polynomial_form,
+    polynomial_size,
+)
+from calc.normalize import is_normalized, normalize
+from calc.substitute import polynomial_coefficients
+from calc.symbolic import PostOrderDAG, RewriteBudgetExceeded
+
+x = Variable("x")
+y = Variable("y")
+
+
+def product_of_sums(n):
+    node = Add(x, Literal(1))
+    for k in range(2, n + 1):
+        node = Mul(node, Sub(x, Literal(k)))
+    return node
+
+
+def test_interpolate():
+    # 3x^2 - 2x + 5
+    values = [3 * t**2 - 2 * t + 5 for t in range(3)]
+    assert interpolate(values) == [5, -2, 3]
+    assert interpolate([Fraction(1, 2)] * 4) == [Fraction(1, 2), 0, 0, 0]
+
+
+def test_polynomial_form():
+    assert polynomial_form("x", [7]) == Literal(7)
+    assert polynomial_form("x", [1, 2, 0]) == Add(Mul(Literal(2), x), Literal(1))
+    node = polynomial_form("x", [1, 0, 3])
+    assert node == Add(
+        Mul(Literal(3), Pow(x, Literal(2))), Add(Mul(Literal(0), x), Literal(1))
+    )
+    assert is_normalized(node)
+
+
+@pytest.mark.parametrize("n", [1, 3, 10, 25])
+def test_normalize_by_interpolation(n, rng):
+    node = product_of_sums(n)
+    result = normalize_by_interpolation(node)
+    assert is_normalized(result)
+    literals = [c for c in PostOrderDAG(result) if isinstance(c, Literal)]
+    assert all(type(c.val) is int for c in literals)
+    xs = rng.integers(-5, 5, size=10).astype(object)
+    interpreter = CalcLangInterpreter()
+    assert list(interpreter(result, {"x": xs})) == list(interpreter(node, {"x": xs}))
+
+
+def test_normalize_by_interpolation_floats():
+    node = Mul(Add(x, Literal(0.5)), Sub(x, Literal(0.25)))
+    result = normalize_by_interpolation(node)
+    assert polynomial_coefficients(result)[1] == pytest.approx([-0.125, 0.25, 1.0])
+
+
+def test_normalize_by_interpolation_floats_accurate():
+    # The values of this polynomial cancel heavily between its roots.
+    node = Literal(1)
+    for k in range(1, 17):
+        node = Mul(node, Sub(x, Literal(0.1 * k)))
+    result = normalize(node, strategy="interpolate")
+    assert is_normalized(result)
+    xs = np.linspace(0, 1.7, 35)
+    interpreter = CalcLangInterpreter()
+    expected = interpreter(node, {"x": xs})
+    assert interpreter(result, {"x": xs}) == pytest.approx(expected, abs=1e-9)
+    assert interpreter(result, {"x": 0.55}) == pytest.approx(
+        interpreter(node, {"x": 0.55}), abs=1e-11
+    )
+    # Automatic selection leaves float polynomials to rewriting.
+    assert normalize(node) == normalize(node, strategy="rewrite")
+
+
+def test_normalize_by_interpolation_rationals():
+    node = Add(Pow(x, Literal(8)), Pow(Literal(2), Literal(-1)))
+    result = normalize(node)
+    assert polynomial_coefficients(result) == ("x", [Fraction(1, 2)] + [0] * 7 + [1])
+    node = Mul(Pow(Literal(3), Literal(-1)), Pow(Add(x, Literal(1)), Literal(9)))
+    coefficients = polynomial_coefficients(normalize(node))[1]
+    assert coefficients[0] == Fraction(1, 3)
+    assert coefficients[1] == 3
+
+
+def test_normalize_by_interpolation_unsupported():
+    assert normalize_by_interpolation(Mul(x, y)) is None
+    assert normalize_by_interpolation(Pow(x, y)) is None
+    assert normalize_by_interpolation(Add(x, Literal(np.nan))) is None
+    assert normalize_by_interpolation(Add(Literal(2), Literal(3))) == Literal(5)
+
+
+def test_normalize_by_interpolation_budget():
+    node = Pow(Add(x, Literal(1)), Literal(200))
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        normalize(node, node_limit=100)
+    assert excinfo.value.reason == "node_limit"
+    assert excinfo.value.partial is node
+    assert normalize(node, node_limit=100, partial=True) is node
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        normalize(node, time_limit=0.0)
+    assert excinfo.value.reason == "time_limit"
+    assert polynomial_form("x", [1] * 201).size == polynomial_size(200)
+
+
+def test_normalize_by_interpolation_max_degree():
+    assert normalize_by_interpolation(Pow(x, Literal(10**9))) is None
+    node = Pow(Add(x, Literal(1)), Literal(20))
+    assert normalize_by_interpolation(node, max_degree=10) is None
+    assert normalize(node, max_interpolation_degree=10) == normalize(
+        node, strategy="rewrite"
+    )
+
+
+def test_normalize_strategy():
+    node = product_of_sums(12)
+    assert is_normalized(normalize(node))
+    assert normalize(node) == normalize(node, strategy="interpolate")
+    small = Mul(Add(x, Literal(1)), Literal(2))
+    assert normalize(small) == normalize(small, strategy="rewrite")
+    assert is_normalized(normalize(small, strategy="interpolate"))
+    # Multivariate expressions fall back to rewriting.
+    assert normalize(Mul(x, y), strategy="interpolate") == Mul(x, y)
+    with pytest.raises(ValueError):
+        normalize(node, strategy="expand")
@@ -0,0 +1,72 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    CalcLangMachine,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Variable,
+)
+from calc.lower import lower_powers
+from calc.symbolic import PostOrderDAG, PostOrderDFS
+
+x = Variable("x")
+y = Variable("y")
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        Pow(x, Literal(2)),
+        Pow(x, Literal(13)),
+        Add(Mul(Literal(3), Pow(x, Literal(4))), Mul(Literal(2), Pow(x, Literal(2)))),
+        Sub(Pow(Add(x, Pow(y, Literal(3))), Literal(5)), Pow(y, Literal(6))),
+        Pow(x, Literal(0.5)),
+        Pow(Literal(2), x),
+    ],
+)
+def test_lower_powers(program, rng):
+    lowered = lower_powers(program)
+    assert not any(
+        isinstance(node, Pow) and isinstance(node.exponent.val, int)
+        for node in PostOrderDFS(lowered)
+        if isinstance(node, Pow) and isinstance(node.exponent, Literal)
+    )
+    interp = CalcLangInterpreter()
+    for bindings in [{"x": 3, "y": -2}, {"x": rng.random(8), "y": rng.random(8)}]:
+        np.testing.assert_allclose(interp(lowered, bindings), interp(program, bindings))
+
+
+def test_shared_chains():
+    program = Add(Pow(x, Literal(8)), Add(Pow(x, Literal(4)), Pow(x, Literal(9))))
+    lowered = lower_powers(program)
+    muls = [node for node in PostOrderDAG(lowered) if isinstance(node, Mul)]
+    # x^2, x^4, x^8 and x^9 = x^8 * x
+    assert len(muls) == 4
+
+
+def test_large_exponent():
+    lowered = lower_powers(Pow(x, Literal(2**64 + 1)))
+    assert CalcLangInterpreter()(lowered, {"x": 1.0}) == 1.0
+
+
+def test_shared_values_released():
+    # x^(2^20) lowered is a chain of 20 squarings, each used twice by its parent.
+    lowered = lower_powers(Pow(Add(x, Literal(0)), Literal(2**20)))
+    held = []
+
+    class Machine(CalcLangMachine):
+        def __call__(self, prgm):
+            if self.values is not None:
+                held.append(len(self.values))
+            return super().__call__(prgm)
+
+    value = Machine({"x": np.full(4, 1.0)})(lowered)
+    np.testing.assert_equal(value, 1.0)
+    # Each square is freed once its parent has used it twice.
+    assert max(held) <= 1
@@ -0,0 +1,102 @@
+import pytest
+
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    CalcLangPrinterContext,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+    Variable,
+)
+from calc.calc_lang.gradient import CalcLangGradientInterpreter
+from calc.calc_lang.nary import collect_factors, collect_terms, flatten, unflatten
+from calc.symbolic import Fixpoint, Flatten, PostOrderDFS, PostWalk
+
+x = Variable("x")
+y = Variable("y")
+z = Variable("z")
+
+
+def test_flatten_rewriter():
+    rw = PostWalk(Flatten([Sum]))
+    assert rw(Sum((x, Sum((y, Sum((z, x))))))) == Sum((x, y, z, x))
+    assert rw(Sum((x, Product((y, Product((z, x))))))) is None
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        Add(x, Add(y, Add(z, Literal(1)))),
+        Sub(Mul(x, Mul(y, z)), Add(x, Literal(2))),
+        Pow(Add(x, Sub(y, z)), Literal(2)),
+        Mul(Add(x, y), Mul(Add(y, z), x)),
+    ],
+)
+def test_flatten_unflatten(program, rng):
+    flat = flatten(program)
+    assert not any(isinstance(n, Add | Sub | Mul) for n in PostOrderDFS(flat))
+    assert not any(
+        isinstance(n, Sum) and any(isinstance(a, Sum) for a in n.args)
+        for n in PostOrderDFS(flat)
+    )
+    bindings = {"x": rng.random(5), "y": rng.random(5), "z": rng.random(5)}
+    interpret = CalcLangInterpreter()
+    expected = interpret(program, bindings)
+    assert np.allclose(interpret(flat, bindings), expected)
+    assert np.allclose(interpret(unflatten(flat), bindings), expected)
+
+
+def test_flatten_deep():
+    program = x
+    for i in range(5000):
+        program = Add(Literal(i), program)
+    flat = flatten(program)
+    assert isinstance(flat, Sum)
+    assert len(flat.args) == 5001
+    assert CalcLangInterpreter()(flat, {"x": 1}) == 1 + sum(range(5000))
+
+
+def test_unflatten_empty():
+    assert unflatten(Sum(())) == Literal(0)
+    assert unflatten(Product(())) == Literal(1)
+    assert unflatten(Sum((x,))) == x
+    assert unflatten(Sum((x, y, z))) == Add(x, Add(y, z))
+
+
+def test_collect():
+    rw = Fixpoint(PostWalk(lambda n: collect_factors(n) or collect_terms(n)))
+    program = flatten(
+        Add(Mul(Literal(2), Mul(x, y)), Sub(Mul(y, x), Mul(Literal(3), Mul(x, y))))
+    )
+    assert rw(program) == Literal(0)
+    program = flatten(Add(Mul(x, x), Add(Mul(Literal(2), Mul(x, x)), y)))
+    result = rw(program)
+    assert isinstance(result, Sum)
+    assert set(result.args) == {y, Product((Literal(3), Pow(x, Literal(2))))}
+    assert rw(Product((x, Literal(2), Pow(x, Literal(3)), Literal(0)))) == Product(
+        (Literal(0), Pow(x, Literal(4)))
+    )
+    assert rw(Product((Literal(2), Literal(0)))) == Literal(0)
+
+
+def test_print_nary():
+    printer = CalcLangPrinterContext()
+    assert printer(Sum((x, y, Product((Literal(2), z))))) == "x + y + 2 * z"
+    assert printer(Product((Sum((x, y)), z))) == "(x + y) * z"
+    assert printer(Sum(())) == "0"
+    assert printer(Product(())) == "1"
+
+
+def test_gradient_nary():
+    program = Sum((Product((x, y, z)), x, Literal(1)))
+    value, grads = CalcLangGradientInterpreter()(
+        program, {"x": 2.0, "y": 3.0, "z": 5.0}, ["x", "y", "z"]
+    )
+    assert value == 33.0
+    assert grads == {"x": 16.0, "y": 10.0, "z": 6.0}
@@ -46,3 +46,16 @@ class TestCalcLangNormalization:
         assert is_normalized(program2), (
             f"non-normal {program2}, expected ... ((a * x^2) + ((b * x) + c))"
         )
+
+
+def test_normalize_large_constants():
+    from calc.normalize import normalize
+
+    huge = Pow(Literal(10), Literal(10**10))
+    assert normalize(huge) == huge
+    assert normalize(Add(huge, Literal(1))) == Add(huge, Literal(1))
+    assert normalize(Pow(Literal(10), Pow(Literal(10), Literal(2)))) == Literal(10**100)
+    assert normalize(Pow(Literal(1), Literal(10**10))) == Literal(1)
+    root = Pow(Literal(-8), Literal(0.5))
+    assert normalize(root) == root
+    assert normalize(Pow(Literal(8), Literal(0.5))) == Literal(8**0.5)
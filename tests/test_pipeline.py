@@ -0,0 +1,89 @@
+import io
+import json
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import calc.pipeline
+from calc.pipeline import evaluate_line, format_result, main, run_pipeline
+
+
+def test_evaluate_line():
+    assert evaluate_line("1 + 2") == {"value": 3}
+    assert evaluate_line('{"expr": "1.5 + 2"}') == {"value": 3.5}
+    result = evaluate_line("1 +")
+    assert "error" in result
+    assert "\n" not in result["error"]
+
+
+def test_run_pipeline_in_order():
+    lines = [f"{i} + {i}\n" for i in range(200)] + ["\n", "oops\n", "7\n"]
+    serial = list(run_pipeline(lines, chunk_size=16))
+    with ProcessPoolExecutor(2) as executor:
+        parallel = list(
+            run_pipeline(lines, executor=executor, chunk_size=16, max_pending=3)
+        )
+    assert serial == parallel
+    assert [r["value"] for r in serial[:200]] == [2 * i for i in range(200)]
+    assert "error" in serial[200]
+    assert serial[201] == {"value": 7}
+
+
+def test_run_pipeline_backpressure():
+    consumed = 0
+
+    def lines():
+        nonlocal consumed
+        for i in range(1000):
+            consumed += 1
+            yield f"{i}\n"
+
+    with ProcessPoolExecutor(1) as executor:
+        results = run_pipeline(lines(), executor=executor, chunk_size=10, max_pending=2)
+        assert next(results) == {"value": 0}
+        assert consumed <= 30
+        assert len(list(results)) == 999
+
+
+def test_main(tmp_path, monkeypatch):
+    path = tmp_path / "input.txt"
+    path.write_text("1 + 2\n3.5\n")
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    assert main(["-j", "0", "-o", "json", str(path)]) == 0
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {"value": 3},
+        {"value": 3.5},
+    ]
+
+
+def test_format_complex(tmp_path, monkeypatch):
+    result = {"value": [1.0, 2j]}
+    assert format_result(result, "text") == "[1.0, 2j]"
+    line = json.loads(format_result(result, "json"))
+    assert line == result
+    assert "value" not in result
+    assert result["error"].startswith("TypeError: ")
+
+    path = tmp_path / "input.txt"
+    path.write_text("1\n")
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    monkeypatch.setattr(calc.pipeline, "evaluate_line", lambda *args: {"value": 1j})
+    assert main(["-j", "0", "-o", "json", str(path)]) == 1
+    assert "error" in json.loads(out.getvalue())
+
+
+def test_python_m_calc():
+    result = subprocess.run(
+        [sys.executable, "-m", "calc", "-j", "2"],
+        input="1 + 2\n1 +\n4\n",
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    lines = result.stdout.splitlines()
+    assert result.returncode == 1
+    assert lines[0] == "3"
+    assert lines[1].startswith("error: ")
+    assert lines[2] == "4"
@@ -0,0 +1,46 @@
+import numpy as np
+
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    EvaluationProfile,
+    Literal,
+    Mul,
+    Pow,
+    ProfilingInterpreter,
+    ProfilingMachine,
+    Sub,
+    Variable,
+)
+
+x = Variable("x")
+y = Variable("y")
+
+
+def test_profiling_machine(rng):
+    shared = Pow(Add(x, y), Literal(2))
+    program = Sub(Mul(shared, shared), Mul(x, Literal(3)))
+    bindings = {"x": rng.random(1000), "y": rng.random(1000)}
+    machine = ProfilingMachine(bindings)
+    assert np.allclose(machine(program), CalcLangInterpreter()(program, bindings))
+    profile = machine.profile
+    assert profile.counts == {"Sub": 1, "Mul": 2, "Pow": 1, "Add": 1}
+    root = profile.subtrees[id(program)]
+    assert root.calls == 1
+    assert root.nbytes == 8000
+    assert root.time >= sum(s.self_time for s in profile.subtrees.values()) * 0.99
+    assert profile.top(1)[0].node is program
+    assert profile.top(1, key="self_time")[0].time <= root.time
+
+
+def test_profiling_interpreter():
+    profile = EvaluationProfile()
+    interpreter = ProfilingInterpreter(profile=profile)
+    program = Add(Mul(x, x), Literal(1))
+    for i in range(3):
+        assert interpreter(program, {"x": i}) == i * i + 1
+    assert profile.counts == {"Add": 3, "Mul": 3}
+    assert profile.subtrees[id(program)].calls == 3
+    report = profile.report(k=2)
+    assert "x * x + 1" in report
+    assert report.splitlines()[0].split()[:2] == ["node", "type"]
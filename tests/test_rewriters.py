@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from calc.calc_lang import Add, Literal, Mul, Variable
+from calc.normalize import normalize
+from calc.symbolic import Fixpoint, PostWalk, RewriteBudgetExceeded
+
+x = Variable("x")
+y = Variable("y")
+
+
+def commute(node):
+    match node:
+        case Add(a, b):
+            return Add(b, a)
+        case _:
+            return None
+
+
+def double(node):
+    return Add(node, node) if node == x or isinstance(node, Add) else None
+
+
+def test_fixpoint_unbounded():
+    rw = Fixpoint(PostWalk(lambda n: Literal(n.val + 1) if n == Literal(0) else None))
+    assert rw(Add(Literal(0), x)) == Add(Literal(1), x)
+    assert rw(x) is None
+
+
+def test_fixpoint_iter_limit():
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        Fixpoint(commute, iter_limit=5)(Add(x, y))
+    assert excinfo.value.reason == "iter_limit"
+    assert excinfo.value.iterations == 5
+    assert excinfo.value.partial == Add(y, x)
+    assert Fixpoint(commute, iter_limit=5, partial=True)(Add(x, y)) == Add(y, x)
+
+
+def test_fixpoint_node_limit():
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        Fixpoint(double, node_limit=100)(x)
+    assert excinfo.value.reason == "node_limit"
+    assert excinfo.value.partial.size > 100
+    assert excinfo.value.iterations == 6
+
+
+def test_fixpoint_node_limit_within_pass():
+    # One pass of the walk doubles the term at every level of the chain.
+    calls = 0
+
+    def grow(node):
+        nonlocal calls
+        calls += 1
+        match node:
+            case Mul(a, b):
+                return Mul(Add(a, a), b)
+            case _:
+                return None
+
+    chain = x
+    for _ in range(40):
+        chain = Mul(chain, Literal(1))
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        Fixpoint(PostWalk(grow), node_limit=1000)(chain)
+    assert excinfo.value.reason == "node_limit"
+    assert excinfo.value.iterations == 1
+    assert excinfo.value.partial is chain
+    assert calls < 40
+    assert Fixpoint(PostWalk(grow), node_limit=1000, partial=True)(chain) is None
+
+
+def test_fixpoint_nested_budget():
+    inner = Fixpoint(PostWalk(double), iter_limit=10)
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        Fixpoint(inner, node_limit=100)(x)
+    assert excinfo.value.reason == "node_limit"
+    assert excinfo.value.partial == x
+
+
+def test_fixpoint_time_limit():
+    def slow(node):
+        time.sleep(0.01)
+        return commute(node)
+
+    start = time.monotonic()
+    with pytest.raises(RewriteBudgetExceeded) as excinfo:
+        Fixpoint(slow, time_limit=0.05)(Add(x, y))
+    assert excinfo.value.reason == "time_limit"
+    assert time.monotonic() - start < 1
+
+
+def test_normalize_budget():
+    expr = Mul(Add(x, Literal(1)), Add(y, Literal(2)))
+    with pytest.raises(RewriteBudgetExceeded):
+        normalize(expr, iter_limit=1)
+    assert normalize(expr, iter_limit=1, partial=True) != expr
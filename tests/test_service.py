@@ -0,0 +1,210 @@
+import asyncio
+import json
+
+import pytest
+
+from calc.calc_lang import Add, CalcLangInterpreter, Literal, Mul, Pow, Variable
+from calc.service import EvaluationService, evaluate_batch
+
+programs = {
+    "x + 1": Add(Variable("x"), Literal(1)),
+    "x * y": Mul(Variable("x"), Variable("y")),
+}
+
+
+class CountingInterpreter(CalcLangInterpreter):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def __call__(self, prgm, bindings=None):
+        self.calls += 1
+        return super().__call__(prgm, bindings)
+
+
+def test_evaluate():
+    async def main():
+        service = EvaluationService()
+        return await service.evaluate("2 + 3")
+
+    assert asyncio.run(main()) == 5
+
+
+def test_coalescing():
+    interpreter = CountingInterpreter()
+
+    async def main():
+        service = EvaluationService(
+            parser=programs.__getitem__, interpreter=interpreter, batch_window=0.01
+        )
+        return await asyncio.gather(
+            *(service.evaluate("x + 1", {"x": i}) for i in range(100))
+        )
+
+    assert asyncio.run(main()) == [i + 1 for i in range(100)]
+    assert interpreter.calls == 1
+
+
+def test_batch_errors():
+    results = evaluate_batch(programs["x * y"], [{"x": 2, "y": 3}, {"x": 1}])
+    assert results[0] == (True, 6)
+    assert not results[1][0]
+    assert isinstance(results[1][1], KeyError)
+
+
+def test_batch_malformed_bindings():
+    batch = [{"x": 1}, [1], {"x": 2}, {"x": 3}]
+    results = evaluate_batch(programs["x + 1"], batch)
+    assert results[0] == (True, 2)
+    assert results[2:] == [(True, 3), (True, 4)]
+    assert not results[1][0]
+    assert isinstance(results[1][1], TypeError)
+
+
+def test_compile_cache():
+    parsed = []
+
+    def parser(expr):
+        parsed.append(expr)
+        return programs[expr]
+
+    async def main():
+        service = EvaluationService(parser=parser, cache_size=1)
+        assert await service.evaluate("x + 1", {"x": 1}) == 2
+        assert await service.evaluate("x + 1", {"x": 2}) == 3
+        assert await service.evaluate("x * y", {"x": 2, "y": 2}) == 4
+        assert await service.evaluate("x + 1", {"x": 3}) == 4
+        with pytest.raises(KeyError):
+            await service.evaluate("x - 1", {"x": 3})
+
+    asyncio.run(main())
+    assert parsed == ["x + 1", "x * y", "x + 1", "x - 1"]
+
+
+def test_tcp_protocol():
+    async def main():
+        service = EvaluationService(parser=programs.__getitem__)
+        server = await service.serve()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        requests = [
+            {"id": 1, "expr": "x + 1", "bindings": {"x": 41}},
+            {"id": 2, "expr": "x * y", "bindings": {"x": 1.5, "y": 4}},
+            {"id": 3, "expr": "x * y", "bindings": {"x": 1.5}},
+        ]
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b"\n")
+        writer.write(b"not json\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(4)]
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        return {response["id"]: response for response in responses}
+
+    responses = asyncio.run(main())
+    assert responses[1] == {"id": 1, "value": 42}
+    assert responses[2] == {"id": 2, "value": 6.0}
+    assert responses[3]["error"].startswith("KeyError")
+    assert responses[None]["error"].startswith("JSONDecodeError")
+
+
+def test_batch_matches_single():
+    prgm = Pow(Variable("x"), Literal(40))
+    batch = [{"x": 3}, {"x": 2.0}, {"x": 5}, {"x": 1.5}, {"x": True}, {"x": True}]
+    interpreter = CountingInterpreter()
+    results = evaluate_batch(prgm, batch, interpreter)
+    assert results == [(True, CalcLangInterpreter()(prgm, b)) for b in batch]
+    assert results[0] == (True, 3**40)
+    assert type(results[2][1]) is int
+    assert type(results[3][1]) is float
+    # One evaluation for each type of binding.
+    assert interpreter.calls == 3
+    sums = evaluate_batch(Add(Variable("x"), Variable("x")), [{"x": True}] * 2)
+    assert sums == [(True, 2)] * 2
+
+
+def test_batch_nonfinite_matches_single():
+    interpreter = CalcLangInterpreter()
+    prgm = Pow(Variable("x"), Literal(-1))
+    results = evaluate_batch(prgm, [{"x": 2.0}, {"x": 0.0}, {"x": 4.0}], interpreter)
+    assert results[0] == (True, 0.5)
+    assert results[2] == (True, 0.25)
+    assert isinstance(results[1][1], ZeroDivisionError)
+    prgm = Pow(Variable("x"), Literal(0.5))
+    batch = [{"x": 4.0}, {"x": -4.0}]
+    results = evaluate_batch(prgm, batch, interpreter)
+    assert results == [(True, interpreter(prgm, bindings)) for bindings in batch]
+    assert type(results[1][1]) is complex
+
+
+def test_max_pending():
+    async def main():
+        service = EvaluationService(parser=programs.__getitem__, max_pending=2)
+        server = await service.serve()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        requests = [{"id": 0, "expr": "x * y", "bindings": {"x": 1, "y": 2}}]
+        requests += [
+            {"id": i, "expr": "x + 1", "bindings": {"x": i}} for i in range(1, 20)
+        ]
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        return {response["id"]: response for response in responses}
+
+    responses = asyncio.run(main())
+    assert responses[0] == {"id": 0, "value": 2}
+    assert all(responses[i] == {"id": i, "value": i + 1} for i in range(1, 20))
+
+
+def test_complex_response():
+    class ComplexInterpreter(CalcLangInterpreter):
+        def __call__(self, prgm, bindings=None):
+            return complex(super().__call__(prgm, bindings))
+
+    async def main():
+        service = EvaluationService(
+            parser=programs.__getitem__, interpreter=ComplexInterpreter()
+        )
+        server = await service.serve()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'{"id": 7, "expr": "x + 1", "bindings": {"x": 1}}\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    response = asyncio.run(main())
+    assert response["id"] == 7
+    assert response["error"].startswith("TypeError")
+
+
+def test_nonfinite_response():
+    async def main():
+        service = EvaluationService(parser=programs.__getitem__)
+        server = await service.serve()
+        host, port = server.sockets[0].getsockname()[:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b'{"id": 8, "expr": "x * y", "bindings": {"x": 1e308, "y": 10}}\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    response = asyncio.run(main())
+    assert response["id"] == 8
+    assert response["error"].startswith("ValueError")
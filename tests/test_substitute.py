@@ -0,0 +1,105 @@
+import pytest
+
+import numpy as np
+
+from calc import substitute
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Sub,
+    Sum,
+    Variable,
+)
+from calc.equivalence import equivalent
+from calc.interpolate import polynomial_form
+from calc.normalize import is_normalized
+from calc.substitute import compose, polynomial_coefficients
+from calc.symbolic import PostOrderDAG
+
+x = Variable("x")
+y = Variable("y")
+z = Variable("z")
+
+
+def test_substitute():
+    expr = Add(Mul(x, y), Sum((x, Literal(1), z)))
+    result = substitute(expr, {"x": Sub(y, Literal(2)), "z": x})
+    assert result == Add(
+        Mul(Sub(y, Literal(2)), y), Sum((Sub(y, Literal(2)), Literal(1), x))
+    )
+    assert substitute(expr, {"w": y}) is expr
+
+
+def test_substitute_reuses_unchanged():
+    unchanged = Mul(y, Literal(3))
+    result = substitute(Add(unchanged, x), {"x": Literal(1)})
+    assert result.left is unchanged
+
+
+def test_substitute_preserves_sharing():
+    # x * x, squared 30 times: a DAG of 31 nodes whose tree has 2^31 leaves.
+    expr = x
+    for _ in range(30):
+        expr = Mul(expr, expr)
+    replacement = Add(y, Literal(1))
+    result = substitute(expr, {"x": replacement})
+    nodes = list(PostOrderDAG(result))
+    assert len(nodes) == 31 + 2
+    assert sum(node is replacement for node in nodes) == 1
+
+    # Nested substitution stays linear too.
+    for _ in range(30):
+        result = substitute(result, {"y": Mul(y, y)})
+    assert len(list(PostOrderDAG(result))) < 200
+
+
+def test_polynomial_coefficients():
+    assert polynomial_coefficients(polynomial_form("x", [1, 0, 3])) == ("x", [1, 0, 3])
+    assert polynomial_coefficients(Literal(4)) == (None, [4])
+    assert polynomial_coefficients(Add(x, Literal(1))) is None
+
+
+@pytest.mark.parametrize(
+    "p, q",
+    [
+        ([1, 2, 3], [0, 1, 1]),
+        ([5], [1, 1]),
+        ([0, 1], [7]),
+        ([-1, 0, 0, 2], [3, -2]),
+        ([0.5, 1.5], [1, 0.25, 2]),
+    ],
+)
+def test_compose(p, q, rng):
+    outer = polynomial_form("x", p)
+    inner = polynomial_form("y", q)
+    result = compose(outer, inner)
+    assert is_normalized(result)
+    assert substitute(outer, {"x": inner}) == result
+    ys = rng.uniform(-2, 2, size=8)
+    interpreter = CalcLangInterpreter()
+    expected = interpreter(substitute(outer, {"x": Pow(inner, Literal(1))}), {"y": ys})
+    actual = np.broadcast_to(interpreter(result, {"y": ys}), ys.shape)
+    assert actual == pytest.approx(np.broadcast_to(expected, ys.shape))
+
+
+def test_compose_nested(rng):
+    # Composing x^2 + 1 with itself 6 times gives a polynomial of degree 64.
+    p = polynomial_form("x", [1, 0, 1])
+    result = p
+    for _ in range(5):
+        result = compose(p, result)
+    assert is_normalized(result)
+    assert polynomial_coefficients(result)[1][-1] == 1
+    assert len(polynomial_coefficients(result)[1]) == 65
+    expr = x
+    for _ in range(6):
+        expr = Add(Mul(expr, expr), Literal(1))
+    assert equivalent(result, expr, rng=rng)
+
+
+def test_compose_not_normalized():
+    with pytest.raises(ValueError):
+        compose(Add(x, Literal(1)), x)
@@ -0,0 +1,93 @@
+import io
+import json
+import pickle
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from calc.calc_lang import Add, Literal, Mul, Variable
+from calc.normalize import normalize, normalize_all
+from calc.pipeline import main
+from calc.symbolic import Namespace, gensym
+from calc.symbolic.rewriters import Memo
+
+x = Variable("x")
+y = Variable("y")
+
+
+@pytest.fixture
+def frequent_switches():
+    # Switch threads as often as possible, to expose races.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_threads(fn, n=8):
+    barrier = threading.Barrier(n)
+
+    def task(i):
+        barrier.wait()
+        return fn(i)
+
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(task, range(n)))
+
+
+def test_gensym_unique(frequent_switches):
+    results = run_threads(lambda i: [gensym("t") for _ in range(2000)])
+    symbols = [s for result in results for s in result]
+    assert len(set(symbols)) == len(symbols)
+
+
+def test_namespace_unique(frequent_switches):
+    namespace = Namespace()
+    results = run_threads(lambda i: [namespace.freshen("v") for _ in range(500)])
+    names = [s for result in results for s in result]
+    assert len(set(names)) == len(names) == 4000
+    resolved = run_threads(lambda i: namespace.resolve("a", "b"))
+    assert len(set(resolved)) == 1
+    assert resolved[0] == "a_b"
+
+
+def test_namespace_pickle():
+    namespace = Namespace()
+    namespace.freshen("v")
+    copy = pickle.loads(pickle.dumps(namespace))
+    assert copy.freshen("v") == "v_2"
+
+
+def test_memo_consistent(frequent_switches):
+    calls = []
+
+    def rw(n):
+        calls.append(n)
+        return object()
+
+    memo = Memo(rw)
+    results = run_threads(lambda i: [memo(k) for k in range(200)])
+    assert all(result == results[0] for result in results)
+    assert set(calls) == set(range(200))
+
+
+def test_normalize_all(frequent_switches):
+    nodes = [Mul(Add(x, Literal(k)), Add(x, Literal(k + 1))) for k in range(50)]
+    nodes += [Add(Mul(x, y), Literal(k)) for k in range(50)]
+    assert normalize_all(nodes, max_workers=8) == [normalize(n) for n in nodes]
+    with ThreadPoolExecutor(4) as pool:
+        results = normalize_all(nodes, executor=pool, strategy="rewrite")
+    assert results == [normalize(n, strategy="rewrite") for n in nodes]
+
+
+def test_main_threads(tmp_path, monkeypatch):
+    path = tmp_path / "input.txt"
+    path.write_text("".join(f"{i} + {i}\n" for i in range(100)))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    argv = ["-j", "4", "--threads", "--chunk-size", "8", "-o", "json", str(path)]
+    assert main(argv) == 0
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert results == [{"value": 2 * i} for i in range(100)]
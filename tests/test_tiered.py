@@ -0,0 +1,111 @@
+import pytest
+
+import numpy as np
+
+from calc import TieredInterpreter
+from calc.calc_lang import (
+    Add,
+    CalcLangInterpreter,
+    Literal,
+    Mul,
+    Pow,
+    Product,
+    Sub,
+    Sum,
+    Variable,
+    structural_hash,
+)
+from calc.codegen import compile_python_kernel, python_kernel_source
+
+x = Variable("x")
+y = Variable("y")
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        Add(Mul(Literal(3), Pow(x, Literal(2))), Sub(Mul(x, y), Literal(1))),
+        Pow(x, Literal(-1)),
+        Sum((x, Product((x, y, Literal(0.5))), Sum(()))),
+        Literal(np.array([1.0, 2.0])),
+        x,
+    ],
+)
+def test_python_kernel(program, rng):
+    kernel = compile_python_kernel(program)
+    for bindings in [{"x": 2, "y": 3}, {"x": rng.random(4) + 1, "y": rng.random(4)}]:
+        assert np.allclose(kernel(bindings), CalcLangInterpreter()(program, bindings))
+
+
+def test_python_kernel_source_shares_subtrees():
+    shared = Add(x, y)
+    source, constants = python_kernel_source(Mul(shared, shared), ["x", "y"])
+    assert source.count("+") == 1
+    assert constants == {}
+    with pytest.raises(KeyError):
+        compile_python_kernel(shared)({"x": 1})
+
+
+def test_tiered_promotion():
+    compiled = []
+
+    def compiler(prgm):
+        compiled.append(prgm)
+        return compile_python_kernel(prgm)
+
+    interpreter = TieredInterpreter(threshold=3, cache_size=2, compiler=compiler)
+    program = Add(Mul(x, x), Literal(1))
+    for i in range(10):
+        assert interpreter(program, {"x": i}) == i * i + 1
+    assert interpreter.promotions == 1
+    assert compiled == [program]
+    assert not interpreter.counts
+    # A structurally equal program built separately shares the kernel.
+    other = Add(Mul(x, x), Literal(1))
+    for i in range(3):
+        assert interpreter(other, {"x": i}) == i * i + 1
+    assert interpreter.promotions == 1
+
+
+def test_tiered_rebuilt_programs():
+    interpreter = TieredInterpreter(threshold=3)
+    for i in range(50):
+        # Call sites which build a fresh program for every evaluation.
+        assert interpreter(Add(x, Literal(1)), {"x": i}) == i + 1
+    assert interpreter.promotions == 1
+    assert interpreter(Add(x, Literal(1.0)), {"x": 1}) == 2.0
+    assert interpreter.counts == {structural_hash(Add(x, Literal(1.0))): 1}
+
+
+def test_tiers_agree():
+    interpreter = TieredInterpreter(threshold=2)
+    program = Pow(x, Literal(-1))
+    bindings = {"x": np.arange(1, 5)}
+    interpreted = interpreter(program, bindings)
+    compiled = interpreter(program, bindings)
+    assert interpreter.promotions == 1
+    assert interpreted.dtype == compiled.dtype == np.float64
+    assert np.array_equal(interpreted, compiled)
+
+
+def test_tiered_logging(caplog):
+    interpreter = TieredInterpreter(threshold=1, verbose=True)
+    with caplog.at_level("INFO", logger="calc.tiered"):
+        interpreter(Add(x, Literal(1)), {"x": 1})
+    assert "Compiled" in caplog.text
+
+
+def test_tiered_cache_bounded():
+    interpreter = TieredInterpreter(threshold=1, cache_size=2)
+    programs = [Add(x, Literal(i)) for i in range(5)]
+    for _ in range(2):
+        for i, program in enumerate(programs):
+            assert interpreter(program, {"x": 1}) == 1 + i
+    assert len(interpreter.kernels) == 2
+    assert interpreter.promotions == 10
+
+
+def test_tiered_undefined():
+    interpreter = TieredInterpreter(threshold=1)
+    with pytest.raises(KeyError):
+        interpreter(Add(x, y), {"x": 1})
@@ -1,3 +1,5 @@
+import numpy as np
+
 from calc import calc_lang, trace
 
 
@@ -44,3 +46,36 @@ def test_trace_pow():
             ),
         ),
     )
+
+
+def test_trace_numpy():
+    x = trace("x")
+    y = trace("y")
+    result = np.subtract(np.multiply(np.float64(2.0), x), np.power(y, 2))
+    assert result.expr == calc_lang.Sub(
+        calc_lang.Mul(calc_lang.Literal(np.float64(2.0)), calc_lang.Variable("x")),
+        calc_lang.Pow(calc_lang.Variable("y"), calc_lang.Literal(2)),
+    )
+    assert (-x / y).expr == calc_lang.Mul(
+        calc_lang.Mul(calc_lang.Literal(-1), calc_lang.Variable("x")),
+        calc_lang.Pow(calc_lang.Variable("y"), calc_lang.Literal(-1)),
+    )
+    # Arrays of tracers trace elementwise, through the same operators.
+    total = np.sum(np.array([x, y, x]) * 3)
+    bindings = {"x": 2.0, "y": 5.0}
+    assert calc_lang.CalcLangInterpreter()(total.expr, bindings) == 27.0
+
+
+def test_trace_hash_consing():
+    def model(x):
+        return (x * x + 1) * (x * x + 1)
+
+    result = model(trace("x"))
+    assert result.expr.left is result.expr.right
+    assert trace("x").expr is trace("x").expr
+    assert (trace("x") + 1).expr is not (trace("x") + 1.0).expr
+    negative = trace("x") * -0.0
+    positive = trace("x") * 0.0
+    assert str(negative.expr.right.val) == "-0.0"
+    assert str(positive.expr.right.val) == "0.0"
+    assert (trace("x") * np.float32(-0.0)).expr.right.val.dtype == np.float32